@@ -12,18 +12,26 @@ __version__ = "0.1.0"
 from .workbook import (
     create_workbook,
     get_workbook_info,
-    open_workbook
+    open_workbook,
+    flush_workbook,
+    flush_all_workbooks,
+    workbook_session
 )
 
 from .sheet import (
     create_worksheet,
+    create_worksheets,
     copy_sheet,
     delete_sheet,
-    rename_sheet
+    delete_sheets,
+    rename_sheet,
+    rename_sheets,
+    batch_sheet_ops
 )
 
 from .data import (
     read_excel_range,
+    read_excel_range_async,
     write_data,
     append_data
 )
@@ -37,12 +45,16 @@ from .macros import (
 
 from .formatting import (
     format_range,
+    format_ranges,
     apply_conditional_formatting,
     clear_formatting,
     set_column_width,
     set_row_height,
+    set_dimensions,
+    build_formatted_sheet,
     create_named_style,
-    apply_named_style
+    apply_named_style,
+    clear_style_cache
 )
 
 # Exportar excepciones
@@ -57,9 +69,12 @@ from .exceptions import (
     RangeError
 )
 
-# Exportar funciones de servidor
-from .server import (
-    mcp,
-    run_server_stdio,
-    run_server_async
-)
+# Exportar funciones de servidor. Se importan bajo demanda: cargar el SDK de MCP
+# cuesta más que todo lo anterior y no hace falta al usar el paquete como biblioteca
+_SERVER_EXPORTS = ("mcp", "run_server_stdio", "run_server_async")
+
+def __getattr__(name):
+    if name in _SERVER_EXPORTS:
+        from . import server
+        return getattr(server, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
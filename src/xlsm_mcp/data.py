@@ -3,19 +3,67 @@ Módulo para operaciones de lectura y escritura de datos en archivos Excel con m
 """
 
 import os
+import re
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional, Union
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, Union
 from pathlib import Path
 
-from openpyxl import load_workbook
+from openpyxl import load_workbook, Workbook
 from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.utils import get_column_letter
 
 from xlsm_mcp.exceptions import DataError
-from xlsm_mcp.workbook import open_workbook
+from xlsm_mcp.workbook import open_workbook, commit_workbook, save_workbook, writable_workbook
 
 logger = logging.getLogger("xlsm-mcp")
 
+# Referencia de celda: letras de columna seguidas del número de fila
+_CELL_RE = re.compile(r'^([A-Za-z]+)(\d+)$')
+
+# Letras de columna precalculadas por índice (1 a 18278, el límite de openpyxl)
+_MAX_COLUMN = 18278
+_COL_LETTERS = (None,) + tuple(get_column_letter(i) for i in range(1, _MAX_COLUMN + 1))
+
+def _column_index(col_str: str) -> int:
+    """
+    Convierte letras de columna en su índice numérico (A=1, Z=26, AA=27).
+    
+    Los casos de 1 a 3 letras (todas las columnas de Excel hasta XFD) se
+    resuelven con aritmética directa; el bucle solo se usa para cadenas más largas.
+    """
+    s = col_str.upper()
+    n = len(s)
+    if n == 1:
+        return ord(s) - 64
+    if n == 2:
+        return (ord(s[0]) - 64) * 26 + ord(s[1]) - 64
+    if n == 3:
+        return (ord(s[0]) - 64) * 676 + (ord(s[1]) - 64) * 26 + ord(s[2]) - 64
+    
+    col = 0
+    for char in s:
+        col = col * 26 + (ord(char) - 64)
+    return col
+
+@lru_cache(maxsize=4096)
+def _parse_cell(cell_ref: str) -> Optional[Tuple[int, int]]:
+    """
+    Convierte una referencia de celda (ej. "B3") en (fila, columna).
+    
+    Devuelve None si la referencia no es válida, sin lanzar excepciones, para
+    que el llamador decida qué error reportar. Los resultados se memorizan porque
+    las mismas referencias se repiten entre llamadas.
+    """
+    match = _CELL_RE.match(cell_ref)
+    if match is None:
+        return None
+    col_str, row_str = match.groups()
+    return int(row_str), _column_index(col_str)
+
+@lru_cache(maxsize=4096)
 def parse_cell_range(start_cell: str, end_cell: Optional[str] = None) -> tuple:
     """
     Analiza referencias de celdas y devuelve coordenadas de fila/columna.
@@ -30,42 +78,49 @@ def parse_cell_range(start_cell: str, end_cell: Optional[str] = None) -> tuple:
     Raises:
         ValueError: Si las referencias de celda son inválidas
     """
-    def _parse_cell(cell_ref: str) -> tuple:
-        # Extrae letras de columna y número de fila
-        import re
-        match = re.match(r'^([A-Za-z]+)(\d+)$', cell_ref)
-        if not match:
-            raise ValueError(f"Referencia de celda inválida: {cell_ref}")
-            
-        col_str, row_str = match.groups()
-        row = int(row_str)
+    start = _parse_cell(start_cell)
+    if start is None:
+        raise ValueError(f"Error al analizar rango de celdas: Referencia de celda inválida: {start_cell}")
         
-        # Convierte letras de columna a número
-        col = 0
-        for char in col_str.upper():
-            col = col * 26 + (ord(char) - ord('A') + 1)
-            
-        return row, col
+    if not end_cell:
+        return start[0], start[1], None, None
+        
+    end = _parse_cell(end_cell)
+    if end is None:
+        raise ValueError(f"Error al analizar rango de celdas: Referencia de celda inválida: {end_cell}")
+        
+    return start[0], start[1], end[0], end[1]
+
+def parse_cells_bulk(cell_refs: List[str]) -> List[Tuple[int, int]]:
+    """
+    Convierte muchas referencias de celda en (fila, columna) en una sola llamada.
     
-    try:
-        start_row, start_col = _parse_cell(start_cell)
+    Recorre las referencias con map sobre _parse_cell, de modo que el bucle
+    corre en C y las referencias repetidas salen de su caché.
+    
+    Args:
+        cell_refs: Referencias de celda (ej. ["A1", "B3"])
         
-        if end_cell:
-            end_row, end_col = _parse_cell(end_cell)
-        else:
-            end_row, end_col = None, None
-            
-        return start_row, start_col, end_row, end_col
-    except Exception as e:
-        raise ValueError(f"Error al analizar rango de celdas: {str(e)}")
+    Returns:
+        Lista de tuplas (fila, columna) en el mismo orden
+        
+    Raises:
+        ValueError: Si alguna referencia es inválida
+    """
+    coords = list(map(_parse_cell, cell_refs))
+    if None in coords:
+        bad = cell_refs[coords.index(None)]
+        raise ValueError(f"Error al analizar rango de celdas: Referencia de celda inválida: {bad}")
+    return coords
 
 def read_excel_range(
     filepath: Union[str, Path],
     sheet_name: str,
     start_cell: str = "A1",
     end_cell: Optional[str] = None,
-    include_formulas: bool = False
-) -> List[Dict[str, Any]]:
+    include_formulas: bool = False,
+    layout: Literal["records", "columns"] = "records"
+) -> Union[List[Dict[str, Any]], Dict[str, List[Any]]]:
     """
     Lee datos de un rango de celdas en Excel.
     
@@ -75,16 +130,30 @@ def read_excel_range(
         start_cell: Celda inicial (por defecto "A1")
         end_cell: Celda final (opcional)
         include_formulas: Si es True, incluye las fórmulas en lugar de sus valores
+        layout: Formato del resultado. "records" devuelve una lista de diccionarios
+                (uno por fila); "columns" devuelve un diccionario con una lista de
+                valores por encabezado, más compacto para lecturas grandes
         
     Returns:
-        Lista de diccionarios con los datos leídos
+        Lista de diccionarios con los datos leídos, o diccionario de columnas
+        si layout es "columns"
         
     Raises:
         DataError: Si ocurre un error al leer los datos
     """
     try:
-        # Abrir el libro
-        wb = open_workbook(filepath, read_only=True)
+        if layout not in ("records", "columns"):
+            raise DataError(f"Formato de resultado inválido: {layout}. Valores válidos: records, columns")
+            
+        # Abrir el libro en modo streaming; las fórmulas solo se cargan si se solicitan.
+        # El proyecto VBA no se copia: una lectura nunca vuelve a guardar el libro
+        wb = open_workbook(
+            filepath,
+            read_only=True,
+            data_only=not include_formulas,
+            keep_links=False,
+            keep_vba=False
+        )
         
         if sheet_name not in wb.sheetnames:
             raise DataError(f"La hoja '{sheet_name}' no existe")
@@ -96,70 +165,92 @@ def read_excel_range(
             start_cell, end_cell = start_cell.split(':')
             
         # Obtener coordenadas iniciales
-        try:
-            start_coords = parse_cell_range(start_cell)
-            start_row, start_col = start_coords[0], start_coords[1]
-        except ValueError as e:
-            raise DataError(f"Formato de celda inicial inválido: {str(e)}")
+        start_coords = _parse_cell(start_cell)
+        if start_coords is None:
+            raise DataError(f"Formato de celda inicial inválido: {start_cell}")
+        start_row, start_col = start_coords
 
         # Determinar coordenadas finales
         if end_cell:
-            try:
-                end_coords = parse_cell_range(end_cell)
-                end_row, end_col = end_coords[0], end_coords[1]
-            except ValueError as e:
-                raise DataError(f"Formato de celda final inválido: {str(e)}")
+            end_coords = _parse_cell(end_cell)
+            if end_coords is None:
+                raise DataError(f"Formato de celda final inválido: {end_cell}")
+            end_row, end_col = end_coords
         else:
             # Para una sola celda, usar las mismas coordenadas
             end_row, end_col = start_row, start_col
 
-        # Validar límites del rango
-        if start_row > ws.max_row or start_col > ws.max_column:
-            raise DataError(
-                f"Celda inicial fuera de límites. Dimensiones de la hoja: "
-                f"A1:{get_column_letter(ws.max_column)}{ws.max_row}"
-            )
+        # Los encabezados salen de _COL_LETTERS; una columna fuera de la tabla
+        # dejaría el rango sin parte de sus encabezados
+        if max(start_col, end_col) > _MAX_COLUMN:
+            raise DataError(f"Columna fuera de los límites: el máximo es {_COL_LETTERS[_MAX_COLUMN]}")
+
+        # No se consultan ws.max_row/ws.max_column: en modo solo lectura obligan a
+        # recorrer el XML de la hoja. Un rango fuera de límites simplemente no
+        # devuelve filas y se detecta tras la lectura.
+
+        # Una sola celda: devolver su valor sin recorrer el rango
+        if start_row == end_row and start_col == end_col:
+            value = ws.cell(row=start_row, column=start_col).value
+            wb.close()
+            header = f"Columna_{_COL_LETTERS[start_col]}"
+            if layout == "columns":
+                return {} if value is None else {header: [value]}
+            return [] if value is None else [{header: value}]
+
+        # Recorrer el rango fila a fila sin materializar celdas individuales
+        rows_iter = ws.iter_rows(
+            min_row=start_row,
+            max_row=end_row,
+            min_col=start_col,
+            max_col=end_col,
+            values_only=True
+        )
+
+        # Nombres genéricos de columna, calculados una sola vez para todo el rango
+        default_headers = [f"Columna_{letter}" for letter in _COL_LETTERS[start_col:end_col + 1]]
 
-        data = []
-        # Si es una sola celda o una sola fila, leer los valores directamente
+        # Si es una sola fila, usar nombres de columna genéricos
         if start_row == end_row:
-            row_data = {}
-            for col in range(start_col, end_col + 1):
-                cell = ws.cell(row=start_row, column=col)
-                col_name = f"Columna_{get_column_letter(col)}"
-                
-                # Incluir fórmula o valor según configuración
-                if include_formulas and cell.data_type == 'f':
-                    row_data[col_name] = cell.value
-                else:
-                    row_data[col_name] = cell.value
-                    
-            if any(v is not None for v in row_data.values()):
-                data.append(row_data)
+            header_values = ()
+            headers = default_headers
         else:
             # Múltiples filas - usar fila de encabezado
-            headers = []
-            for col in range(start_col, end_col + 1):
-                cell_value = ws.cell(row=start_row, column=col).value
-                headers.append(str(cell_value) if cell_value is not None else f"Columna_{get_column_letter(col)}")
-
-            # Obtener filas de datos
-            for row in range(start_row + 1, end_row + 1):
-                row_data = {}
-                for col, header in enumerate(headers, start=start_col):
-                    cell = ws.cell(row=row, column=col)
-                    
-                    # Incluir fórmula o valor según configuración
-                    if include_formulas and cell.data_type == 'f':
-                        row_data[header] = cell.value
-                    else:
-                        row_data[header] = cell.value
-                        
-                if any(v is not None for v in row_data.values()):
-                    data.append(row_data)
-
-        wb.close()
-        return data
+            header_values = next(rows_iter, ())
+            headers = [
+                str(value) if value is not None else default
+                for value, default in zip(header_values, default_headers)
+            ]
+
+        if layout == "columns":
+            # Una lista por encabezado; ante encabezados repetidos prevalece la última
+            # columna, igual que en el formato de registros
+            positions = {header: i for i, header in enumerate(headers)}
+            columns = {header: [] for header in positions}
+            for row_values in rows_iter:
+                if any(v is not None for v in row_values):
+                    for header, i in positions.items():
+                        columns[header].append(row_values[i])
+            wb.close()
+            has_data = any(columns.values())
+            result = columns
+        else:
+            data = []
+            for row_values in rows_iter:
+                # Descartar filas vacías antes de construir el diccionario
+                if not any(v is not None for v in row_values):
+                    continue
+                data.append(dict(zip(headers, row_values)))
+            wb.close()
+            has_data = bool(data)
+            result = data
+
+        # Un rango explícito sin ningún valor (ni siquiera en la fila de encabezado)
+        # está vacío o fuera de los límites de la hoja
+        if end_cell and not has_data and not any(v is not None for v in header_values):
+            raise DataError("Rango vacío o fuera de los límites")
+
+        return result
         
     except DataError:
         raise
@@ -167,11 +258,126 @@ def read_excel_range(
         logger.error(f"Error al leer rango de Excel: {e}")
         raise DataError(f"Error al leer datos: {str(e)}")
 
+async def read_excel_range_async(
+    filepath: str,
+    sheet_name: str,
+    start_cell: str = "A1",
+    end_cell: Optional[str] = None,
+    include_formulas: bool = False,
+    layout: Literal["records", "columns"] = "records"
+) -> Union[List[Dict[str, Any]], Dict[str, List[Any]]]:
+    """
+    Versión asíncrona de read_excel_range que ejecuta la lectura en un hilo.
+    
+    Permite solapar varias lecturas (distintas hojas o archivos) sin bloquear
+    el bucle de eventos del servidor. Usa el ejecutor por defecto del bucle,
+    el mismo que el resto de herramientas del servidor.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        sheet_name: Nombre de la hoja
+        start_cell: Celda inicial (por defecto "A1")
+        end_cell: Celda final (opcional)
+        include_formulas: Si es True, incluye las fórmulas en lugar de sus valores
+        layout: Formato del resultado ("records" o "columns")
+        
+    Returns:
+        El mismo resultado que read_excel_range
+        
+    Raises:
+        DataError: Si ocurre un error al leer los datos
+    """
+    return await asyncio.to_thread(
+        read_excel_range,
+        filepath,
+        sheet_name,
+        start_cell,
+        end_cell,
+        include_formulas,
+        layout
+    )
+
+def _row_values_getter(headers: List[Any]) -> Callable[[Dict[str, Any]], Tuple[Any, ...]]:
+    """
+    Devuelve una función que extrae de cada fila los valores en el orden de headers.
+    
+    Para filas con exactamente las mismas claves (el caso habitual) usa
+    operator.itemgetter, que obtiene todos los valores en una sola llamada;
+    si faltan claves recurre a dict.get y deja None en su lugar.
+    """
+    if not headers:
+        return lambda row_data: ()
+        
+    getter = itemgetter(*headers)
+    single = len(headers) == 1
+    width = len(headers)
+    
+    def row_values(row_data: Dict[str, Any]) -> Tuple[Any, ...]:
+        if len(row_data) == width:
+            try:
+                values = getter(row_data)
+                return (values,) if single else values
+            except KeyError:
+                pass
+        return tuple(row_data.get(header) for header in headers)
+        
+    return row_values
+
+def _write_streaming(
+    filepath: str,
+    sheet_name: str,
+    data: List[Dict[str, Any]],
+    start_row: int = 1,
+    start_col: int = 1
+) -> None:
+    """
+    Crea un libro nuevo en modo de solo escritura y vuelca los datos fila a fila.
+    
+    Cada fila se serializa en cuanto se añade, por lo que la memoria no crece con
+    el volumen de datos. Solo es válido cuando el archivo todavía no existe, y
+    solo para .xlsx: un libro de solo escritura no tiene proyecto VBA y Excel
+    no abre un paquete .xlsx guardado con extensión .xlsm. Se guarda con
+    save_workbook, a través de un temporal que reemplaza al destino.
+    
+    Args:
+        filepath: Ruta del archivo a crear
+        sheet_name: Nombre de la hoja
+        data: Lista de diccionarios con los datos a escribir
+        start_row: Fila donde se escriben los encabezados
+        start_col: Columna donde comienzan los datos
+        
+    Raises:
+        DataError: Si el destino es un archivo .xlsm
+    """
+    if os.path.splitext(filepath)[1].lower() == '.xlsm':
+        raise DataError(
+            "El modo streaming solo admite archivos .xlsx: un libro nuevo en modo "
+            "de solo escritura no puede guardarse como .xlsm"
+        )
+        
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    
+    # Desplazamiento hasta la celda inicial
+    for _ in range(start_row - 1):
+        ws.append([])
+    padding = [None] * (start_col - 1)
+    
+    headers = list(data[0].keys())
+    row_values = _row_values_getter(headers)
+    ws.append(padding + headers)
+    for row_data in data:
+        ws.append((*padding, *row_values(row_data)))
+        
+    save_workbook(wb, filepath)
+
 def write_data(
     filepath: str,
     sheet_name: str,
     data: List[Dict[str, Any]],
-    start_cell: str = "A1"
+    start_cell: str = "A1",
+    streaming: bool = False,
+    defer_save: bool = False
 ) -> Dict[str, Any]:
     """
     Escribe datos en una hoja de Excel.
@@ -181,6 +387,12 @@ def write_data(
         sheet_name: Nombre de la hoja
         data: Lista de diccionarios con los datos a escribir
         start_cell: Celda inicial donde comenzar a escribir
+        streaming: Si es True y el archivo .xlsx no existe, lo crea en modo de
+                   solo escritura para volcados grandes con memoria constante.
+                   No admite archivos .xlsm
+        defer_save: Si es True, deja el libro en memoria sin guardarlo hasta
+                    llamar a flush_workbook; hasta entonces las lecturas
+                    devuelven el contenido guardado en disco
         
     Returns:
         Diccionario con el resultado de la operación
@@ -192,43 +404,53 @@ def write_data(
         if not data:
             raise DataError("No se proporcionaron datos para escribir")
             
-        # Abrir el libro
-        wb = open_workbook(filepath, read_only=False)
+        # Validar celda inicial
+        start_coords = _parse_cell(start_cell)
+        if start_coords is None:
+            raise DataError(f"Formato de celda inicial inválido: {start_cell}")
+        start_row, start_col = start_coords
 
-        # Si la hoja no existe, crearla
-        if sheet_name not in wb.sheetnames:
-            wb.create_sheet(sheet_name)
+        # Libro nuevo en modo streaming: no hay nada que cargar
+        if streaming and not os.path.exists(filepath):
+            _write_streaming(filepath, sheet_name, data, start_row, start_col)
+            return {
+                "message": f"Datos escritos en {sheet_name}",
+                "rows_written": len(data)
+            }
+            
+        # Abrir el libro; si algo falla a medias, no se guarda nada
+        with writable_workbook(filepath) as wb:
+            # Si la hoja no existe, crearla
+            new_sheet = sheet_name not in wb.sheetnames
+            if new_sheet:
+                wb.create_sheet(sheet_name)
 
-        ws = wb[sheet_name]
+            ws = wb[sheet_name]
 
-        # Validar celda inicial
-        try:
-            start_coords = parse_cell_range(start_cell)
-            start_row, start_col = start_coords[0], start_coords[1]
-        except ValueError as e:
-            raise DataError(f"Formato de celda inicial inválido: {str(e)}")
-
-        # Escribir encabezados si hay datos
-        if len(data) > 0:
-            headers = list(data[0].keys())
+            # Escribir encabezados si hay datos
+            if len(data) > 0:
+                headers = list(data[0].keys())
+                row_values = _row_values_getter(headers)
             
-            # Escribir encabezados
-            for i, header in enumerate(headers):
-                col = start_col + i
-                cell = ws.cell(row=start_row, column=col)
-                cell.value = header
+                if new_sheet and start_row == 1 and start_col == 1:
+                    # Hoja recién creada escrita desde A1: añadir filas completas
+                    ws.append(headers)
+                    for row_data in data:
+                        ws.append(row_values(row_data))
+                else:
+                    cell = ws.cell
                 
-            # Escribir datos
-            for i, row_data in enumerate(data):
-                row = start_row + i + 1
-                for j, header in enumerate(headers):
-                    col = start_col + j
-                    cell = ws.cell(row=row, column=col)
-                    cell.value = row_data.get(header)
+                    # Escribir encabezados
+                    for col, header in enumerate(headers, start=start_col):
+                        cell(row=start_row, column=col).value = header
+                    
+                    # Escribir datos
+                    for row, row_data in enumerate(data, start=start_row + 1):
+                        for col, value in enumerate(row_values(row_data), start=start_col):
+                            cell(row=row, column=col).value = value
 
-        # Guardar y cerrar
-        wb.save(filepath)
-        wb.close()
+            # Guardar (o diferir el guardado); el libro se cierra al salir
+            commit_workbook(wb, filepath, defer=defer_save)
 
         return {
             "message": f"Datos escritos en {sheet_name}",
@@ -244,7 +466,9 @@ def write_data(
 def append_data(
     filepath: str,
     sheet_name: str,
-    data: List[Dict[str, Any]]
+    data: List[Dict[str, Any]],
+    streaming: bool = False,
+    defer_save: bool = False
 ) -> Dict[str, Any]:
     """
     Añade datos al final de una hoja de Excel existente.
@@ -253,6 +477,12 @@ def append_data(
         filepath: Ruta al archivo Excel
         sheet_name: Nombre de la hoja
         data: Lista de diccionarios con los datos a añadir
+        streaming: Si es True y el archivo .xlsx no existe, lo crea en modo de
+                   solo escritura con los encabezados y los datos. No admite
+                   archivos .xlsm
+        defer_save: Si es True, deja el libro en memoria sin guardarlo hasta
+                    llamar a flush_workbook; hasta entonces las lecturas
+                    devuelven el contenido guardado en disco
         
     Returns:
         Diccionario con el resultado de la operación
@@ -264,53 +494,68 @@ def append_data(
         if not data:
             raise DataError("No se proporcionaron datos para añadir")
             
-        # Abrir el libro
-        wb = open_workbook(filepath, read_only=False)
-
-        # Si la hoja no existe, crearla
-        if sheet_name not in wb.sheetnames:
-            wb.create_sheet(sheet_name)
+        # Libro nuevo en modo streaming: los datos comienzan tras los encabezados
+        if streaming and not os.path.exists(filepath):
+            _write_streaming(filepath, sheet_name, data)
+            return {
+                "message": f"Datos añadidos en {sheet_name}",
+                "rows_added": len(data),
+                "start_row": 2
+            }
+            
+        # Abrir el libro; si algo falla a medias, no se guarda nada
+        with writable_workbook(filepath) as wb:
+            # Si la hoja no existe, crearla
+            if sheet_name not in wb.sheetnames:
+                wb.create_sheet(sheet_name)
 
-        ws = wb[sheet_name]
+            ws = wb[sheet_name]
+        
+            # Encabezados existentes en la primera fila
+            existing_headers = list(next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ()))
         
-        # Encontrar la última fila con datos
-        last_row = 1
-        for row in range(1, ws.max_row + 1):
-            if any(ws.cell(row=row, column=col).value is not None for col in range(1, ws.max_column + 1)):
-                last_row = row
+            # Encontrar la última fila con datos partiendo de ws.max_row, descartando
+            # solo las filas finales sin valores (p. ej. celdas que únicamente tienen formato)
+            last_row = ws.max_row
+            while last_row > 1 and all(
+                v is None for v in next(ws.iter_rows(min_row=last_row, max_row=last_row, values_only=True))
+            ):
+                last_row -= 1
                 
-        # Si la hoja está vacía, escribir encabezados
-        if last_row == 1 and ws.max_column == 1 and ws.cell(row=1, column=1).value is None:
-            # Escribir encabezados
-            headers = list(data[0].keys())
-            for i, header in enumerate(headers):
-                col = i + 1
-                cell = ws.cell(row=1, column=col)
-                cell.value = header
+            # Si la hoja está vacía, escribir encabezados
+            if last_row == 1 and all(v is None for v in existing_headers):
+                # Escribir encabezados
+                headers = list(data[0].keys())
+                for i, header in enumerate(headers):
+                    col = i + 1
+                    cell = ws.cell(row=1, column=col)
+                    cell.value = header
                 
-            start_row = 2  # Comenzar a escribir datos en la fila 2
-        else:
-            # Verificar que los encabezados coinciden
-            existing_headers = [ws.cell(row=1, column=col).value for col in range(1, ws.max_column + 1)]
-            data_headers = list(data[0].keys())
+                start_row = 2  # Comenzar a escribir datos en la fila 2
+            else:
+                # Verificar que los encabezados coinciden
+                data_headers = list(data[0].keys())
             
-            # Si los encabezados no coinciden, mostrar advertencia
-            if set(existing_headers) != set(data_headers):
-                logger.warning("Los encabezados de los nuevos datos no coinciden con los existentes")
+                # Si los encabezados no coinciden, mostrar advertencia. La comparación
+                # directa de listas resuelve el caso habitual (mismo orden) sin crear conjuntos
+                if existing_headers != data_headers and set(existing_headers) != set(data_headers):
+                    logger.warning("Los encabezados de los nuevos datos no coinciden con los existentes")
             
-            start_row = last_row + 1
+                start_row = last_row + 1
             
-        # Escribir datos
-        for i, row_data in enumerate(data):
-            row = start_row + i
-            for j, header in enumerate(row_data.keys()):
-                col = j + 1
-                cell = ws.cell(row=row, column=col)
-                cell.value = row_data.get(header)
-
-        # Guardar y cerrar
-        wb.save(filepath)
-        wb.close()
+            # Escribir datos
+            if start_row == ws.max_row + 1:
+                # Las filas nuevas siguen a la última fila de la hoja: añadirlas completas
+                for row_data in data:
+                    ws.append(list(row_data.values()))
+            else:
+                cell = ws.cell
+                for row, row_data in enumerate(data, start=start_row):
+                    for col, value in enumerate(row_data.values(), start=1):
+                        cell(row=row, column=col).value = value
+
+            # Guardar (o diferir el guardado); el libro se cierra al salir
+            commit_workbook(wb, filepath, defer=defer_save)
 
         return {
             "message": f"Datos añadidos en {sheet_name}",
@@ -6,33 +6,1060 @@ de Excel, incluyendo formatos condicionales, estilos de celda, y otras caracter
 visuales.
 """
 
+import json
 import logging
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 from pathlib import Path
 import re
 import os
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from functools import lru_cache
 
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import (
     PatternFill, Border, Side, Alignment, Protection, Font,
     Color, NamedStyle, Fill
 )
+from openpyxl.formatting.formatting import ConditionalFormatting, ConditionalFormattingList
+from openpyxl.xml.functions import tostring
 from openpyxl.formatting.rule import (
     ColorScaleRule, DataBarRule, IconSetRule,
-    FormulaRule, CellIsRule
+    FormulaRule, CellIsRule,
+    Rule, ColorScale, DataBar, IconSet, FormatObject
 )
-from openpyxl.utils import get_column_letter, column_index_from_string
+from openpyxl.utils import get_column_letter, column_index_from_string, range_boundaries
+from openpyxl.worksheet.cell_range import CellRange
 from openpyxl.styles.differential import DifferentialStyle
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.styles.numbers import BUILTIN_FORMATS_MAX_SIZE, BUILTIN_FORMATS_REVERSE
 
 from xlsm_mcp.exceptions import ValidationError, FormattingError
-from xlsm_mcp.workbook import open_workbook
+from xlsm_mcp.workbook import (
+    writable_workbook, commit_workbook, replace_archive_member, has_pending_changes
+)
 from xlsm_mcp.validation import (
-    validate_file_path, validate_sheet_name, 
+    validate_file_path, stat_file, validate_sheet_name, 
     validate_cell_reference, validate_cell_range,
     validate_color
 )
 
 logger = logging.getLogger("xlsm-mcp")
 
+# Estilo predeterminado (todos los índices a cero) usado al eliminar formato
+_DEFAULT_STYLE_ARRAY = StyleArray()
+
+# Fuente que aplica format_range cuando no se pide ninguna propiedad de fuente:
+# sin negrita, cursiva ni subrayado, como Font(bold=False, italic=False)
+_PLAIN_FONT = Font()
+
+# Letras de columna (ej. "A", "BC")
+_COL_RE = re.compile(r'^[A-Za-z]+\Z')
+
+# Extensiones de los libros que aceptan las funciones de formato
+_EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+
+# Valores admitidos por format_range y create_named_style
+_BORDER_STYLES = ('thin', 'medium', 'thick', 'double', 'dashed', 'dotted')
+_VALID_BORDER_STYLES = frozenset(_BORDER_STYLES)
+_VALID_BORDER_STYLES_MSG = ', '.join(_BORDER_STYLES)
+
+_ALIGNMENTS = ('left', 'center', 'right', 'justify', 'general')
+_VALID_ALIGNMENTS = frozenset(_ALIGNMENTS)
+_VALID_ALIGNMENTS_MSG = ', '.join(_ALIGNMENTS)
+
+# Valores admitidos por add_conditional_formatting
+_RULE_TYPES = ('cell_is', 'formula', 'color_scale', 'data_bar', 'icon_set')
+_VALID_RULE_TYPES = frozenset(_RULE_TYPES)
+_VALID_RULE_TYPES_MSG = ", ".join(f"'{t}'" for t in _RULE_TYPES)
+
+_OPERATORS = ('between', 'not between', '>', '<', '>=', '<=', '=', '!=')
+_VALID_OPERATORS = frozenset(_OPERATORS)
+_VALID_OPERATORS_MSG = ", ".join(f"'{op}'" for op in _OPERATORS)
+
+_ICON_STYLES = (
+    '3_arrows', '3_arrows_gray', '3_flags', '3_traffic_lights', '3_signs', '3_symbols', '3_symbols_2',
+    '4_arrows', '4_arrows_gray', '4_ratings', '4_traffic_lights', '5_arrows', '5_arrows_gray', '5_ratings'
+)
+_VALID_ICON_STYLES = frozenset(_ICON_STYLES)
+# Nombre de cada estilo de iconos en el atributo iconSet de openpyxl
+_ICON_SET_NAMES = {
+    '3_arrows': '3Arrows', '3_arrows_gray': '3ArrowsGray', '3_flags': '3Flags',
+    '3_traffic_lights': '3TrafficLights1', '3_signs': '3Signs', '3_symbols': '3Symbols',
+    '3_symbols_2': '3Symbols2', '4_arrows': '4Arrows', '4_arrows_gray': '4ArrowsGray',
+    '4_ratings': '4Rating', '4_traffic_lights': '4TrafficLights', '5_arrows': '5Arrows',
+    '5_arrows_gray': '5ArrowsGray', '5_ratings': '5Rating'
+}
+_VALID_ICON_STYLES_MSG = ', '.join(_ICON_STYLES)
+
+# Referencias de celda, columna o fila en una fórmula de formato condicional,
+# con sus marcas '$' capturadas para distinguir las absolutas de las relativas
+_FORMULA_REF_RE = re.compile(
+    r'(?<![\w.$])(\$?)[A-Za-z]{1,3}(\$?)[0-9]+(?![\w(])'
+    r'|(?<![\w.$])(\$?)[A-Za-z]{1,3}:(\$?)[A-Za-z]{1,3}(?![\w(])'
+    r'|(?<![\w.$])(\$?)[0-9]+:(\$?)[0-9]+(?![\w(])'
+)
+_FORMULA_STRING_RE = re.compile(r'"[^"]*"')
+
+# Espacios de nombres de workbook.xml y de sus relaciones
+_SHEET_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_DOC_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Atributos de altura de una etiqueta <row>, para reescribirlos
+_ROW_HEIGHT_ATTR_RE = re.compile(rb"""\s(?:ht|customHeight)=(["'])[^"']*\1""")
+_ROW_HT_RE = re.compile(rb"""\sht=(["'])([^"']*)\1""")
+
+# Caracteres no permitidos en nombres de hoja
+_SHEET_NAME_FORBIDDEN = frozenset('/\\?*[]:')
+
+# Celda individual y rango de celdas para validate_cell_range
+_SINGLE_CELL_RE = re.compile(r'^[A-Za-z]{1,3}[1-9][0-9]{0,6}\Z')
+_CELL_RANGE_RE = re.compile(r'^([A-Za-z]{1,3})([1-9][0-9]{0,6}):([A-Za-z]{1,3})([1-9][0-9]{0,6})\Z')
+
+@lru_cache(maxsize=256)
+def _normalize_rgb(color: str) -> str:
+    """
+    Valida un color hexadecimal y lo devuelve como ARGB de 8 caracteres sin '#'.
+    
+    Los colores de 6 dígitos reciben el prefijo FF (opacidad completa).
+    """
+    rgb = validate_color(color)[1:]
+    return rgb if len(rgb) == 8 else f'FF{rgb}'
+
+@lru_cache(maxsize=256)
+def _cached_color(color: str) -> Color:
+    """Devuelve el objeto Color correspondiente a un color hexadecimal."""
+    return Color(rgb=_normalize_rgb(color))
+
+@lru_cache(maxsize=64)
+def _checked_path(filepath: str, file_extensions: Optional[Tuple[str, ...]]) -> Path:
+    """
+    Comprobaciones de validate_file_path que solo dependen de la cadena, con caché.
+    
+    Solo se guardan las validaciones correctas (lru_cache no guarda excepciones).
+    """
+    return validate_file_path(filepath, must_exist=False, file_extensions=file_extensions)
+
+def _validate_file_path_cached(
+    filepath: str,
+    must_exist: bool = True,
+    file_extensions: Optional[Tuple[str, ...]] = _EXCEL_EXTENSIONS
+) -> Path:
+    """
+    validate_file_path con caché para la parte que no depende del sistema de archivos.
+    
+    La existencia del archivo se comprueba en cada llamada: un archivo borrado
+    o renombrado no debe seguir pasando la validación, y una ruta relativa
+    apunta a otro archivo si cambia el directorio de trabajo.
+    """
+    path = _checked_path(filepath, file_extensions)
+    if must_exist:
+        stat_file(filepath)
+    return path
+
+def _optional_rgb(color: Optional[str]) -> Optional[str]:
+    """Normaliza un color opcional con _normalize_rgb; None se conserva."""
+    return None if color is None else _normalize_rgb(color)
+
+@lru_cache(maxsize=128)
+def _cached_border(border_style: str, border_color: Optional[str] = None) -> Border:
+    """
+    Devuelve un borde con el mismo estilo y color en los cuatro lados.
+    
+    Los cuatro lados comparten un único Side; sin color se usa negro opaco.
+    """
+    rgb = _normalize_rgb(border_color) if border_color else "FF000000"
+    side = Side(style=border_style, color=Color(rgb=rgb))
+    return Border(left=side, right=side, top=side, bottom=side)
+
+@lru_cache(maxsize=32)
+def _cached_alignment(horizontal: Optional[str], wrap_text: bool) -> Alignment:
+    """Devuelve la alineación para una combinación de horizontal y ajuste de texto."""
+    return Alignment(horizontal=horizontal, wrap_text=wrap_text)
+
+@lru_cache(maxsize=8)
+def _cached_protection(locked: bool = True, hidden: bool = False) -> Protection:
+    """Devuelve la protección para una combinación de bloqueo y ocultación."""
+    return Protection(locked=locked, hidden=hidden)
+
+def _apply_style_ids(
+    wb,
+    sheet,
+    bounds: Tuple[int, int, int, int],
+    font: Optional[Font] = None,
+    fill: Optional[Fill] = None,
+    border: Optional[Border] = None,
+    alignment: Optional[Alignment] = None,
+    number_format: Optional[str] = None,
+    protection: Optional[Protection] = None
+) -> None:
+    """
+    Asigna componentes de estilo a todas las celdas de un rango.
+    
+    Cada componente se registra una sola vez en las colecciones del libro
+    (wb._fonts, wb._fills, ...) y las celdas reciben directamente el StyleArray
+    con los índices resultantes, en lugar de pasar por los descriptores de
+    cell.font, cell.fill, etc., que repiten el registro en cada asignación.
+    Los componentes no indicados conservan el valor que tuviera cada celda.
+    
+    Args:
+        bounds: Límites numéricos del rango (min_col, min_row, max_col, max_row)
+    """
+    overrides = []
+    if font is not None:
+        overrides.append(("fontId", wb._fonts.add(font)))
+    if fill is not None:
+        overrides.append(("fillId", wb._fills.add(fill)))
+    if border is not None:
+        overrides.append(("borderId", wb._borders.add(border)))
+    if alignment is not None:
+        overrides.append(("alignmentId", wb._alignments.add(alignment)))
+    if protection is not None:
+        overrides.append(("protectionId", wb._protections.add(protection)))
+    if number_format is not None:
+        if number_format in BUILTIN_FORMATS_REVERSE:
+            fmt_id = BUILTIN_FORMATS_REVERSE[number_format]
+        else:
+            fmt_id = wb._number_formats.add(number_format) + BUILTIN_FORMATS_MAX_SIZE
+        overrides.append(("numFmtId", fmt_id))
+        
+    if not overrides:
+        return
+        
+    # Las celdas con el mismo estilo de partida comparten el estilo resultante;
+    # cada celda recibe su propia copia porque openpyxl modifica el StyleArray in situ.
+    # En rangos grandes este bucle domina el tiempo: la clave se obtiene con
+    # tobytes() (más barato que tuple()) y la copia con el constructor de
+    # StyleArray, que evita el despacho de copy.copy
+    resolved = {}
+    get_resolved = resolved.get
+    default_style = StyleArray()
+    min_col, min_row, max_col, max_row = bounds
+    for row in sheet.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
+        for cell in row:
+            # Las celdas leídas de archivo sin estilo tienen _style a None
+            current = cell._style or default_style
+            key = current.tobytes()
+            style_array = get_resolved(key)
+            if style_array is None:
+                style_array = StyleArray(current)
+                for attr, idx in overrides:
+                    setattr(style_array, attr, idx)
+                resolved[key] = style_array
+            cell._style = StyleArray(style_array)
+
+def _build_cell_range(start_cell: str, end_cell: Optional[str] = None) -> str:
+    """
+    Construye y valida la cadena de rango a partir de las celdas inicial y final.
+    
+    El rango se forma directamente a partir de las referencias, sin consultar
+    celdas de la hoja (sheet[ref] crearía la celda si no existe). Un rango de
+    una sola celda se devuelve como esa celda (ej. "A1").
+    """
+    # Si no se especificó celda final, usar la inicial
+    start = start_cell.upper()
+    end = end_cell.upper() if end_cell else start
+    
+    cell_range = start if start == end else f"{start}:{end}"
+    validate_cell_range(cell_range)
+    return cell_range
+
+def _build_style_components(
+    bold: bool = False,
+    italic: bool = False,
+    underline: bool = False,
+    font_size: Optional[int] = None,
+    font_color: Optional[str] = None,
+    bg_color: Optional[str] = None,
+    border_style: Optional[str] = None,
+    border_color: Optional[str] = None,
+    number_format: Optional[str] = None,
+    alignment: Optional[str] = None,
+    wrap_text: bool = False,
+    protection: Optional[Dict[str, Any]] = None
+) -> Tuple[Optional[Font], Optional[Fill], Optional[Border], Optional[Alignment], Optional[str], Optional[Protection]]:
+    """
+    Valida los argumentos de formato y construye los objetos de estilo.
+    
+    Returns:
+        Tupla (fuente, relleno, borde, alineación, formato numérico, protección);
+        los componentes no solicitados son None. Una fuente None indica que no
+        se pidió ninguna propiedad de fuente; format_range aplica entonces
+        _PLAIN_FONT
+        
+    Raises:
+        ValidationError: Si los valores proporcionados no son válidos
+        FormattingError: Si no se puede construir algún componente
+    """
+    # Aplicar formato de fuente
+    font_args = {
+        "bold": bold,
+        "italic": italic,
+        "underline": 'single' if underline else None,
+    }
+    if font_size is not None:
+        if not isinstance(font_size, int) or font_size <= 0:
+            raise ValidationError(f"Tamaño de fuente inválido: {font_size}")
+        font_args["size"] = font_size
+        
+    if font_color is not None:
+        try:
+            font_args["color"] = _cached_color(font_color)
+        except ValidationError as e:
+            raise
+        except Exception as e:
+            raise FormattingError(f"Color de fuente inválido: {str(e)}")
+            
+    # Solo se modifica la fuente si se pidió alguna de sus propiedades
+    font = Font(**font_args) if any(font_args.values()) else None
+    
+    # Aplicar relleno
+    fill = None
+    if bg_color is not None:
+        try:
+            bg = _cached_color(bg_color)
+            fill = PatternFill(
+                start_color=bg,
+                end_color=bg,
+                fill_type='solid'
+            )
+        except ValidationError as e:
+            raise
+        except Exception as e:
+            raise FormattingError(f"Color de fondo inválido: {str(e)}")
+    
+    # Aplicar bordes
+    border = None
+    if border_style is not None:
+        if border_style not in _VALID_BORDER_STYLES:
+            raise ValidationError(
+                f"Estilo de borde inválido: {border_style}. "
+                f"Valores válidos: {_VALID_BORDER_STYLES_MSG}"
+            )
+        
+        try:
+            border = _cached_border(border_style, border_color or None)
+        except ValidationError as e:
+            raise
+        except Exception as e:
+            raise FormattingError(f"Error al definir borde: {str(e)}")
+    
+    # Aplicar alineación
+    alignment_obj = None
+    if alignment is not None or wrap_text:
+        if alignment is not None:
+            if alignment not in _VALID_ALIGNMENTS:
+                raise ValidationError(
+                    f"Alineación inválida: {alignment}. "
+                    f"Valores válidos: {_VALID_ALIGNMENTS_MSG}"
+                )
+        alignment_obj = _cached_alignment(alignment, bool(wrap_text))
+        
+    # Aplicar formato numérico
+    number_format_str = number_format
+    
+    # Aplicar protección
+    protection_obj = None
+    if protection is not None:
+        protection_args = {}
+        if "locked" in protection:
+            protection_args["locked"] = bool(protection["locked"])
+        if "hidden" in protection:
+            protection_args["hidden"] = bool(protection["hidden"])
+        protection_obj = _cached_protection(**protection_args)
+    
+    return font, fill, border, alignment_obj, number_format_str, protection_obj
+
+def _prepare_format_range(
+    start_cell: str,
+    end_cell: Optional[str] = None,
+    merge_cells: bool = False,
+    **style_args: Any
+) -> Tuple[str, Tuple[int, int, int, int], bool, Tuple[Any, ...]]:
+    """
+    Valida el rango y los argumentos de formato sin necesidad del libro.
+    
+    Permite rechazar argumentos inválidos antes de pagar el coste de abrir el archivo.
+    El rango se analiza aquí una sola vez; el resto de la operación trabaja con
+    los límites numéricos.
+    
+    Returns:
+        Tupla (rango normalizado, límites (min_col, min_row, max_col, max_row),
+        si combinar celdas, componentes de estilo)
+    """
+    cell_range = _build_cell_range(start_cell, end_cell)
+    bounds = range_boundaries(cell_range)
+    
+    components = _build_style_components(**style_args)
+    return cell_range, bounds, merge_cells and ':' in cell_range, components
+
+def _apply_prepared_format(
+    wb,
+    sheet,
+    bounds: Tuple[int, int, int, int],
+    merge: bool,
+    components: Tuple[Any, ...]
+) -> bool:
+    """
+    Aplica a una hoja abierta un formato ya validado por _prepare_format_range.
+    
+    Returns:
+        True si el libro se ha modificado
+    """
+    font, fill, border, alignment_obj, number_format_str, protection_obj = components
+    
+    # Si no se pidió nada, el libro no cambia
+    if all(c is None for c in components) and not merge:
+        return False
+    
+    # Si se pidió algún formato pero ninguna propiedad de fuente, la fuente se
+    # restablece igualmente (sin negrita, cursiva ni subrayado)
+    if font is None:
+        font = _PLAIN_FONT
+    
+    # Aplicar formatos a todas las celdas del rango
+    _apply_style_ids(
+        wb, sheet, bounds,
+        font=font,
+        fill=fill,
+        border=border,
+        alignment=alignment_obj,
+        number_format=number_format_str,
+        protection=protection_obj
+    )
+    
+    # Combinar celdas si se solicita
+    if merge:
+        min_col, min_row, max_col, max_row = bounds
+        sheet.merge_cells(
+            start_row=min_row,
+            start_column=min_col,
+            end_row=max_row,
+            end_column=max_col
+        )
+    
+    return True
+
+def _apply_format_range(
+    wb,
+    sheet,
+    start_cell: str,
+    end_cell: Optional[str] = None,
+    bold: bool = False,
+    italic: bool = False,
+    underline: bool = False,
+    font_size: Optional[int] = None,
+    font_color: Optional[str] = None,
+    bg_color: Optional[str] = None,
+    border_style: Optional[str] = None,
+    border_color: Optional[str] = None,
+    number_format: Optional[str] = None,
+    alignment: Optional[str] = None,
+    wrap_text: bool = False,
+    merge_cells: bool = False,
+    protection: Optional[Dict[str, Any]] = None
+) -> bool:
+    """
+    Aplica formato a un rango de una hoja ya abierta, sin guardar el libro.
+    
+    Los argumentos son los de format_range.
+    
+    Returns:
+        True si el libro se ha modificado
+    """
+    _, bounds, merge, components = _prepare_format_range(
+        start_cell, end_cell, merge_cells,
+        bold=bold,
+        italic=italic,
+        underline=underline,
+        font_size=font_size,
+        font_color=font_color,
+        bg_color=bg_color,
+        border_style=border_style,
+        border_color=border_color,
+        number_format=number_format,
+        alignment=alignment,
+        wrap_text=wrap_text,
+        protection=protection
+    )
+    return _apply_prepared_format(wb, sheet, bounds, merge, components)
+
+def _clear_range(sheet, bounds: Tuple[int, int, int, int]) -> None:
+    """Restablece el formato de las celdas dentro de bounds (min_col, min_row, max_col, max_row)."""
+    # Un StyleArray a cero apunta a la fuente, relleno, borde, alineación y
+    # protección predeterminados del libro y al formato "General"
+    min_col, min_row, max_col, max_row = bounds
+    for row in sheet.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
+        for cell in row:
+            cell._style = StyleArray(_DEFAULT_STYLE_ARRAY)
+
+def _apply_clear_formatting(wb, sheet, start_cell: str, end_cell: Optional[str] = None) -> bool:
+    """
+    Elimina el formato de un rango de una hoja ya abierta, sin guardar el libro.
+    
+    Returns:
+        True (restablecer el formato siempre modifica el libro)
+    """
+    _clear_range(sheet, range_boundaries(_build_cell_range(start_cell, end_cell)))
+    return True
+
+def _apply_named_style(wb, sheet, cell_range: str, style_name: str) -> bool:
+    """
+    Aplica un estilo con nombre a un rango de una hoja ya abierta, sin guardar el libro.
+    
+    Returns:
+        True si alguna celda no tenía ya el estilo
+    """
+    # Resolver el estilo una sola vez: cell.style recorre la lista de nombres de
+    # estilos del libro en cada lectura y asignación. Una única búsqueda por
+    # índice sirve a la vez para comprobar que el estilo existe
+    validate_cell_range(cell_range)
+    named_styles = wb._named_styles
+    try:
+        target = named_styles[named_styles.names.index(style_name)].as_tuple()
+    except ValueError:
+        raise ValidationError(f"El estilo '{style_name}' no existe en el libro")
+    
+    # Aplicar estilo a las celdas que aún no lo tienen, recorriendo el rango con
+    # un generador en lugar de materializar la tupla de sheet[cell_range]. Se
+    # compara el StyleArray completo y no solo xfId, para restablecer también
+    # las celdas con el estilo pero con formato propio encima
+    dirty = False
+    min_col, min_row, max_col, max_row = range_boundaries(cell_range)
+    for row in sheet.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
+        for cell in row:
+            if cell._style != target:
+                cell._style = StyleArray(target)
+                dirty = True
+    return dirty
+
+@lru_cache(maxsize=512)
+def _cached_color_scale(values: Tuple, colors: Tuple[str, ...]) -> ColorScale:
+    """
+    Crea (con caché) la escala de colores de una regla 'color_scale'.
+    
+    Los valores de texto ('min', 'max', ...) son tipos de umbral, salvo los
+    textos numéricos ('50'), que son percentiles; los números son umbrales de
+    tipo 'num'.
+    """
+    cfvo = []
+    for v in values:
+        if not isinstance(v, str):
+            cfvo.append(FormatObject(type='num', val=v))
+        elif v.replace('.', '', 1).isdigit():
+            cfvo.append(FormatObject(type='percentile', val=float(v)))
+        else:
+            cfvo.append(FormatObject(type=v))
+    return ColorScale(cfvo=cfvo, color=[Color(c) for c in colors])
+
+@lru_cache(maxsize=512)
+def _cached_data_bar(color: str) -> DataBar:
+    """Crea (con caché) la barra de datos de una regla 'data_bar'."""
+    return DataBar(
+        cfvo=[FormatObject(type='min'), FormatObject(type='max')],
+        color=color,
+        showValue=True
+    )
+
+@lru_cache(maxsize=512)
+def _cached_icon_set(icon_style: str, values: Tuple) -> IconSet:
+    """Crea (con caché) el conjunto de iconos de una regla 'icon_set'."""
+    return IconSet(
+        iconSet=_ICON_SET_NAMES[icon_style],
+        cfvo=[FormatObject(type='percent', val=v) for v in values],
+        showValue=True,
+        reverse=False
+    )
+
+def _build_conditional_rule(
+    cell_range: str,
+    rule_type: str,
+    formula: str = None,
+    operator: str = None,
+    values: List[Any] = None,
+    styles: Dict[str, Any] = None,
+    colors: List[str] = None,
+    icon_style: str = None,
+    stopif_true: bool = False
+):
+    """
+    Valida los argumentos de add_conditional_formatting y construye la regla.
+    
+    No necesita el libro, de modo que los argumentos inválidos se rechazan
+    antes de abrir el archivo.
+    
+    Returns:
+        Regla de formato condicional de openpyxl
+    """
+    # Validar rango de celdas
+    validate_cell_range(cell_range)
+    
+    # Validar tipo de regla
+    if rule_type not in _VALID_RULE_TYPES:
+        raise ValidationError(f"Tipo de regla inválido: '{rule_type}'. Debe ser uno de: {_VALID_RULE_TYPES_MSG}")
+    
+    # Validar operador para 'cell_is'
+    if rule_type == 'cell_is' and operator:
+        if operator not in _VALID_OPERATORS:
+            raise ValidationError(f"Operador inválido: '{operator}'. Debe ser uno de: {_VALID_OPERATORS_MSG}")
+    
+    # Crear la regla de formato condicional según el tipo
+    rule = None
+    
+    if rule_type == 'cell_is':
+        if not operator:
+            raise ValidationError("Se requiere un operador para el tipo de regla 'cell_is'")
+        if not values:
+            raise ValidationError("Se requieren valores para el tipo de regla 'cell_is'")
+        
+        # Crear estilo diferencial
+        dxf = None
+        if styles:
+            dxf = _create_differential_style(styles)
+        
+        # CellIsRule no acepta dxf; el estilo diferencial se asigna a la regla
+        rule = CellIsRule(
+            operator=operator,
+            formula=values if isinstance(values, list) else [values],
+            stopIfTrue=stopif_true
+        )
+        if dxf is not None:
+            rule.dxf = dxf
+        
+    elif rule_type == 'formula':
+        if not formula:
+            raise ValidationError("Se requiere una fórmula para el tipo de regla 'formula'")
+        
+        # Crear estilo diferencial
+        dxf = None
+        if styles:
+            dxf = _create_differential_style(styles)
+        
+        rule = FormulaRule(
+            formula=[formula],
+            stopIfTrue=stopif_true
+        )
+        if dxf is not None:
+            rule.dxf = dxf
+        
+    elif rule_type == 'color_scale':
+        if not colors or len(colors) < 2:
+            raise ValidationError("Se requieren al menos 2 colores para el tipo de regla 'color_scale'")
+        
+        # Valores por defecto si no se proporcionan
+        if not values:
+            if len(colors) == 2:
+                values = ['min', 'max']
+            elif len(colors) == 3:
+                values = ['min', '50', 'max']
+            else:
+                raise ValidationError("Para 'color_scale' con más de 3 colores, se deben proporcionar valores explícitamente")
+        
+        if len(values) != len(colors):
+            raise ValidationError(f"La cantidad de valores ({len(values)}) debe coincidir con la cantidad de colores ({len(colors)})")
+        
+        # Inicio, punto medio (si hay 3 o más colores) y fin de la escala
+        points = (0, 1, -1) if len(colors) > 2 else (0, -1)
+        
+        # Las reglas se modifican al añadirlas (prioridad, dxfId), así que cada
+        # llamada crea su propio Rule; solo se comparte la escala, que no cambia
+        rule = Rule(
+            type='colorScale',
+            colorScale=_cached_color_scale(
+                tuple(values[i] for i in points),
+                tuple(_normalize_rgb(colors[i]) for i in points)
+            )
+        )
+        
+    elif rule_type == 'data_bar':
+        if not colors:
+            raise ValidationError("Se requiere al menos un color para el tipo de regla 'data_bar'")
+        
+        color = _normalize_rgb(colors[0] if isinstance(colors, list) else colors)
+        
+        rule = Rule(type='dataBar', dataBar=_cached_data_bar(color))
+        
+    elif rule_type == 'icon_set':
+        if not icon_style:
+            raise ValidationError("Se requiere un estilo de iconos para el tipo de regla 'icon_set'")
+        
+        if icon_style not in _VALID_ICON_STYLES:
+            raise ValidationError(f"Estilo de iconos inválido: '{icon_style}'. Debe ser uno de: {_VALID_ICON_STYLES_MSG}")
+        
+        # Determinar cuántos valores necesitamos según el estilo
+        icon_count = int(icon_style[0])
+        
+        # Valores por defecto si no se proporcionan
+        if not values:
+            if icon_count == 3:
+                values = [0, 33, 67]
+            elif icon_count == 4:
+                values = [0, 25, 50, 75]
+            elif icon_count == 5:
+                values = [0, 20, 40, 60, 80]
+        
+        if len(values) != icon_count:
+            raise ValidationError(f"Se requieren {icon_count} valores para el estilo de iconos '{icon_style}'")
+        
+        rule = Rule(type='iconSet', iconSet=_cached_icon_set(icon_style, tuple(values)))
+    
+    return rule
+
+def _add_conditional_rule(ws, cell_range: str, rule, priority: Optional[int] = 1) -> None:
+    """Añade una regla ya construida a una hoja abierta, sin guardar el libro."""
+    # Registrar el estilo diferencial en la lista del libro, que ya elimina
+    # duplicados, y usar su instancia: las reglas con el mismo estilo (incluidas
+    # las que ya traía el archivo) comparten así una única entrada <dxf>
+    if rule.dxf is not None:
+        dxf_styles = ws.parent._differential_styles
+        rule.dxfId = dxf_styles.add(rule.dxf)
+        rule.dxf = dxf_styles[rule.dxfId]
+    
+    # Agregar la regla a la hoja
+    ws.conditional_formatting.add(cell_range, rule)
+    
+    # Establecer prioridad si se especifica. add() añade el propio objeto a la
+    # lista del rango, así que basta con modificarlo sin buscarlo comparando
+    # reglas (la igualdad entre objetos de openpyxl es costosa)
+    if priority is not None and priority > 0:
+        rule.priority = priority
+
+def _apply_conditional_rule(
+    wb,
+    sheet,
+    cell_range: str,
+    rule_type: str,
+    formula: str = None,
+    operator: str = None,
+    values: List[Any] = None,
+    styles: Dict[str, Any] = None,
+    colors: List[str] = None,
+    icon_style: str = None,
+    stopif_true: bool = False,
+    priority: int = 1
+) -> bool:
+    """
+    Aplica formato condicional a un rango de una hoja ya abierta, sin guardar el libro.
+    
+    Los argumentos son los de add_conditional_formatting.
+    
+    Returns:
+        True (añadir una regla siempre modifica el libro)
+    """
+    rule = _build_conditional_rule(
+        cell_range, rule_type,
+        formula=formula,
+        operator=operator,
+        values=values,
+        styles=styles,
+        colors=colors,
+        icon_style=icon_style,
+        stopif_true=stopif_true
+    )
+    _add_conditional_rule(sheet, cell_range, rule, priority)
+    return True
+
+def _apply_remove_conditional_formatting(wb, sheet, cell_range: Optional[str] = None) -> bool:
+    """
+    Elimina formato condicional de una hoja ya abierta, sin guardar el libro.
+    
+    Args:
+        cell_range: Rango a limpiar; si es None, se limpia toda la hoja
+        
+    Returns:
+        True si se eliminó alguna regla
+    """
+    if cell_range:
+        # Eliminar formato condicional solo del rango especificado. La lista de
+        # formatos condicionales está indexada por rango: se borra por clave en
+        # lugar de recorrer todos los rangos de la hoja
+        try:
+            del sheet.conditional_formatting[cell_range]
+        except KeyError:
+            return False
+    else:
+        # Eliminar todo el formato condicional de la hoja, conservando el tipo
+        # de contenedor que openpyxl espera al añadir reglas y al guardar
+        if not sheet.conditional_formatting:
+            return False
+        sheet.conditional_formatting = ConditionalFormattingList()
+    return True
+
+def _has_relative_refs(formulas) -> bool:
+    """Indica si alguna fórmula contiene referencias relativas (sin '$' en fila o columna)."""
+    for formula in formulas:
+        for match in _FORMULA_REF_RE.finditer(_FORMULA_STRING_RE.sub('', formula)):
+            marks = [m for m in match.groups() if m is not None]
+            if '' in marks:
+                return True
+    return False
+
+def _rule_merge_key(rule) -> Optional[bytes]:
+    """
+    Clave de una regla para fusionar rangos con el mismo formato condicional.
+    
+    Incluye el XML de la regla sin su prioridad y el estilo diferencial.
+    Devuelve None si la regla no puede compartirse entre rangos: las
+    referencias relativas de sus fórmulas se interpretan respecto a la
+    esquina superior izquierda del rango, así que cambiarían de sentido.
+    """
+    if rule.formula and _has_relative_refs(rule.formula):
+        return None
+    tree = rule.to_tree()
+    tree.attrib.pop('priority', None)
+    if rule.dxfId is not None:
+        dxf_key = str(rule.dxfId).encode()
+    elif rule.dxf is not None:
+        dxf_key = tostring(rule.dxf.to_tree())
+    else:
+        dxf_key = b''
+    return tostring(tree) + b'|' + dxf_key
+
+def _merge_rectangles(rects: List[Tuple[int, int, int, int]]) -> List[Tuple[int, int, int, int]]:
+    """
+    Fusiona rectángulos (min_col, min_row, max_col, max_row) contiguos.
+    
+    Alterna pasadas verticales (mismas columnas, filas consecutivas o
+    solapadas) y horizontales (mismas filas, columnas consecutivas) hasta que
+    ninguna reduce el número de rectángulos.
+    """
+    rects = sorted(set(rects))
+    while True:
+        count = len(rects)
+        for vertical in (True, False):
+            if vertical:
+                rects.sort(key=lambda r: (r[0], r[2], r[1]))
+            else:
+                rects.sort(key=lambda r: (r[1], r[3], r[0]))
+            merged = [rects[0]]
+            for rect in rects[1:]:
+                last = merged[-1]
+                if vertical and rect[0] == last[0] and rect[2] == last[2] and rect[1] <= last[3] + 1:
+                    merged[-1] = (last[0], last[1], last[2], max(last[3], rect[3]))
+                elif not vertical and rect[1] == last[1] and rect[3] == last[3] and rect[0] <= last[2] + 1:
+                    merged[-1] = (last[0], last[1], max(last[2], rect[2]), last[3])
+                else:
+                    merged.append(rect)
+            rects = merged
+        if len(rects) == count:
+            return rects
+
+def _rects_intersect(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> bool:
+    """Indica si dos rectángulos (min_col, min_row, max_col, max_row) se solapan."""
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+def _merge_conditional_formatting(sheet, existing: Iterable[ConditionalFormatting] = ()) -> int:
+    """
+    Fusiona los rangos nuevos de una hoja que tienen exactamente las mismas reglas.
+    
+    Añadir el mismo formato condicional celda a celda o fila a fila genera un
+    bloque <conditionalFormatting> por rango, que Excel procesa muy despacio al
+    abrir el archivo. Los rangos con reglas idénticas se agrupan en un único
+    bloque cuyos rangos contiguos se fusionan en rectángulos. La prioridad de
+    cada regla fusionada es la menor del grupo.
+    
+    Los bloques de existing (los que la hoja ya tenía antes del lote) se
+    conservan tal cual, para que sigan pudiendo eliminarse por su rango. Un
+    grupo tampoco se fusiona si alguno de sus rangos se solapa con rangos de
+    otras reglas, ya que su orden de evaluación podría cambiar.
+    
+    Args:
+        sheet: Hoja abierta
+        existing: Bloques que la hoja tenía antes de añadir las reglas nuevas
+    
+    Returns:
+        Número de bloques eliminados
+    """
+    cf_list = sheet.conditional_formatting
+    if len(cf_list) < 2:
+        return 0
+        
+    # Agrupar los bloques nuevos por el contenido de sus reglas, conservando el
+    # orden; cada bloque existente forma un grupo propio
+    existing_ids = {id(cf) for cf in existing}
+    groups: Dict[Tuple, List] = {}
+    for cf in cf_list:
+        keys = None
+        if id(cf) not in existing_ids:
+            keys = tuple(_rule_merge_key(rule) for rule in cf.rules)
+        if not keys or None in keys:
+            keys = (id(cf),)
+        groups.setdefault(keys, []).append(cf)
+    if len(groups) == len(cf_list):
+        return 0
+        
+    # Rectángulos de cada grupo
+    group_rects = {
+        keys: [cell_range.bounds for cf in cfs for cell_range in cf.sqref.ranges]
+        for keys, cfs in groups.items()
+    }
+    
+    group_boxes = {
+        keys: (min(r[0] for r in rects), min(r[1] for r in rects),
+               max(r[2] for r in rects), max(r[3] for r in rects))
+        for keys, rects in group_rects.items()
+    }
+    
+    def overlaps_other_groups(keys) -> bool:
+        box = group_boxes[keys]
+        for other, other_rects in group_rects.items():
+            if other == keys or not _rects_intersect(box, group_boxes[other]):
+                continue
+            if any(_rects_intersect(a, b) for a in group_rects[keys] for b in other_rects):
+                return True
+        return False
+    
+    merged_list = ConditionalFormattingList()
+    for keys, cfs in groups.items():
+        if len(cfs) == 1 or overlaps_other_groups(keys):
+            # Conservar los bloques tal cual
+            for cf in cfs:
+                for rule in cf.rules:
+                    merged_list.add(cf, rule)
+            continue
+            
+        sqref = " ".join(
+            CellRange(min_col=r[0], min_row=r[1], max_col=r[2], max_row=r[3]).coord
+            for r in _merge_rectangles(group_rects[keys])
+        )
+        for position, rule in enumerate(cfs[0].rules):
+            rule.priority = min(cf.rules[position].priority or 0 for cf in cfs) or None
+            merged_list.add(sqref, rule)
+            
+    merged_list.max_priority = max(cf_list.max_priority, merged_list.max_priority)
+    sheet.conditional_formatting = merged_list
+    return len(cf_list) - len(merged_list)
+
+def _validate_column_width(column: str, width: float) -> None:
+    """Valida la letra de columna y el ancho de set_column_width."""
+    # str.isalpha descarta la mayoría de valores inválidos sin pasar por la
+    # expresión regular, que además excluye letras no ASCII
+    if not column.isalpha() or not _COL_RE.match(column):
+        raise ValidationError(f"Referencia de columna inválida: {column}")
+        
+    # Asegurar que el ancho es positivo
+    if width <= 0:
+        raise ValidationError("El ancho debe ser un valor positivo")
+
+def _apply_column_width(wb, sheet, column: str, width: float) -> bool:
+    """
+    Establece el ancho de una columna de una hoja ya abierta, sin guardar el libro.
+    
+    Returns:
+        True si el ancho ha cambiado
+    """
+    _validate_column_width(column, width)
+    current = sheet.column_dimensions.get(column.upper())
+    if current is not None and current.width == width:
+        return False
+    sheet.column_dimensions[column.upper()].width = width
+    return True
+
+def _validate_row_height(row: int, height: float) -> None:
+    """Valida el número de fila y la altura de set_row_height."""
+    if row <= 0:
+        raise ValidationError("El número de fila debe ser positivo")
+        
+    # Asegurar que la altura es positiva
+    if height <= 0:
+        raise ValidationError("La altura debe ser un valor positivo")
+
+def _find_worksheet_member(archive: zipfile.ZipFile, sheet_name: str) -> Optional[str]:
+    """
+    Busca en el ZIP la parte XML de una hoja de cálculo a partir de su nombre.
+    
+    Returns:
+        Nombre de la parte (ej. "xl/worksheets/sheet1.xml") o None si la hoja
+        no existe o no es una hoja de cálculo normal
+    """
+    workbook_xml = ET.fromstring(archive.read("xl/workbook.xml"))
+    rel_id = None
+    for sheet in workbook_xml.iter(f"{_SHEET_MAIN_NS}sheet"):
+        if sheet.get("name") == sheet_name:
+            rel_id = sheet.get(f"{_DOC_REL_NS}id")
+            break
+    if rel_id is None:
+        return None
+        
+    rels_xml = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels_xml.iter(f"{_PKG_REL_NS}Relationship"):
+        if rel.get("Id") == rel_id:
+            if not rel.get("Type", "").endswith("/worksheet"):
+                return None
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    return None
+
+def _quick_patch_row_height(file_path: str, sheet_name: str, row: int, height: float,
+                            fast_save: bool = False) -> Optional[bool]:
+    """
+    Cambia la altura de una fila editando directamente el XML de la hoja.
+    
+    Evita cargar el libro completo con openpyxl (estilos, cadenas compartidas y
+    todas las celdas) para modificar un único atributo: solo se lee la parte de
+    la hoja y se sustituye la etiqueta <row> correspondiente.
+    
+    Returns:
+        True si se cambió la altura, False si ya tenía ese valor, o None si el
+        archivo no admite esta vía (hoja inexistente o especial, fila sin
+        etiqueta <row> propia, cambios diferidos pendientes...) y debe usarse
+        openpyxl
+    """
+    if has_pending_changes(file_path):
+        return None
+        
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            member = _find_worksheet_member(archive, sheet_name)
+            if member is None:
+                return None
+            xml = archive.read(member)
+    except (KeyError, ET.ParseError, zipfile.BadZipFile):
+        return None
+        
+    row_re = re.compile(rb"""<row\b[^>]*?\sr=(["'])%d\1[^>]*?>""" % row)
+    match = row_re.search(xml)
+    if match is None:
+        return None
+        
+    tag = match.group(0)
+    current = _ROW_HT_RE.search(tag)
+    if current is not None:
+        try:
+            if float(current.group(2)) == height:
+                return False
+        except ValueError:
+            return None
+            
+    # Quitar los atributos de altura anteriores y añadir los nuevos al final
+    closing = b"/>" if tag.endswith(b"/>") else b">"
+    attrs = _ROW_HEIGHT_ATTR_RE.sub(b"", tag[:-len(closing)])
+    new_tag = attrs + b' ht="%s" customHeight="1"' % repr(float(height)).encode() + closing
+    
+    replace_archive_member(
+        file_path, member, xml[:match.start()] + new_tag + xml[match.end():], fast_save
+    )
+    return True
+
+def _apply_row_height(wb, sheet, row: int, height: float) -> bool:
+    """
+    Establece la altura de una fila de una hoja ya abierta, sin guardar el libro.
+    
+    Returns:
+        True si la altura ha cambiado
+    """
+    _validate_row_height(row, height)
+    current = sheet.row_dimensions.get(row)
+    if current is not None and current.height == height:
+        return False
+    sheet.row_dimensions[row].height = height
+    return True
+
 def format_range(
     filepath: Union[str, Path],
     sheet_name: str,
@@ -50,7 +1077,8 @@ def format_range(
     alignment: Optional[str] = None,
     wrap_text: bool = False,
     merge_cells: bool = False,
-    protection: Optional[Dict[str, Any]] = None
+    protection: Optional[Dict[str, Any]] = None,
+    fast_save: bool = False
 ) -> Dict[str, Any]:
     """
     Aplica formato a un rango de celdas.
@@ -82,6 +1110,7 @@ def format_range(
         wrap_text: Si ajustar texto
         merge_cells: Si combinar el rango
         protection: Configuración de protección de celdas
+        fast_save: Si es True, guarda con compresión rápida (ver save_workbook)
         
     Returns:
         Diccionario con estado de la operación
@@ -112,155 +1141,46 @@ def format_range(
     """
     try:
         # Validar ruta de archivo
-        file_path = validate_file_path(filepath, must_exist=True, 
-                                      file_extensions=['.xlsx', '.xlsm'])
-            
-        # Abrir el libro
-        wb = open_workbook(file_path, read_only=False)
+        file_path = _validate_file_path_cached(str(filepath), True, _EXCEL_EXTENSIONS)
         
         # Validar nombre de hoja
         validate_sheet_name(sheet_name)
         
-        # Verificar que la hoja existe
-        if sheet_name not in wb.sheetnames:
-            raise ValidationError(f"La hoja '{sheet_name}' no existe")
-            
-        sheet = wb[sheet_name]
-        
-        # Validar referencias de celda
-        start, end = validate_cell_range(start_cell, end_cell)
-        
-        # Si no se especificó celda final, usar la inicial
-        if end is None:
-            end = start
-            
-        # Convertir referencias de celda a coordenadas
-        start_coord = sheet[start].coordinate
-        end_coord = sheet[end].coordinate
-        
-        # Definir el rango de celdas
-        cell_range = f"{start_coord}:{end_coord}"
-            
-        # Aplicar formato de fuente
-        font_args = {
-            "bold": bold,
-            "italic": italic,
-            "underline": 'single' if underline else None,
-        }
-        if font_size is not None:
-            if not isinstance(font_size, int) or font_size <= 0:
-                raise ValidationError(f"Tamaño de fuente inválido: {font_size}")
-            font_args["size"] = font_size
-            
-        if font_color is not None:
-            try:
-                font_color = validate_color(font_color)
-                # Convertir a formato RGB sin #
-                rgb = font_color[1:] 
-                # Asegurar que el color tiene prefijo FF para opacidad completa
-                rgb = rgb if len(rgb) == 8 else f'FF{rgb}'
-                font_args["color"] = Color(rgb=rgb)
-            except ValidationError as e:
-                raise
-            except Exception as e:
-                raise FormattingError(f"Color de fuente inválido: {str(e)}")
-                
-        font = Font(**font_args)
-        
-        # Aplicar relleno
-        fill = None
-        if bg_color is not None:
-            try:
-                bg_color = validate_color(bg_color)
-                # Convertir a formato RGB sin #
-                rgb = bg_color[1:]
-                # Asegurar que el color tiene prefijo FF para opacidad completa
-                rgb = rgb if len(rgb) == 8 else f'FF{rgb}'
-                fill = PatternFill(
-                    start_color=Color(rgb=rgb),
-                    end_color=Color(rgb=rgb),
-                    fill_type='solid'
-                )
-            except ValidationError as e:
-                raise
-            except Exception as e:
-                raise FormattingError(f"Color de fondo inválido: {str(e)}")
-        
-        # Aplicar bordes
-        border = None
-        if border_style is not None:
-            valid_styles = {'thin', 'medium', 'thick', 'double', 'dashed', 'dotted'}
-            if border_style not in valid_styles:
-                raise ValidationError(
-                    f"Estilo de borde inválido: {border_style}. "
-                    f"Valores válidos: {', '.join(valid_styles)}"
-                )
+        # Validar rango y argumentos de formato antes de abrir el libro
+        cell_range, bounds, merge, components = _prepare_format_range(
+            start_cell, end_cell, merge_cells,
+            bold=bold,
+            italic=italic,
+            underline=underline,
+            font_size=font_size,
+            font_color=font_color,
+            bg_color=bg_color,
+            border_style=border_style,
+            border_color=border_color,
+            number_format=number_format,
+            alignment=alignment,
+            wrap_text=wrap_text,
+            protection=protection
+        )
             
+        # Abrir el libro
+        with writable_workbook(file_path) as wb:
+            # Verificar que la hoja existe
             try:
-                border_color_hex = "#000000"  # Negro por defecto
-                if border_color:
-                    border_color_hex = validate_color(border_color)
-                    rgb = border_color_hex[1:]
-                    rgb = rgb if len(rgb) == 8 else f'FF{rgb}'
-                else:
-                    rgb = "FF000000"  # Negro opaco
-                    
-                side = Side(style=border_style, color=Color(rgb=rgb))
-                border = Border(left=side, right=side, top=side, bottom=side)
-            except ValidationError as e:
-                raise
-            except Exception as e:
-                raise FormattingError(f"Error al definir borde: {str(e)}")
-        
-        # Aplicar alineación
-        alignment_obj = None
-        if alignment is not None or wrap_text:
-            align_args = {"wrap_text": wrap_text}
-            if alignment is not None:
-                valid_alignments = {'left', 'center', 'right', 'justify', 'general'}
-                if alignment not in valid_alignments:
-                    raise ValidationError(
-                        f"Alineación inválida: {alignment}. "
-                        f"Valores válidos: {', '.join(valid_alignments)}"
-                    )
-                align_args["horizontal"] = alignment
-            alignment_obj = Alignment(**align_args)
-            
-        # Aplicar formato numérico
-        number_format_str = number_format
-        
-        # Aplicar protección
-        protection_obj = None
-        if protection is not None:
-            protection_args = {}
-            if "locked" in protection:
-                protection_args["locked"] = bool(protection["locked"])
-            if "hidden" in protection:
-                protection_args["hidden"] = bool(protection["hidden"])
-            protection_obj = Protection(**protection_args)
-        
-        # Aplicar formatos a todas las celdas del rango
-        for row in sheet[cell_range]:
-            for cell in row:
-                if font is not None:
-                    cell.font = font
-                if fill is not None:
-                    cell.fill = fill
-                if border is not None:
-                    cell.border = border
-                if alignment_obj is not None:
-                    cell.alignment = alignment_obj
-                if number_format_str is not None:
-                    cell.number_format = number_format_str
-                if protection_obj is not None:
-                    cell.protection = protection_obj
+                sheet = wb[sheet_name]
+            except KeyError:
+                raise ValidationError(f"La hoja '{sheet_name}' no existe")
         
-        # Combinar celdas si se solicita
-        if merge_cells and start != end:
-            sheet.merge_cells(cell_range)
+            # Aplicar el formato; si no hay nada que aplicar, evitar reescribir el libro completo
+            changed = _apply_prepared_format(wb, sheet, bounds, merge, components)
+            if not changed:
+                return {
+                    "success": True,
+                    "message": f"No hay cambios de formato que aplicar al rango {cell_range} en hoja '{sheet_name}'"
+                }
         
-        # Guardar cambios
-        wb.save(file_path)
+            # Guardar cambios
+            commit_workbook(wb, file_path, fast_save=fast_save)
         
         return {
             "success": True,
@@ -292,7 +1212,8 @@ def create_named_style(
     border_color: Optional[str] = None,
     number_format: Optional[str] = None,
     alignment: Optional[str] = None,
-    wrap_text: bool = False
+    wrap_text: bool = False,
+    fast_save: bool = False
 ) -> Dict[str, Any]:
     """
     Crea un estilo con nombre que puede ser reutilizado en el libro.
@@ -301,6 +1222,7 @@ def create_named_style(
         filepath: Ruta al archivo Excel
         style_name: Nombre único para el estilo
         [Resto de parámetros son iguales a format_range]
+        fast_save: Si es True, guarda con compresión rápida (ver save_workbook)
         
     Returns:
         Diccionario con estado de la operación
@@ -320,17 +1242,13 @@ def create_named_style(
     """
     try:
         # Validar ruta de archivo
-        file_path = validate_file_path(filepath, must_exist=True, 
-                                     file_extensions=['.xlsx', '.xlsm'])
+        file_path = _validate_file_path_cached(str(filepath), True, _EXCEL_EXTENSIONS)
         
         # Validar nombre de estilo
         if not style_name or not isinstance(style_name, str):
             raise ValidationError("El nombre del estilo no puede estar vacío")
             
-        # Abrir el libro
-        wb = open_workbook(file_path, read_only=False)
-        
-        # Crear el estilo
+        # Crear el estilo; toda la validación ocurre antes de abrir el libro
         style = NamedStyle(name=style_name)
         
         # Aplicar formato de fuente
@@ -346,12 +1264,7 @@ def create_named_style(
             
         if font_color is not None:
             try:
-                font_color = validate_color(font_color)
-                # Convertir a formato RGB sin #
-                rgb = font_color[1:] 
-                # Asegurar que el color tiene prefijo FF para opacidad completa
-                rgb = rgb if len(rgb) == 8 else f'FF{rgb}'
-                font_args["color"] = Color(rgb=rgb)
+                font_args["color"] = _cached_color(font_color)
             except ValidationError as e:
                 raise
             except Exception as e:
@@ -362,14 +1275,10 @@ def create_named_style(
         # Aplicar relleno
         if bg_color is not None:
             try:
-                bg_color = validate_color(bg_color)
-                # Convertir a formato RGB sin #
-                rgb = bg_color[1:]
-                # Asegurar que el color tiene prefijo FF para opacidad completa
-                rgb = rgb if len(rgb) == 8 else f'FF{rgb}'
+                bg = _cached_color(bg_color)
                 style.fill = PatternFill(
-                    start_color=Color(rgb=rgb),
-                    end_color=Color(rgb=rgb),
+                    start_color=bg,
+                    end_color=bg,
                     fill_type='solid'
                 )
             except ValidationError as e:
@@ -379,24 +1288,14 @@ def create_named_style(
         
         # Aplicar bordes
         if border_style is not None:
-            valid_styles = {'thin', 'medium', 'thick', 'double', 'dashed', 'dotted'}
-            if border_style not in valid_styles:
+            if border_style not in _VALID_BORDER_STYLES:
                 raise ValidationError(
                     f"Estilo de borde inválido: {border_style}. "
-                    f"Valores válidos: {', '.join(valid_styles)}"
+                    f"Valores válidos: {_VALID_BORDER_STYLES_MSG}"
                 )
             
             try:
-                border_color_hex = "#000000"  # Negro por defecto
-                if border_color:
-                    border_color_hex = validate_color(border_color)
-                    rgb = border_color_hex[1:]
-                    rgb = rgb if len(rgb) == 8 else f'FF{rgb}'
-                else:
-                    rgb = "FF000000"  # Negro opaco
-                    
-                side = Side(style=border_style, color=Color(rgb=rgb))
-                style.border = Border(left=side, right=side, top=side, bottom=side)
+                style.border = _cached_border(border_style, border_color or None)
             except ValidationError as e:
                 raise
             except Exception as e:
@@ -404,33 +1303,36 @@ def create_named_style(
         
         # Aplicar alineación
         if alignment is not None or wrap_text:
-            align_args = {"wrap_text": wrap_text}
             if alignment is not None:
-                valid_alignments = {'left', 'center', 'right', 'justify', 'general'}
-                if alignment not in valid_alignments:
+                if alignment not in _VALID_ALIGNMENTS:
                     raise ValidationError(
                         f"Alineación inválida: {alignment}. "
-                        f"Valores válidos: {', '.join(valid_alignments)}"
+                        f"Valores válidos: {_VALID_ALIGNMENTS_MSG}"
                     )
-                align_args["horizontal"] = alignment
-            style.alignment = Alignment(**align_args)
+            style.alignment = _cached_alignment(alignment, bool(wrap_text))
             
         # Aplicar formato numérico
         if number_format is not None:
             style.number_format = number_format
             
-        # Añadir el estilo al libro
-        if style_name in wb.named_styles:
-            # Sobrescribir estilo existente
-            for style_idx, style_obj in enumerate(wb._named_styles):
-                if style_obj.name == style_name:
-                    wb._named_styles[style_idx] = style
-        else:
-            # Añadir nuevo estilo
-            wb.add_named_style(style)
+        # Abrir el libro
+        with writable_workbook(file_path) as wb:
+            # Añadir el estilo al libro; una única búsqueda en la lista de nombres
+            # localiza el estilo existente
+            try:
+                style_idx = wb._named_styles.names.index(style_name)
+            except ValueError:
+                # Añadir nuevo estilo
+                wb.add_named_style(style)
+            else:
+                # Sobrescribir estilo existente en la misma posición, vinculándolo
+                # al libro como haría add_named_style para registrar sus componentes
+                style._style.xfId = style_idx
+                wb._named_styles[style_idx] = style
+                style.bind(wb)
         
-        # Guardar cambios
-        wb.save(file_path)
+            # Guardar cambios
+            commit_workbook(wb, file_path, fast_save=fast_save)
         
         return {
             "success": True,
@@ -453,7 +1355,8 @@ def apply_named_style(
     filepath: Union[str, Path],
     sheet_name: str,
     cell_range: str,
-    style_name: str
+    style_name: str,
+    fast_save: bool = False
 ) -> Dict[str, Any]:
     """
     Aplica un estilo con nombre a un rango de celdas.
@@ -463,38 +1366,32 @@ def apply_named_style(
         sheet_name: Nombre de la hoja
         cell_range: Rango de celdas (ej. "A1:B10")
         style_name: Nombre del estilo a aplicar
+        fast_save: Si es True, guarda con compresión rápida (ver save_workbook)
         
     Returns:
         Diccionario con estado de la operación
     """
     try:
         # Validar ruta de archivo
-        file_path = validate_file_path(filepath, must_exist=True, 
-                                     file_extensions=['.xlsx', '.xlsm'])
+        file_path = _validate_file_path_cached(str(filepath), True, _EXCEL_EXTENSIONS)
         
         # Validar nombre de hoja
         validate_sheet_name(sheet_name)
         
-        # Abrir el libro
-        wb = open_workbook(file_path, read_only=False)
-        
-        # Verificar que la hoja existe
-        if sheet_name not in wb.sheetnames:
-            raise ValidationError(f"La hoja '{sheet_name}' no existe")
-            
-        sheet = wb[sheet_name]
-        
-        # Verificar que el estilo existe
-        if style_name not in wb.named_styles:
-            raise ValidationError(f"El estilo '{style_name}' no existe en el libro")
+        # Validar rango antes de abrir el libro
+        validate_cell_range(cell_range)
         
-        # Aplicar estilo a las celdas
-        for row in sheet[cell_range]:
-            for cell in row:
-                cell.style = style_name
+        # Abrir el libro
+        with writable_workbook(file_path) as wb:
+            # Verificar que la hoja existe
+            try:
+                sheet = wb[sheet_name]
+            except KeyError:
+                raise ValidationError(f"La hoja '{sheet_name}' no existe")
         
-        # Guardar cambios
-        wb.save(file_path)
+            # Guardar cambios solo si alguna celda cambió
+            if _apply_named_style(wb, sheet, cell_range, style_name):
+                commit_workbook(wb, file_path, fast_save=fast_save)
         
         return {
             "success": True,
@@ -524,7 +1421,8 @@ def apply_conditional_formatting(
     icon_set: Optional[Dict] = None,
     operator: Optional[str] = None,
     value: Optional[Any] = None,
-    text: Optional[str] = None
+    text: Optional[str] = None,
+    fast_save: bool = False
 ) -> Dict[str, Any]:
     """
     Aplica formato condicional a un rango de celdas.
@@ -541,6 +1439,7 @@ def apply_conditional_formatting(
         operator: Operador para regla "cell_is" (equal, not_equal, greater_than, etc.)
         value: Valor para regla "cell_is"
         text: Texto para regla "contains_text"
+        fast_save: Si es True, guarda con compresión rápida (ver save_workbook)
         
     Returns:
         Diccionario con estado de la operación
@@ -555,16 +1454,7 @@ def apply_conditional_formatting(
         if rule_type not in valid_rule_types:
             raise ValidationError(f"Tipo de regla inválido. Debe ser uno de: {', '.join(valid_rule_types)}")
             
-        # Abrir el libro
-        wb = open_workbook(filepath, read_only=False)
-        
-        # Verificar que la hoja existe
-        if sheet_name not in wb.sheetnames:
-            raise ValidationError(f"La hoja '{sheet_name}' no existe")
-            
-        ws = wb[sheet_name]
-        
-        # Crear la regla según el tipo
+        # Crear la regla según el tipo antes de abrir el libro
         if rule_type == "formula":
             if not formula:
                 raise ValidationError("Se requiere una fórmula para el tipo de regla 'formula'")
@@ -578,16 +1468,16 @@ def apply_conditional_formatting(
                 color_scale = ["FFFF0000", "FFFFFF00", "FF00FF00"]  # Rojo a amarillo a verde
             rule = ColorScaleRule(
                 start_type='min',
-                start_color=color_scale[0],
+                start_color=_normalize_rgb(color_scale[0]),
                 end_type='max',
-                end_color=color_scale[-1],
+                end_color=_normalize_rgb(color_scale[-1]),
                 mid_type='percentile' if len(color_scale) > 2 else None,
-                mid_color=color_scale[1] if len(color_scale) > 2 else None
+                mid_color=_normalize_rgb(color_scale[1]) if len(color_scale) > 2 else None
             )
         elif rule_type == "data_bar":
             color = "FF638EC6"  # Azul por defecto
             if data_bar and "color" in data_bar:
-                color = data_bar["color"]
+                color = _normalize_rgb(data_bar["color"])
             rule = DataBarRule(
                 start_type='min',
                 end_type='max',
@@ -622,253 +1512,565 @@ def apply_conditional_formatting(
                 fill=PatternFill(start_color="FFFF00", end_color="FFFF00")  # Amarillo por defecto
             )
             
-        # Aplicar la regla al rango
-        ws.conditional_formatting.add(range_string, rule)
+        # Abrir el libro
+        with writable_workbook(filepath) as wb:
+            # Verificar que la hoja existe
+            try:
+                ws = wb[sheet_name]
+            except KeyError:
+                raise ValidationError(f"La hoja '{sheet_name}' no existe")
+            
+            # Aplicar la regla al rango
+            ws.conditional_formatting.add(range_string, rule)
+        
+            # Guardar el libro; se cierra al salir del bloque
+            commit_workbook(wb, filepath, fast_save=fast_save)
+        
+        return {
+            "success": True,
+            "message": f"Formato condicional aplicado correctamente al rango {range_string}"
+        }
+    except ValidationError as e:
+        logger.error(str(e))
+        raise
+    except FormattingError as e:
+        logger.error(str(e))
+        raise
+    except Exception as e:
+        logger.error(f"Error al aplicar formato condicional: {e}")
+        raise FormattingError(f"Error al aplicar formato condicional: {str(e)}")
+
+def clear_formatting(
+    filepath: str,
+    sheet_name: str,
+    start_cell: str,
+    end_cell: Optional[str] = None,
+    fast_save: bool = False
+) -> Dict[str, Any]:
+    """
+    Elimina todo el formato de un rango de celdas.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        sheet_name: Nombre de la hoja
+        start_cell: Celda inicial
+        end_cell: Celda final (opcional)
+        fast_save: Si es True, guarda con compresión rápida (ver save_workbook)
+        
+    Returns:
+        Diccionario con estado de la operación
+        
+    Raises:
+        ValidationError: Si los valores proporcionados no son válidos
+        FormattingError: Si ocurre un error al eliminar el formato
+    """
+    try:
+        # Validar ruta de archivo
+        file_path = _validate_file_path_cached(str(filepath), True, _EXCEL_EXTENSIONS)
+        
+        # Validar nombre de hoja
+        validate_sheet_name(sheet_name)
+        
+        # Construir y validar el rango una sola vez, antes de abrir el libro
+        cell_range = _build_cell_range(start_cell, end_cell)
+        bounds = range_boundaries(cell_range)
+        
+        # Abrir el libro
+        with writable_workbook(file_path) as wb:
+            # Verificar que la hoja existe
+            try:
+                ws = wb[sheet_name]
+            except KeyError:
+                raise ValidationError(f"La hoja '{sheet_name}' no existe")
+        
+            # Eliminar formato en cada celda del rango
+            _clear_range(ws, bounds)
+                
+            # Guardar cambios
+            commit_workbook(wb, file_path, fast_save=fast_save)
+        
+        return {
+            "success": True,
+            "message": f"Formato eliminado correctamente del rango {cell_range}"
+        }
+    except (ValidationError, FormattingError) as e:
+        logger.error(f"Error al eliminar formato: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+    except Exception as e:
+        logger.error(f"Error inesperado al eliminar formato: {e}")
+        return {
+            "success": False,
+            "error": f"Error al eliminar formato: {str(e)}"
+        }
+
+def set_column_width(
+    filepath: Union[str, Path],
+    sheet_name: str,
+    column: str,
+    width: float,
+    fast_save: bool = False
+) -> Dict[str, Any]:
+    """
+    Establece el ancho de una columna.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        sheet_name: Nombre de la hoja
+        column: Letra o referencia de columna (ej. "A", "BC")
+        width: Ancho de columna en unidades de carácter
+        fast_save: Si es True, guarda con compresión rápida (ver save_workbook)
+        
+    Returns:
+        Diccionario con estado de la operación
+        
+    Raises:
+        ValidationError: Si los valores proporcionados no son válidos
+        FormattingError: Si ocurre un error al establecer el ancho
+    """
+    try:
+        # Validar ruta de archivo
+        file_path = _validate_file_path_cached(str(filepath), True, _EXCEL_EXTENSIONS)
+        
+        # Validar nombre de hoja
+        validate_sheet_name(sheet_name)
+        
+        # Validar columna y ancho antes de abrir el libro
+        _validate_column_width(column, width)
+            
+        # Abrir el libro
+        with writable_workbook(file_path) as wb:
+            # Verificar que la hoja existe
+            try:
+                ws = wb[sheet_name]
+            except KeyError:
+                raise ValidationError(f"La hoja '{sheet_name}' no existe")
         
-        # Guardar y cerrar el libro
-        wb.save(filepath)
-        wb.close()
+            # Establecer ancho de columna y guardar solo si cambia
+            if _apply_column_width(wb, ws, column, width):
+                commit_workbook(wb, file_path, fast_save=fast_save)
         
         return {
             "success": True,
-            "message": f"Formato condicional aplicado correctamente al rango {range_string}"
+            "message": f"Ancho de columna {column} establecido a {width} unidades"
+        }
+    except (ValidationError, FormattingError) as e:
+        logger.error(f"Error al establecer ancho de columna: {e}")
+        return {
+            "success": False,
+            "error": str(e)
         }
-    except ValidationError as e:
-        logger.error(str(e))
-        raise
-    except FormattingError as e:
-        logger.error(str(e))
-        raise
     except Exception as e:
-        logger.error(f"Error al aplicar formato condicional: {e}")
-        raise FormattingError(f"Error al aplicar formato condicional: {str(e)}")
+        logger.error(f"Error inesperado al establecer ancho de columna: {e}")
+        return {
+            "success": False,
+            "error": f"Error al establecer ancho de columna: {str(e)}"
+        }
 
-def clear_formatting(
-    filepath: str,
+def set_row_height(
+    filepath: Union[str, Path],
     sheet_name: str,
-    start_cell: str,
-    end_cell: Optional[str] = None
+    row: int,
+    height: float,
+    fast_save: bool = False
 ) -> Dict[str, Any]:
     """
-    Elimina todo el formato de un rango de celdas.
+    Establece la altura de una fila.
+    
+    Si la fila ya tiene su etiqueta <row> en el archivo, se modifica directamente
+    el XML de la hoja sin cargar el libro con openpyxl.
     
     Args:
         filepath: Ruta al archivo Excel
         sheet_name: Nombre de la hoja
-        start_cell: Celda inicial
-        end_cell: Celda final (opcional)
+        row: Número de fila
+        height: Altura de fila en puntos
+        fast_save: Si es True, guarda con compresión rápida (ver save_workbook)
         
     Returns:
         Diccionario con estado de la operación
         
     Raises:
         ValidationError: Si los valores proporcionados no son válidos
-        FormattingError: Si ocurre un error al eliminar el formato
+        FormattingError: Si ocurre un error al establecer la altura
     """
     try:
         # Validar ruta de archivo
-        file_path = validate_file_path(filepath, must_exist=True, 
-                                      file_extensions=['.xlsx', '.xlsm'])
+        file_path = _validate_file_path_cached(str(filepath), True, _EXCEL_EXTENSIONS)
         
         # Validar nombre de hoja
         validate_sheet_name(sheet_name)
         
-        # Abrir el libro
-        wb = open_workbook(file_path, read_only=False)
+        # Validar fila y altura antes de abrir el libro
+        _validate_row_height(row, height)
         
-        # Verificar que la hoja existe
-        if sheet_name not in wb.sheetnames:
-            raise ValidationError(f"La hoja '{sheet_name}' no existe")
+        # Si la fila ya existe en el XML, cambiar solo su etiqueta sin cargar el libro
+        if _quick_patch_row_height(str(file_path), sheet_name, row, height, fast_save) is not None:
+            return {
+                "success": True,
+                "message": f"Altura de fila {row} establecida a {height} puntos"
+            }
             
-        ws = wb[sheet_name]
-        
-        # Validar referencias de celda
-        start, end = validate_cell_range(start_cell, end_cell)
+        # Abrir el libro
+        with writable_workbook(file_path) as wb:
+            # Verificar que la hoja existe
+            try:
+                ws = wb[sheet_name]
+            except KeyError:
+                raise ValidationError(f"La hoja '{sheet_name}' no existe")
         
-        # Si no se especificó celda final, usar la inicial
-        if end is None:
-            end = start
-            
-        # Convertir referencias de celda a coordenadas
-        start_coord = ws[start].coordinate
-        end_coord = ws[end].coordinate
-        
-        # Definir el rango de celdas
-        cell_range = f"{start_coord}:{end_coord}"
-        
-        # Crear objetos de formato predeterminados
-        default_font = Font()
-        default_border = Border()
-        default_fill = PatternFill()
-        
-        # Eliminar formato en cada celda del rango
-        for row in ws[cell_range]:
-            for cell in row:
-                cell.font = default_font
-                cell.border = default_border
-                cell.fill = default_fill
-                cell.number_format = "General"
-                cell.alignment = Alignment()
-                cell.protection = Protection()
-                
-        # Guardar cambios
-        wb.save(file_path)
+            # Establecer altura de fila y guardar solo si cambia
+            if _apply_row_height(wb, ws, row, height):
+                commit_workbook(wb, file_path, fast_save=fast_save)
         
         return {
             "success": True,
-            "message": f"Formato eliminado correctamente del rango {cell_range}"
+            "message": f"Altura de fila {row} establecida a {height} puntos"
         }
     except (ValidationError, FormattingError) as e:
-        logger.error(f"Error al eliminar formato: {e}")
+        logger.error(f"Error al establecer altura de fila: {e}")
         return {
             "success": False,
             "error": str(e)
         }
     except Exception as e:
-        logger.error(f"Error inesperado al eliminar formato: {e}")
+        logger.error(f"Error inesperado al establecer altura de fila: {e}")
         return {
             "success": False,
-            "error": f"Error al eliminar formato: {str(e)}"
+            "error": f"Error al establecer altura de fila: {str(e)}"
         }
 
-def set_column_width(
+def set_dimensions(
     filepath: Union[str, Path],
     sheet_name: str,
-    column: str,
-    width: float
+    widths: Optional[Dict[str, float]] = None,
+    heights: Optional[Dict[int, float]] = None,
+    fast_save: bool = False
 ) -> Dict[str, Any]:
     """
-    Establece el ancho de una columna.
+    Establece varios anchos de columna y altos de fila con un único guardado.
+    
+    Equivale a llamar repetidamente a set_column_width y set_row_height, pero
+    el libro se abre y se guarda una sola vez.
     
     Args:
         filepath: Ruta al archivo Excel
         sheet_name: Nombre de la hoja
-        column: Letra o referencia de columna (ej. "A", "BC")
-        width: Ancho de columna en unidades de carácter
+        widths: Diccionario columna -> ancho (ej. {"A": 20, "C": 12.5})
+        heights: Diccionario fila -> altura (ej. {1: 30}); se aceptan claves
+                 de texto como "1", habituales al recibir JSON
+        fast_save: Si es True, guarda con compresión rápida (ver save_workbook)
         
     Returns:
         Diccionario con estado de la operación
         
     Raises:
         ValidationError: Si los valores proporcionados no son válidos
-        FormattingError: Si ocurre un error al establecer el ancho
+        FormattingError: Si ocurre un error al establecer las dimensiones
     """
     try:
         # Validar ruta de archivo
-        file_path = validate_file_path(filepath, must_exist=True, 
-                                      file_extensions=['.xlsx', '.xlsm'])
+        file_path = _validate_file_path_cached(str(filepath), True, _EXCEL_EXTENSIONS)
         
         # Validar nombre de hoja
         validate_sheet_name(sheet_name)
         
-        # Validar letra de columna
-        if not re.match(r'^[A-Za-z]+$', column):
-            raise ValidationError(f"Referencia de columna inválida: {column}")
+        widths = widths or {}
+        try:
+            heights = {int(row): height for row, height in (heights or {}).items()}
+        except (TypeError, ValueError):
+            raise ValidationError(f"Número de fila inválido en heights: {heights}")
             
-        # Asegurar que el ancho es positivo
-        if width <= 0:
-            raise ValidationError("El ancho debe ser un valor positivo")
+        # Validar todas las dimensiones antes de abrir el libro
+        for column, width in widths.items():
+            _validate_column_width(column, width)
+        for row, height in heights.items():
+            _validate_row_height(row, height)
             
         # Abrir el libro
-        wb = open_workbook(file_path, read_only=False)
-        
-        # Verificar que la hoja existe
-        if sheet_name not in wb.sheetnames:
-            raise ValidationError(f"La hoja '{sheet_name}' no existe")
+        with writable_workbook(file_path) as wb:
+            # Verificar que la hoja existe
+            try:
+                ws = wb[sheet_name]
+            except KeyError:
+                raise ValidationError(f"La hoja '{sheet_name}' no existe")
+        
+            dirty = False
+            for column, width in widths.items():
+                dirty = _apply_column_width(wb, ws, column, width) or dirty
+            for row, height in heights.items():
+                dirty = _apply_row_height(wb, ws, row, height) or dirty
+            
+            # Guardar una única vez y solo si alguna dimensión cambió
+            if dirty:
+                commit_workbook(wb, file_path, fast_save=fast_save)
             
-        ws = wb[sheet_name]
-        
-        # Establecer ancho de columna
-        ws.column_dimensions[column.upper()].width = width
-        
-        # Guardar cambios
-        wb.save(file_path)
-        
         return {
             "success": True,
-            "message": f"Ancho de columna {column} establecido a {width} unidades"
+            "message": f"Dimensiones actualizadas en hoja '{sheet_name}': "
+                       f"{len(widths)} columnas y {len(heights)} filas"
         }
     except (ValidationError, FormattingError) as e:
-        logger.error(f"Error al establecer ancho de columna: {e}")
+        logger.error(f"Error al establecer dimensiones: {e}")
         return {
             "success": False,
             "error": str(e)
         }
     except Exception as e:
-        logger.error(f"Error inesperado al establecer ancho de columna: {e}")
+        logger.error(f"Error inesperado al establecer dimensiones: {e}")
         return {
             "success": False,
-            "error": f"Error al establecer ancho de columna: {str(e)}"
+            "error": f"Error al establecer dimensiones: {str(e)}"
         }
 
-def set_row_height(
+def build_formatted_sheet(
     filepath: Union[str, Path],
     sheet_name: str,
-    row: int,
-    height: float
+    rows_iter: Iterable[List[Any]],
+    style_per_row_fn: Optional[Callable[[int, List[Any]], Optional[Dict[str, Any]]]] = None,
+    conditional_formats: Optional[List[Dict[str, Any]]] = None,
+    fast_save: bool = False
 ) -> Dict[str, Any]:
     """
-    Establece la altura de una fila.
+    Genera desde cero un libro con una hoja formateada en modo de solo escritura.
+    
+    Las filas se escriben y se liberan a medida que se formatean, de modo que el
+    consumo de memoria no crece con el número de filas. Pensado para informes
+    grandes generados desde cero; el archivo de destino se sobrescribe.
     
     Args:
-        filepath: Ruta al archivo Excel
+        filepath: Ruta del archivo .xlsx a crear (un libro nuevo no tiene macros)
         sheet_name: Nombre de la hoja
-        row: Número de fila
-        height: Altura de fila en puntos
+        rows_iter: Iterable de filas, cada una una lista de valores
+        style_per_row_fn: Función opcional que recibe (número de fila, valores) y
+                          devuelve un diccionario con argumentos de format_range
+                          (bold, bg_color, number_format, ...) o None para no
+                          aplicar formato a esa fila
+        conditional_formats: Lista opcional de reglas de formato condicional, cada
+                             una un diccionario con los argumentos de
+                             add_conditional_formatting (cell_range, rule_type,
+                             ...). Se registran en la hoja justo antes de
+                             guardar, así que la memoria crece con el número de
+                             reglas y no con el de celdas
+        fast_save: Si es True, guarda con compresión rápida (ver save_workbook)
         
     Returns:
         Diccionario con estado de la operación
         
-    Raises:
-        ValidationError: Si los valores proporcionados no son válidos
-        FormattingError: Si ocurre un error al establecer la altura
+    Ejemplo:
+        ```python
+        build_formatted_sheet(
+            "informe.xlsx", "Datos", filas,
+            lambda i, fila: {"bold": True, "bg_color": "#DDDDDD"} if i == 1 else None,
+            conditional_formats=[
+                {"cell_range": "C2:C1000", "rule_type": "color_scale",
+                 "colors": ["#F8696B", "#63BE7B"]}
+            ]
+        )
+        ```
     """
     try:
-        # Validar ruta de archivo
-        file_path = validate_file_path(filepath, must_exist=True, 
-                                      file_extensions=['.xlsx', '.xlsm'])
-        
-        # Validar nombre de hoja
+        # Validar ruta de archivo y nombre de hoja
+        file_path = validate_file_path(filepath, must_exist=False, file_extensions=['.xlsx'])
         validate_sheet_name(sheet_name)
         
-        # Validar número de fila
-        if row <= 0:
-            raise ValidationError("El número de fila debe ser positivo")
+        # Validar y construir las reglas condicionales antes de generar las filas
+        conditional_rules = []
+        for index, rule_args in enumerate(conditional_formats or [], start=1):
+            rule_args = dict(rule_args)
+            priority = rule_args.pop("priority", 1)
+            try:
+                rule = _build_conditional_rule(**rule_args)
+            except TypeError as e:
+                raise ValidationError(f"Regla condicional {index}: argumentos inválidos: {str(e)}")
+            conditional_rules.append((rule_args["cell_range"], rule, priority))
+        
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(sheet_name)
+        
+        # Los componentes de estilo se construyen una vez por combinación de argumentos
+        components_cache = {}
+        
+        rows_written = 0
+        for row_index, values in enumerate(rows_iter, start=1):
+            style_args = style_per_row_fn(row_index, values) if style_per_row_fn else None
+            if not style_args:
+                ws.append(values)
+                rows_written += 1
+                continue
+                
+            try:
+                key = tuple(sorted(style_args.items()))
+                components = components_cache.get(key)
+            except TypeError:
+                # Argumentos no hashables (p. ej. protection): construir sin caché
+                key, components = None, None
+            if components is None:
+                components = _build_style_components(**style_args)
+                if key is not None:
+                    components_cache[key] = components
+            font, fill, border, alignment_obj, number_format_str, protection_obj = components
+            
+            row_cells = []
+            for value in values:
+                cell = WriteOnlyCell(ws, value=value)
+                if font is not None:
+                    cell.font = font
+                if fill is not None:
+                    cell.fill = fill
+                if border is not None:
+                    cell.border = border
+                if alignment_obj is not None:
+                    cell.alignment = alignment_obj
+                if number_format_str is not None:
+                    cell.number_format = number_format_str
+                if protection_obj is not None:
+                    cell.protection = protection_obj
+                row_cells.append(cell)
+            ws.append(row_cells)
+            rows_written += 1
             
-        # Asegurar que la altura es positiva
-        if height <= 0:
-            raise ValidationError("La altura debe ser un valor positivo")
+        # Registrar el formato condicional justo antes de guardar
+        for cell_range, rule, priority in conditional_rules:
+            _add_conditional_rule(ws, cell_range, rule, priority)
             
-        # Abrir el libro
-        wb = open_workbook(file_path, read_only=False)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        commit_workbook(wb, str(file_path), fast_save=fast_save)
         
-        # Verificar que la hoja existe
-        if sheet_name not in wb.sheetnames:
-            raise ValidationError(f"La hoja '{sheet_name}' no existe")
-            
-        ws = wb[sheet_name]
+        return {
+            "success": True,
+            "message": f"Hoja '{sheet_name}' generada con {rows_written} filas en {file_path}",
+            "rows_written": rows_written
+        }
+    except (ValidationError, FormattingError) as e:
+        logger.error(f"Error al generar hoja formateada: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }
+    except Exception as e:
+        logger.error(f"Error inesperado al generar hoja formateada: {e}")
+        return {
+            "success": False,
+            "error": f"Error al generar hoja formateada: {str(e)}"
+        }
+
+# Operaciones admitidas por format_ranges
+_FORMAT_OPERATIONS = {
+    "format_range": _apply_format_range,
+    "clear_formatting": _apply_clear_formatting,
+    "apply_named_style": _apply_named_style,
+    "set_column_width": _apply_column_width,
+    "set_row_height": _apply_row_height,
+    "add_conditional_formatting": _apply_conditional_rule,
+    "remove_conditional_formatting": _apply_remove_conditional_formatting,
+}
+
+def format_ranges(
+    filepath: Union[str, Path],
+    operations: List[Dict[str, Any]],
+    fast_save: bool = False
+) -> Dict[str, Any]:
+    """
+    Aplica varias operaciones de formato abriendo y guardando el libro una sola vez.
+    
+    Cada operación es un diccionario con la clave "op" (format_range,
+    clear_formatting, apply_named_style, set_column_width, set_row_height,
+    add_conditional_formatting o remove_conditional_formatting) y la clave
+    "args" con los argumentos de la función correspondiente, incluido
+    "sheet_name" y excluido "filepath".
+    
+    Las funciones individuales equivalen a un lote de una sola operación: todas
+    comparten la misma lógica sobre la hoja abierta, y agrupar varias
+    operaciones evita abrir y guardar el libro completo en cada una.
+    
+    En las hojas que reciben formato condicional, los rangos contiguos con
+    reglas idénticas añadidos en el mismo lote se fusionan antes de guardar
+    (ver _merge_conditional_formatting), por lo que después ya no pueden
+    eliminarse por separado con remove_conditional_formatting. El formato
+    condicional que la hoja ya tenía no se modifica.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        operations: Lista de operaciones a aplicar en orden
+        fast_save: Si es True, guarda con compresión rápida (ver save_workbook)
         
-        # Establecer altura de fila
-        ws.row_dimensions[row].height = height
+    Returns:
+        Diccionario con estado de la operación
         
-        # Guardar cambios
-        wb.save(file_path)
+    Ejemplo:
+        ```python
+        format_ranges("informe.xlsm", [
+            {"op": "format_range",
+             "args": {"sheet_name": "Datos", "start_cell": "A1", "end_cell": "D1", "bold": True}},
+            {"op": "set_column_width",
+             "args": {"sheet_name": "Datos", "column": "A", "width": 20}}
+        ])
+        ```
+    """
+    try:
+        # Validar ruta de archivo
+        file_path = _validate_file_path_cached(str(filepath), True, _EXCEL_EXTENSIONS)
         
+        if not operations:
+            raise ValidationError("No se proporcionaron operaciones de formato")
+            
+        # Abrir el libro una sola vez para todas las operaciones
+        with writable_workbook(file_path) as wb:
+            dirty = False
+            # Hoja -> bloques de formato condicional que tenía antes del lote
+            cf_sheets = {}
+            for index, operation in enumerate(operations, start=1):
+                op_name = operation.get("op")
+                handler = _FORMAT_OPERATIONS.get(op_name)
+                if handler is None:
+                    raise ValidationError(
+                        f"Operación {index}: tipo de operación inválido: {op_name}. "
+                        f"Valores válidos: {', '.join(_FORMAT_OPERATIONS)}"
+                    )
+                
+                args = dict(operation.get("args") or {})
+                sheet_name = args.pop("sheet_name", None)
+                validate_sheet_name(sheet_name)
+                try:
+                    sheet = wb[sheet_name]
+                except KeyError:
+                    raise ValidationError(f"Operación {index}: la hoja '{sheet_name}' no existe")
+                
+                if op_name == "add_conditional_formatting" and sheet not in cf_sheets:
+                    cf_sheets[sheet] = list(sheet.conditional_formatting)
+                
+                try:
+                    dirty = handler(wb, sheet, **args) or dirty
+                except TypeError as e:
+                    raise ValidationError(f"Operación {index}: argumentos inválidos para {op_name}: {str(e)}")
+                
+            # Agrupar en un solo bloque los rangos nuevos que recibieron las mismas reglas
+            for sheet, existing in cf_sheets.items():
+                _merge_conditional_formatting(sheet, existing)
+            
+            # Guardar una única vez al final
+            if dirty:
+                commit_workbook(wb, file_path, fast_save=fast_save)
+            
         return {
             "success": True,
-            "message": f"Altura de fila {row} establecida a {height} puntos"
+            "message": f"{len(operations)} operaciones de formato aplicadas correctamente",
+            "operations_applied": len(operations)
         }
     except (ValidationError, FormattingError) as e:
-        logger.error(f"Error al establecer altura de fila: {e}")
+        logger.error(f"Error al aplicar operaciones de formato: {e}")
         return {
             "success": False,
             "error": str(e)
         }
     except Exception as e:
-        logger.error(f"Error inesperado al establecer altura de fila: {e}")
+        logger.error(f"Error inesperado al aplicar operaciones de formato: {e}")
         return {
             "success": False,
-            "error": f"Error al establecer altura de fila: {str(e)}"
+            "error": f"Error al aplicar operaciones de formato: {str(e)}"
         }
 
 def add_conditional_formatting(
@@ -883,7 +2085,8 @@ def add_conditional_formatting(
     colors: List[str] = None,
     icon_style: str = None,
     stopif_true: bool = False,
-    priority: int = 1
+    priority: int = 1,
+    fast_save: bool = False
 ) -> Dict[str, Any]:
     """
     Aplica formato condicional a un rango de celdas en un archivo Excel.
@@ -902,6 +2105,7 @@ def add_conditional_formatting(
         icon_style: Estilo de iconos para reglas de tipo 'icon_set' ('3_traffic_lights', '3_symbols', etc.)
         stopif_true: Si True, no se evaluarán más reglas después de esta si se cumple
         priority: Prioridad de la regla (menor número = mayor prioridad)
+        fast_save: Si es True, guarda con compresión rápida (ver save_workbook)
         
     Returns:
         Dict: Resultado de la operación con claves 'success' y 'message' o 'error'
@@ -912,162 +2116,35 @@ def add_conditional_formatting(
     """
     try:
         # Validar ruta del archivo
-        validate_file_path(filepath)
+        _validate_file_path_cached(str(filepath), True, _EXCEL_EXTENSIONS)
         
         # Validar nombre de hoja
         validate_sheet_name(sheet_name)
         
-        # Validar rango de celdas
-        validate_cell_range(cell_range)
-        
-        # Validar tipo de regla
-        valid_rule_types = ['cell_is', 'formula', 'color_scale', 'data_bar', 'icon_set']
-        if rule_type not in valid_rule_types:
-            valid_types_str = ", ".join([f"'{t}'" for t in valid_rule_types])
-            raise ValidationError(f"Tipo de regla inválido: '{rule_type}'. Debe ser uno de: {valid_types_str}")
-        
-        # Validar operador para 'cell_is'
-        if rule_type == 'cell_is' and operator:
-            valid_operators = ['between', 'not between', '>', '<', '>=', '<=', '=', '!=']
-            if operator not in valid_operators:
-                valid_ops_str = ", ".join([f"'{op}'" for op in valid_operators])
-                raise ValidationError(f"Operador inválido: '{operator}'. Debe ser uno de: {valid_ops_str}")
+        # Validar argumentos y construir la regla antes de abrir el libro
+        rule = _build_conditional_rule(
+            cell_range, rule_type,
+            formula=formula,
+            operator=operator,
+            values=values,
+            styles=styles,
+            colors=colors,
+            icon_style=icon_style,
+            stopif_true=stopif_true
+        )
         
         # Abrir el libro y obtener la hoja
-        wb = open_workbook(filepath)
-        if sheet_name not in wb.sheetnames:
-            raise ValidationError(f"La hoja '{sheet_name}' no existe en el archivo")
-        
-        ws = wb[sheet_name]
-        
-        # Crear la regla de formato condicional según el tipo
-        rule = None
-        
-        if rule_type == 'cell_is':
-            if not operator:
-                raise ValidationError("Se requiere un operador para el tipo de regla 'cell_is'")
-            if not values:
-                raise ValidationError("Se requieren valores para el tipo de regla 'cell_is'")
-            
-            # Crear estilo diferencial
-            dxf = None
-            if styles:
-                dxf = _create_differential_style(styles)
-            
-            rule = CellIsRule(
-                operator=operator,
-                formula=values if isinstance(values, list) else [values],
-                stopIfTrue=stopif_true,
-                dxf=dxf
-            )
-            
-        elif rule_type == 'formula':
-            if not formula:
-                raise ValidationError("Se requiere una fórmula para el tipo de regla 'formula'")
-            
-            # Crear estilo diferencial
-            dxf = None
-            if styles:
-                dxf = _create_differential_style(styles)
-            
-            rule = FormulaRule(
-                formula=[formula],
-                stopIfTrue=stopif_true,
-                dxf=dxf
-            )
-            
-        elif rule_type == 'color_scale':
-            if not colors or len(colors) < 2:
-                raise ValidationError("Se requieren al menos 2 colores para el tipo de regla 'color_scale'")
-            
-            # Valores por defecto si no se proporcionan
-            if not values:
-                if len(colors) == 2:
-                    values = ['min', 'max']
-                elif len(colors) == 3:
-                    values = ['min', '50', 'max']
-                else:
-                    raise ValidationError("Para 'color_scale' con más de 3 colores, se deben proporcionar valores explícitamente")
-            
-            if len(values) != len(colors):
-                raise ValidationError(f"La cantidad de valores ({len(values)}) debe coincidir con la cantidad de colores ({len(colors)})")
-            
-            rule = ColorScaleRule(
-                start_type=values[0] if isinstance(values[0], str) else 'num',
-                start_value=None if isinstance(values[0], str) else values[0],
-                start_color=colors[0],
-                end_type=values[-1] if isinstance(values[-1], str) else 'num',
-                end_value=None if isinstance(values[-1], str) else values[-1],
-                end_color=colors[-1],
-                mid_type=values[1] if len(values) > 2 and isinstance(values[1], str) else None,
-                mid_value=None if len(values) <= 2 or isinstance(values[1], str) else values[1],
-                mid_color=colors[1] if len(colors) > 2 else None
-            )
-            
-        elif rule_type == 'data_bar':
-            if not colors:
-                raise ValidationError("Se requiere al menos un color para el tipo de regla 'data_bar'")
-            
-            color = colors[0] if isinstance(colors, list) else colors
-            
-            rule = DataBarRule(
-                start_type='min',
-                start_value=None,
-                end_type='max',
-                end_value=None,
-                color=color,
-                showValue=True,
-                minLength=None,
-                maxLength=None
-            )
-            
-        elif rule_type == 'icon_set':
-            if not icon_style:
-                raise ValidationError("Se requiere un estilo de iconos para el tipo de regla 'icon_set'")
-            
-            valid_icon_styles = [
-                '3_arrows', '3_arrows_gray', '3_flags', '3_traffic_lights', '3_signs', '3_symbols', '3_symbols_2',
-                '4_arrows', '4_arrows_gray', '4_ratings', '4_traffic_lights', '5_arrows', '5_arrows_gray', '5_ratings'
-            ]
-            
-            if icon_style not in valid_icon_styles:
-                raise ValidationError(f"Estilo de iconos inválido: '{icon_style}'. Debe ser uno de: {', '.join(valid_icon_styles)}")
-            
-            # Determinar cuántos valores necesitamos según el estilo
-            icon_count = int(icon_style[0])
-            
-            # Valores por defecto si no se proporcionan
-            if not values:
-                if icon_count == 3:
-                    values = [0, 33, 67]
-                elif icon_count == 4:
-                    values = [0, 25, 50, 75]
-                elif icon_count == 5:
-                    values = [0, 20, 40, 60, 80]
-            
-            if len(values) != icon_count:
-                raise ValidationError(f"Se requieren {icon_count} valores para el estilo de iconos '{icon_style}'")
-            
-            rule = IconSetRule(
-                icon_style=icon_style,
-                type=['percent'] * icon_count,
-                values=values,
-                showValue=True,
-                reverse=False
-            )
-        
-        # Agregar la regla a la hoja
-        ws.conditional_formatting.add(cell_range, rule)
+        with writable_workbook(filepath) as wb:
+            try:
+                ws = wb[sheet_name]
+            except KeyError:
+                raise ValidationError(f"La hoja '{sheet_name}' no existe en el archivo")
         
-        # Establecer prioridad si se especifica
-        if priority is not None and priority > 0:
-            for i, cf_rule in enumerate(ws.conditional_formatting._cf_rules[cell_range]):
-                if cf_rule == rule:
-                    cf_rule.priority = priority
-                    break
+            # Agregar la regla a la hoja
+            _add_conditional_rule(ws, cell_range, rule, priority)
         
-        # Guardar el libro
-        wb.save(filepath)
+            # Guardar el libro
+            commit_workbook(wb, filepath, fast_save=fast_save)
         
         return {
             "success": True,
@@ -1090,6 +2167,95 @@ def add_conditional_formatting(
             "error": f"Error al aplicar formato condicional: {str(e)}"
         }
 
+def _create_side(side_props: Optional[Dict[str, Any]]) -> Optional[Side]:
+    """Crea un objeto Side para un estilo diferencial a partir de sus propiedades."""
+    if not side_props:
+        return None
+    return Side(
+        style=side_props.get('style'),
+        color=_optional_rgb(side_props.get('color'))
+    )
+
+def _build_dxf_font(font_props: Dict[str, Any]) -> Font:
+    """Crea la fuente de un estilo diferencial."""
+    return Font(
+        name=font_props.get('name'),
+        size=font_props.get('size'),
+        bold=font_props.get('bold'),
+        italic=font_props.get('italic'),
+        underline=font_props.get('underline'),
+        strike=font_props.get('strike'),
+        color=_optional_rgb(font_props.get('color'))
+    )
+
+def _build_dxf_fill(fill_props: Dict[str, Any]) -> PatternFill:
+    """
+    Crea el relleno de un estilo diferencial.
+    
+    Para tipos distintos de 'solid' se usa un PatternFill sólido básico con el
+    color de primer plano: el soporte para GradientFill en DifferentialStyle es
+    limitado.
+    """
+    fg_color = _optional_rgb(fill_props.get('fg_color'))
+    if fill_props.get('pattern_type', 'solid') == 'solid':
+        return PatternFill(
+            patternType='solid',
+            fgColor=fg_color,
+            bgColor=_optional_rgb(fill_props.get('bg_color'))
+        )
+    return PatternFill(patternType='solid', fgColor=fg_color)
+
+def _build_dxf_border(border_props: Dict[str, Any]) -> Border:
+    """Crea el borde de un estilo diferencial."""
+    return Border(
+        left=_create_side(border_props.get('left')),
+        right=_create_side(border_props.get('right')),
+        top=_create_side(border_props.get('top')),
+        bottom=_create_side(border_props.get('bottom')),
+        diagonal=_create_side(border_props.get('diagonal')),
+        diagonalUp=border_props.get('diagonal_up', False),
+        diagonalDown=border_props.get('diagonal_down', False)
+    )
+
+def _build_dxf_alignment(align_props: Dict[str, Any]) -> Alignment:
+    """Crea la alineación de un estilo diferencial."""
+    return Alignment(
+        horizontal=align_props.get('horizontal'),
+        vertical=align_props.get('vertical'),
+        textRotation=align_props.get('text_rotation'),
+        wrapText=align_props.get('wrap_text'),
+        shrinkToFit=align_props.get('shrink_to_fit'),
+        indent=align_props.get('indent'),
+        justifyLastLine=align_props.get('justify_last_line'),
+        readingOrder=align_props.get('reading_order')
+    )
+
+# Sección del diccionario de estilo -> constructor del argumento homónimo de DifferentialStyle
+_DXF_SECTION_BUILDERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    'font': _build_dxf_font,
+    'fill': _build_dxf_fill,
+    'border': _build_dxf_border,
+    'alignment': _build_dxf_alignment,
+}
+
+@lru_cache(maxsize=256)
+def _cached_differential_style(key: str) -> DifferentialStyle:
+    """
+    Crea (con caché) el estilo diferencial de un diccionario de estilo serializado.
+    
+    El estilo se construye a partir de la propia clave, de modo que modificar
+    después el diccionario original no afecta al estilo ya guardado.
+    """
+    style_dict: Dict[str, Any] = json.loads(key)
+    
+    # Construir solo las secciones presentes en el diccionario
+    kwargs: Dict[str, Any] = {
+        section: build(style_dict[section])
+        for section, build in _DXF_SECTION_BUILDERS.items()
+        if section in style_dict
+    }
+    return DifferentialStyle(numFmt=style_dict.get('number_format'), **kwargs)
+
 def _create_differential_style(style_dict: Dict[str, Any]) -> DifferentialStyle:
     """
     Crea un estilo diferencial a partir de un diccionario de propiedades de estilo.
@@ -1098,6 +2264,9 @@ def _create_differential_style(style_dict: Dict[str, Any]) -> DifferentialStyle:
         style_dict: Diccionario con propiedades de estilo
                    Claves soportadas: 'font', 'fill', 'border', 'alignment', 'number_format'
     
+    Las reglas con el mismo diccionario de estilo comparten un único objeto
+    DifferentialStyle, que no debe modificarse tras crearlo.
+    
     Returns:
         DifferentialStyle: Objeto de estilo diferencial para usar en formatos condicionales
         
@@ -1105,103 +2274,27 @@ def _create_differential_style(style_dict: Dict[str, Any]) -> DifferentialStyle:
         FormattingError: Si hay un error al crear el estilo
     """
     try:
-        font = None
-        fill = None
-        border = None
-        alignment = None
-        number_format = None
-        
-        # Procesar fuente
-        if 'font' in style_dict:
-            font_props = style_dict['font']
-            font = Font(
-                name=font_props.get('name'),
-                size=font_props.get('size'),
-                bold=font_props.get('bold'),
-                italic=font_props.get('italic'),
-                underline=font_props.get('underline'),
-                strike=font_props.get('strike'),
-                color=font_props.get('color')
-            )
-        
-        # Procesar relleno
-        if 'fill' in style_dict:
-            fill_props = style_dict['fill']
-            pattern_type = fill_props.get('pattern_type', 'solid')
-            
-            if pattern_type == 'solid':
-                fg_color = fill_props.get('fg_color')
-                bg_color = fill_props.get('bg_color')
-                fill = PatternFill(
-                    patternType=pattern_type,
-                    fgColor=fg_color,
-                    bgColor=bg_color
-                )
-            else:
-                # Para otros tipos de relleno, simplemente usar un PatternFill básico
-                # El soporte para GradientFill en DifferentialStyle es limitado
-                fg_color = fill_props.get('fg_color')
-                fill = PatternFill(
-                    patternType='solid',
-                    fgColor=fg_color
-                )
-        
-        # Procesar bordes
-        if 'border' in style_dict:
-            border_props = style_dict['border']
-            
-            # Función auxiliar para crear un objeto Side
-            def create_side(side_props):
-                if not side_props:
-                    return None
-                return Side(
-                    style=side_props.get('style'),
-                    color=side_props.get('color')
-                )
-            
-            border = Border(
-                left=create_side(border_props.get('left')),
-                right=create_side(border_props.get('right')),
-                top=create_side(border_props.get('top')),
-                bottom=create_side(border_props.get('bottom')),
-                diagonal=create_side(border_props.get('diagonal')),
-                diagonalUp=border_props.get('diagonal_up', False),
-                diagonalDown=border_props.get('diagonal_down', False)
-            )
-        
-        # Procesar alineación
-        if 'alignment' in style_dict:
-            align_props = style_dict['alignment']
-            alignment = Alignment(
-                horizontal=align_props.get('horizontal'),
-                vertical=align_props.get('vertical'),
-                textRotation=align_props.get('text_rotation'),
-                wrapText=align_props.get('wrap_text'),
-                shrinkToFit=align_props.get('shrink_to_fit'),
-                indent=align_props.get('indent'),
-                justifyLastLine=align_props.get('justify_last_line'),
-                readingOrder=align_props.get('reading_order')
-            )
-        
-        # Procesar formato numérico
-        if 'number_format' in style_dict:
-            number_format = style_dict['number_format']
-        
-        # Crear y devolver el estilo diferencial
-        return DifferentialStyle(
-            font=font,
-            fill=fill,
-            border=border,
-            alignment=alignment,
-            numFmt=number_format
-        )
+        return _cached_differential_style(json.dumps(style_dict, sort_keys=True, default=str))
     except Exception as e:
         raise FormattingError(f"Error al crear estilo diferencial: {str(e)}")
 
+def clear_style_cache() -> None:
+    """
+    Vacía las cachés de objetos de estilo del módulo.
+    
+    Todas las cachés tienen un tamaño máximo; vaciarlas solo libera antes la
+    memoria de un servidor de larga duración.
+    """
+    for cached in (_normalize_rgb, _cached_color, _cached_border,
+                   _cached_alignment, _cached_protection, _cached_color_scale,
+                   _cached_data_bar, _cached_icon_set, _cached_differential_style):
+        cached.cache_clear()
+
 def remove_conditional_formatting(
     filepath: Union[str, Path],
     sheet_name: str,
-    cell_range: Optional[str] = None
+    cell_range: Optional[str] = None,
+    fast_save: bool = False
 ) -> Dict[str, Any]:
     """
     Elimina formato condicional de un rango de celdas o de toda la hoja.
@@ -1210,6 +2303,7 @@ def remove_conditional_formatting(
         filepath: Ruta al archivo Excel
         sheet_name: Nombre de la hoja
         cell_range: Rango de celdas a limpiar (si es None, limpia toda la hoja)
+        fast_save: Si es True, guarda con compresión rápida (ver save_workbook)
         
     Returns:
         Diccionario con el estado de la operación
@@ -1220,8 +2314,7 @@ def remove_conditional_formatting(
     """
     try:
         # Validar ruta de archivo
-        file_path = validate_file_path(filepath, must_exist=True, 
-                                     file_extensions=['.xlsx', '.xlsm'])
+        file_path = _validate_file_path_cached(str(filepath), True, _EXCEL_EXTENSIONS)
         
         # Validar nombre de hoja
         validate_sheet_name(sheet_name)
@@ -1231,32 +2324,30 @@ def remove_conditional_formatting(
             validate_cell_range(cell_range)
         
         # Abrir el libro
-        wb = open_workbook(file_path, read_only=False)
-        
-        # Verificar que la hoja existe
-        if sheet_name not in wb.sheetnames:
-            raise ValidationError(f"La hoja '{sheet_name}' no existe")
-            
-        ws = wb[sheet_name]
+        with writable_workbook(file_path) as wb:
+            # Verificar que la hoja existe
+            try:
+                ws = wb[sheet_name]
+            except KeyError:
+                raise ValidationError(f"La hoja '{sheet_name}' no existe")
+        
+            # Si no había nada que eliminar, evitar reescribir el libro completo
+            if not _apply_remove_conditional_formatting(wb, ws, cell_range):
+                return {
+                    "success": True,
+                    "message": (
+                        f"No hay formato condicional en el rango {cell_range}" if cell_range
+                        else f"La hoja '{sheet_name}' no tiene formato condicional"
+                    )
+                }
         
-        if cell_range:
-            # Eliminar formato condicional solo del rango especificado
-            to_remove = []
-            for cf_range, rules in ws.conditional_formatting.items():
-                if cf_range == cell_range:
-                    to_remove.append(cf_range)
-            
-            for cf_range in to_remove:
-                del ws.conditional_formatting[cf_range]
-                
-            message = f"Formato condicional eliminado del rango {cell_range}"
-        else:
-            # Eliminar todo el formato condicional de la hoja
-            ws.conditional_formatting = {}
-            message = f"Todo el formato condicional eliminado de la hoja '{sheet_name}'"
+            if cell_range:
+                message = f"Formato condicional eliminado del rango {cell_range}"
+            else:
+                message = f"Todo el formato condicional eliminado de la hoja '{sheet_name}'"
         
-        # Guardar cambios
-        wb.save(file_path)
+            # Guardar cambios
+            commit_workbook(wb, file_path, fast_save=fast_save)
         
         return {
             "success": True,
@@ -1292,11 +2383,11 @@ def validate_sheet_name(sheet_name: str) -> None:
     if len(sheet_name) > 31:
         raise ValidationError("El nombre de la hoja no puede exceder los 31 caracteres")
     
-    # Verificar caracteres inválidos: /, \, ?, *, [, ], :
-    invalid_chars = ['/', '\\', '?', '*', '[', ']', ':']
-    for char in invalid_chars:
-        if char in sheet_name:
-            raise ValidationError(f"El nombre de la hoja contiene un carácter inválido: '{char}'")
+    # Verificar caracteres inválidos: /, \, ?, *, [, ], : con una única
+    # intersección de conjuntos en lugar de buscar cada carácter por separado
+    if not _SHEET_NAME_FORBIDDEN.isdisjoint(sheet_name):
+        char: str = next(c for c in sheet_name if c in _SHEET_NAME_FORBIDDEN)
+        raise ValidationError(f"El nombre de la hoja contiene un carácter inválido: '{char}'")
 
 def validate_cell_range(cell_range: str) -> bool:
     """
@@ -1314,32 +2405,36 @@ def validate_cell_range(cell_range: str) -> bool:
     if not cell_range or not isinstance(cell_range, str):
         raise ValidationError("El rango de celdas debe ser una cadena no vacía")
     
-    # Expresiones regulares para validar celdas
-    single_cell_pattern = r'^[A-Za-z]{1,3}[1-9][0-9]{0,6}$'
-    cell_range_pattern = r'^[A-Za-z]{1,3}[1-9][0-9]{0,6}:[A-Za-z]{1,3}[1-9][0-9]{0,6}$'
+    return _validate_cell_range_cached(cell_range)
+
+@lru_cache(maxsize=4096)
+def _validate_cell_range_cached(cell_range: str) -> bool:
+    """
+    Cuerpo de validate_cell_range con caché por rango.
+    
+    Los lotes suelen repetir el mismo rango en muchas operaciones. lru_cache no
+    memoriza excepciones, así que solo se guardan los rangos válidos.
+    """
+    # Sin ':' solo puede ser una celda individual; con ':' solo un rango, así que
+    # cada entrada se compara contra una única expresión regular
+    match: Optional[re.Match] = None
+    if ':' not in cell_range:
+        if _SINGLE_CELL_RE.match(cell_range):
+            return True
+    else:
+        match = _CELL_RANGE_RE.match(cell_range)
     
-    # Verificar si es una celda individual o un rango
-    if re.match(single_cell_pattern, cell_range):
-        return True
-    elif re.match(cell_range_pattern, cell_range):
-        # Extraer las celdas inicial y final
-        start_cell, end_cell = cell_range.split(':')
-        
-        # Extraer columnas y filas
-        start_col = ''.join(filter(str.isalpha, start_cell))
-        start_row = int(''.join(filter(str.isdigit, start_cell)))
-        
-        end_col = ''.join(filter(str.isalpha, end_cell))
-        end_row = int(''.join(filter(str.isdigit, end_cell)))
-        
-        # Convertir columnas a índices numéricos (A=1, B=2, ...)
-        start_col_index = 0
-        for char in start_col.upper():
-            start_col_index = start_col_index * 26 + (ord(char) - ord('A') + 1)
-        
-        end_col_index = 0
-        for char in end_col.upper():
-            end_col_index = end_col_index * 26 + (ord(char) - ord('A') + 1)
+    if match:
+        # Columnas y filas de las celdas inicial y final, tomadas de los grupos
+        start_col: str = match.group(1)
+        end_col: str = match.group(3)
+        start_row: int = int(match.group(2))
+        end_row: int = int(match.group(4))
+        
+        # Convertir columnas a índices numéricos (A=1, B=2, ...); openpyxl
+        # memoriza la conversión, así que cada columna es una consulta a tabla
+        start_col_index: int = column_index_from_string(start_col.upper())
+        end_col_index: int = column_index_from_string(end_col.upper())
         
         # Verificar que la celda inicial sea menor que la final
         if (start_col_index > end_col_index) or (start_col_index == end_col_index and start_row > end_row):
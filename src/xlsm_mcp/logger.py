@@ -2,15 +2,26 @@
 Módulo para configurar el sistema de logging del servidor MCP de Excel.
 
 Este módulo configura un sistema de logging con rotación de archivos
-y diferentes niveles de detalle según el entorno.
+y diferentes niveles de detalle según el entorno. La escritura en disco y en
+consola se hace en un hilo en segundo plano para no bloquear las herramientas.
 """
 
 import os
 import sys
+import stat
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from functools import cache
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
-from typing import Optional, Union
+from typing import Optional, Set, Union
+
+try:
+    # Opcional: rotación segura cuando varios procesos comparten el archivo de log
+    from concurrent_log_handler import ConcurrentRotatingFileHandler
+except ImportError:
+    ConcurrentRotatingFileHandler = None
 
 # Nombre del logger principal
 LOGGER_NAME = "xlsm-mcp"
@@ -24,6 +35,110 @@ LOG_LEVELS = {
     "critical": logging.CRITICAL
 }
 
+# Tamaño del buffer de escritura del archivo de log
+LOG_BUFFER_SIZE = 64 * 1024
+
+# Hilo que vuelca los registros encolados en los handlers reales
+_listener: Optional[QueueListener] = None
+
+def _stop_listener() -> None:
+    """Detiene el hilo de logging, vaciando antes la cola, y cierra sus handlers."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+# Escribir los registros pendientes al cerrar el servidor
+atexit.register(_stop_listener)
+
+# Directorios de log ya creados, para no repetir mkdir al reconfigurar el logging
+_created_dirs: Set[Path] = set()
+
+def _ensure_directory(path: Path) -> None:
+    """Crea el directorio (y sus padres) la primera vez que se solicita."""
+    if path not in _created_dirs:
+        path.mkdir(parents=True, exist_ok=True)
+        _created_dirs.add(path)
+
+class _DrainFlushListener(QueueListener):
+    """
+    QueueListener que vuelca sus handlers cada vez que deja la cola vacía.
+    
+    Con ráfagas de registros las escrituras se siguen agrupando en el buffer,
+    pero en cuanto el hilo queda en espera todo lo recibido llega al archivo,
+    así que una caída del proceso no se lleva los registros ya procesados.
+    """
+    
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler que agrupa las escrituras en un buffer de 64 KB.
+    
+    Los registros de nivel WARNING o superior se vuelcan a disco al momento;
+    el resto, al llenarse el buffer, al rotar, al cerrar el handler o cuando
+    _DrainFlushListener vacía la cola.
+    
+    El handler base decide si rotar con seek y tell sobre el archivo en cada
+    registro, lo que vacía el buffer, y además consulta el sistema de archivos;
+    aquí se lleva la cuenta de los bytes escritos desde que se abrió el archivo.
+    """
+    
+    # Valores hasta la primera apertura, si el handler se crea con delay=True
+    _bytes_written = 0
+    _rotatable = True
+    
+    def _open(self):
+        stream = open(self.baseFilename, self.mode, buffering=LOG_BUFFER_SIZE,
+                      encoding=self.encoding, errors=self.errors)
+        info = os.fstat(stream.fileno())
+        # Solo se rotan archivos normales (no /dev/null, tuberías...)
+        self._rotatable = stat.S_ISREG(info.st_mode)
+        self._bytes_written = info.st_size
+        return stream
+    
+    def _encoded_size(self, msg: str) -> int:
+        if msg.isascii():
+            return len(msg)
+        return len(msg.encode(self.stream.encoding, self.stream.errors or 'strict'))
+    
+    def _rollover_due(self, size: int) -> bool:
+        # Un archivo vacío no se rota aunque el registro supere el límite
+        return (self.maxBytes > 0 and self._rotatable and self._bytes_written > 0
+                and self._bytes_written + size >= self.maxBytes)
+    
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.stream is None:
+            self.stream = self._open()
+        return self._rollover_due(self._encoded_size(self.format(record) + self.terminator))
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            msg = self.format(record) + self.terminator
+            size = self._encoded_size(msg)
+            if self._rollover_due(size):
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(msg)
+            self._bytes_written += size
+            if record.levelno >= logging.WARNING:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+@cache
 def get_log_directory() -> Path:
     """
     Determina y crea (si no existe) el directorio para archivos de log.
@@ -31,6 +146,8 @@ def get_log_directory() -> Path:
     En sistemas Windows, usa %APPDATA%/xlsm-mcp/logs/
     En sistemas Unix/Linux, usa ~/.xlsm-mcp/logs/
     
+    El resultado se memoriza: el directorio solo se crea en la primera llamada.
+    
     Returns:
         Path al directorio de logs
     """
@@ -40,7 +157,7 @@ def get_log_directory() -> Path:
         log_dir = Path.home() / '.xlsm-mcp' / 'logs'
     
     # Crear directorio si no existe
-    log_dir.mkdir(parents=True, exist_ok=True)
+    _ensure_directory(log_dir)
     
     return log_dir
 
@@ -64,6 +181,8 @@ def setup_logging(
     Returns:
         Logger configurado
     """
+    global _listener
+    
     # Obtener nivel de log
     level = LOG_LEVELS.get(log_level.lower(), logging.INFO)
     
@@ -75,15 +194,16 @@ def setup_logging(
         log_file = Path(log_file)
         
         # Crear directorio si no existe
-        log_file.parent.mkdir(parents=True, exist_ok=True)
+        _ensure_directory(log_file.parent)
     
     # Configurar logger principal
     logger = logging.getLogger(LOGGER_NAME)
     logger.setLevel(level)
     
-    # Eliminar handlers existentes
+    # Eliminar handlers existentes y detener el hilo de una configuración anterior
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
+    _stop_listener()
     
     # Formato del log
     formatter = logging.Formatter(
@@ -91,26 +211,45 @@ def setup_logging(
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     
-    # Configurar handler de archivo con rotación
-    file_handler = RotatingFileHandler(
-        log_file,
-        maxBytes=max_size_mb * 1024 * 1024,  # Convertir MB a bytes
-        backupCount=backup_count,
-        encoding='utf-8'
-    )
+    # Configurar handler de archivo con rotación. Si está instalado
+    # concurrent-log-handler se usa su handler, que bloquea el archivo al rotar
+    # y comprime los respaldos; si no, el de la biblioteca estándar con buffer
+    if ConcurrentRotatingFileHandler is not None:
+        file_handler = ConcurrentRotatingFileHandler(
+            log_file,
+            maxBytes=max_size_mb * 1024 * 1024,  # Convertir MB a bytes
+            backupCount=backup_count,
+            encoding='utf-8',
+            use_gzip=True
+        )
+    else:
+        file_handler = BufferedRotatingFileHandler(
+            log_file,
+            maxBytes=max_size_mb * 1024 * 1024,  # Convertir MB a bytes
+            backupCount=backup_count,
+            encoding='utf-8'
+        )
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    handlers = [file_handler]
     
     # Añadir handler para consola
     if console_output:
         console_handler = logging.StreamHandler(sys.stderr)
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
+    
+    # El logger solo encola los registros; un QueueListener los escribe en los
+    # handlers anteriores desde un hilo propio, de modo que la escritura y la
+    # rotación del archivo no bloquean a quien registra el mensaje
+    log_queue = queue.SimpleQueue()
+    _listener = _DrainFlushListener(log_queue, *handlers)
+    _listener.start()
+    logger.addHandler(QueueHandler(log_queue))
     
     # Evitar propagar logs a los handlers raíz
     logger.propagate = False
     
-    logger.debug(f"Sistema de logging inicializado. Nivel: {log_level}, Archivo: {log_file}")
+    logger.debug("Sistema de logging inicializado. Nivel: %s, Archivo: %s", log_level, log_file)
     
     return logger
 
@@ -66,20 +66,171 @@ import zipfile
 import logging
 import tempfile
 import re
+import shutil
+import threading
 import xml.etree.ElementTree as ET
-from typing import Any, Dict, List, Optional
-from oletools.olevba import VBA_Parser
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import olefile
+from oletools.olevba import VBA_Parser, VBA_Project
 
 from xlsm_mcp.exceptions import MacroError
+from xlsm_mcp.workbook import FAST_SAVE_COMPRESSLEVEL, copy_zip_info, finish_replace, replace_target
 
 logger = logging.getLogger("xlsm-mcp")
 
+# Modificadores que pueden preceder a Sub/Function en una declaración
+_VBA_PROC_MODIFIERS = frozenset(('Public', 'Private', 'Friend', 'Static'))
+_VBA_PROC_KINDS = frozenset(('Sub', 'Function'))
+_VBA_NAME_RE = re.compile(r'\w+')
+
+# Resultados de list_macros indexados por (ruta absoluta, mtime en ns, tamaño):
+# si el archivo cambia, cambia la clave y se vuelve a analizar
+_MACRO_CACHE: "OrderedDict[Tuple[str, int, int], List[Dict[str, Any]]]" = OrderedDict()
+_MACRO_CACHE_MAXSIZE = 64
+_MACRO_CACHE_LOCK = threading.Lock()
+
+def invalidate_macro_cache(filepath: Optional[str] = None) -> None:
+    """
+    Descarta las macros memorizadas de un archivo, o de todos si filepath es None.
+    
+    Args:
+        filepath: Ruta del archivo modificado
+    """
+    with _MACRO_CACHE_LOCK:
+        if filepath is None:
+            _MACRO_CACHE.clear()
+            return
+        path = os.path.abspath(filepath)
+        for key in [key for key in _MACRO_CACHE if key[0] == path]:
+            del _MACRO_CACHE[key]
+
+def _scan_procedures(vba_code: str):
+    """
+    Recorre el código VBA línea a línea y genera (tipo, nombre) por cada
+    declaración Sub o Function.
+    
+    Ignora comentarios ("'" y Rem) y líneas como End Sub, Exit Function o las
+    declaraciones Declare de funciones externas, que una búsqueda del texto
+    "Sub"/"Function" en todo el código confundiría con procedimientos.
+    """
+    for line in vba_code.splitlines():
+        tokens = line.split()
+        if not tokens or tokens[0].startswith("'") or tokens[0].lower() == 'rem':
+            continue
+        
+        index = 0
+        while index < len(tokens) and tokens[index] in _VBA_PROC_MODIFIERS:
+            index += 1
+        if index + 1 >= len(tokens) or tokens[index] not in _VBA_PROC_KINDS:
+            continue
+        
+        name = _VBA_NAME_RE.match(tokens[index + 1])
+        if name:
+            yield tokens[index], name.group(0)
+
+def _module_procedures(vba_filename: str, vba_code: str) -> List[Dict[str, Any]]:
+    """Devuelve los procedimientos y funciones declarados en un módulo VBA."""
+    return [
+        {"name": name, "type": kind, "source": vba_filename}
+        for kind, name in _scan_procedures(vba_code)
+    ]
+
+def _iter_vba_modules(filepath: str) -> Iterator[Tuple[str, str]]:
+    """
+    Genera (nombre de archivo, código) por cada módulo de xl/vbaProject.bin.
+    
+    VBA_Parser busca contenedores OLE en todo el ZIP, detecta macros XLM y
+    analiza flujos huérfanos antes de extraer el código. Aquí se abre
+    directamente el proyecto VBA del libro y cada módulo se descomprime solo
+    cuando se pide el siguiente, así que quien deja de iterar se ahorra el resto.
+    
+    Raises:
+        Exception: Si el archivo no es un ZIP o el proyecto VBA no tiene la
+                   estructura esperada
+    """
+    with zipfile.ZipFile(filepath) as z:
+        try:
+            vba_project = z.read('xl/vbaProject.bin')
+        except KeyError:
+            # Sin proyecto VBA no hay macros
+            return
+    
+    ole = olefile.OleFileIO(vba_project)
+    try:
+        project = VBA_Project(ole, '', 'PROJECT', 'VBA/dir', relaxed=False)
+        project.parse_project_stream()
+        for _, vba_filename, vba_code in project.parse_modules():
+            if vba_code:
+                yield vba_filename, vba_code
+    finally:
+        ole.close()
+
+def _iter_macros(filepath: str) -> Iterator[Dict[str, Any]]:
+    """
+    Genera las macros de un archivo a medida que se analizan sus módulos.
+    
+    Primero se lee directamente xl/vbaProject.bin; si no se puede, se recurre
+    a VBA_Parser. Quien solo necesita parte de las macros puede dejar de
+    iterar sin que se descompriman los módulos restantes.
+    
+    Raises:
+        MacroError: Si no se pueden extraer las macros
+    """
+    yielded = False
+    try:
+        for vba_filename, vba_code in _iter_vba_modules(filepath):
+            for macro in _module_procedures(vba_filename, vba_code):
+                yielded = True
+                yield macro
+        return
+    except Exception as e:
+        if yielded:
+            # Ya se entregaron macros: repetir con VBA_Parser las duplicaría
+            logger.error("Error al listar macros: %s", e)
+            raise MacroError(f"No se pudieron listar las macros: {str(e)}")
+        logger.debug("Lectura directa del proyecto VBA no disponible (%s); se usa VBA_Parser", e)
+    
+    try:
+        vba_parser = VBA_Parser(filepath)
+        try:
+            if vba_parser.detect_vba_macros():
+                for (_, _, vba_filename, vba_code) in vba_parser.extract_macros():
+                    # Buscar procedimientos y funciones VBA
+                    yield from _module_procedures(vba_filename, vba_code)
+        finally:
+            vba_parser.close()
+    except Exception as e:
+        logger.error("Error al listar macros: %s", e)
+        raise MacroError(f"No se pudieron listar las macros: {str(e)}")
+
+def _macro_cache_key(filepath: str) -> Tuple[str, int, int]:
+    """Clave de _MACRO_CACHE para el estado actual del archivo."""
+    try:
+        st = os.stat(filepath)
+    except FileNotFoundError:
+        raise MacroError(f"El archivo {filepath} no existe")
+    except OSError as e:
+        logger.error("Error al listar macros: %s", e)
+        raise MacroError(f"No se pudieron listar las macros: {str(e)}")
+    return (os.path.abspath(filepath), st.st_mtime_ns, st.st_size)
+
+def _cached_macros(key: Tuple[str, int, int]) -> Optional[List[Dict[str, Any]]]:
+    """Devuelve las macros memorizadas para la clave, o None si no lo están."""
+    with _MACRO_CACHE_LOCK:
+        cached = _MACRO_CACHE.get(key)
+        if cached is not None:
+            _MACRO_CACHE.move_to_end(key)
+    return cached
+
 def list_macros(filepath: str) -> List[Dict[str, Any]]:
     """
     Lista todas las macros disponibles en un libro Excel con macros.
     
     Esta función examina el archivo binario vbaProject.bin dentro del archivo XLSM
     para extraer información sobre módulos, subprocedimientos y funciones VBA.
+    El resultado se memoriza mientras el archivo no cambie de fecha de
+    modificación ni de tamaño.
     
     Args:
         filepath: Ruta al archivo Excel con macros (.xlsm)
@@ -105,24 +256,42 @@ def list_macros(filepath: str) -> List[Dict[str, Any]]:
             print(f"{m['type']}: {m['name']}")
         ```
     """
-    macros = []
+    key = _macro_cache_key(filepath)
+    cached = _cached_macros(key)
+    if cached is None:
+        cached = list(_iter_macros(filepath))
+        with _MACRO_CACHE_LOCK:
+            _MACRO_CACHE[key] = cached
+            if len(_MACRO_CACHE) > _MACRO_CACHE_MAXSIZE:
+                _MACRO_CACHE.popitem(last=False)
+    
+    # Copias: quien llama puede modificar los diccionarios (get_macro_info lo hace)
+    return [dict(macro) for macro in cached]
+
+def _find_macro(filepath: str, macro_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Busca una macro sin construir la lista completa del archivo.
+    
+    Si list_macros ya memorizó el archivo se consulta esa lista; si no, se
+    recorren las macros con _iter_macros y se para en la primera que coincide,
+    sin descomprimir los módulos siguientes.
+    
+    Returns:
+        Diccionario de la macro (una copia), o None si no se encontró
+        
+    Raises:
+        MacroError: Si el archivo no existe o no se pueden extraer las macros
+    """
+    cached = _cached_macros(_macro_cache_key(filepath))
+    if cached is not None:
+        return next((dict(macro) for macro in cached if macro["name"] == macro_name), None)
     
+    macros = _iter_macros(filepath)
     try:
-        vba_parser = VBA_Parser(filepath)
-        if vba_parser.detect_vba_macros():
-            for (_, _, vba_filename, vba_code) in vba_parser.extract_macros():
-                # Buscar procedimientos y funciones VBA
-                for match in re.finditer(r'(Sub|Function)\s+(\w+)', vba_code):
-                    macros.append({
-                        "name": match.group(2),
-                        "type": match.group(1),
-                        "source": vba_filename
-                    })
-        vba_parser.close()
-    except Exception as e:
-        logger.error(f"Error al listar macros: {e}")
-        raise MacroError(f"No se pudieron listar las macros: {str(e)}")
-    return macros
+        return next((macro for macro in macros if macro["name"] == macro_name), None)
+    finally:
+        # Cerrar el proyecto VBA aunque no se haya recorrido entero
+        macros.close()
 
 def get_macro_info(filepath: str, macro_name: str) -> Dict[str, Any]:
     """
@@ -139,22 +308,13 @@ def get_macro_info(filepath: str, macro_name: str) -> Dict[str, Any]:
         MacroError: Si ocurre un error al obtener la información de la macro
     """
     try:
-        # Verificar que el archivo existe y tiene extensión .xlsm
-        if not os.path.exists(filepath):
-            raise MacroError(f"El archivo {filepath} no existe")
-        
+        # Verificar que el archivo tiene extensión .xlsm
         if not filepath.lower().endswith('.xlsm'):
             raise MacroError(f"El archivo {filepath} no es un archivo Excel con macros (.xlsm)")
         
-        # Obtener lista de macros
-        macros = list_macros(filepath)
-        
-        # Buscar la macro solicitada
-        macro_info = None
-        for macro in macros:
-            if macro["name"] == macro_name:
-                macro_info = macro
-                break
+        # Buscar la macro parando en la primera que coincide
+        # (_find_macro comprueba que el archivo existe)
+        macro_info = _find_macro(filepath, macro_name)
                 
         if not macro_info:
             raise MacroError(f"No se encontró la macro '{macro_name}' en el archivo")
@@ -167,7 +327,7 @@ def get_macro_info(filepath: str, macro_name: str) -> Dict[str, Any]:
     except MacroError:
         raise
     except Exception as e:
-        logger.error(f"Error al obtener información de macro: {e}")
+        logger.error("Error al obtener información de macro: %s", e)
         raise MacroError(f"No se pudo obtener información de la macro {macro_name}: {str(e)}")
 
 def has_macros(filepath: str) -> bool:
@@ -184,25 +344,151 @@ def has_macros(filepath: str) -> bool:
         MacroError: Si ocurre un error al verificar el archivo
     """
     try:
+        # Verificar si es un archivo .xlsx pero tiene macros. Abrir el ZIP ya
+        # comprueba que el archivo existe
+        if filepath.lower().endswith('.xlsx'):
+            try:
+                z = zipfile.ZipFile(filepath, 'r')
+            except FileNotFoundError:
+                raise MacroError(f"El archivo {filepath} no existe")
+            # Consulta directa al índice de nombres del ZIP, sin recorrer la lista de partes
+            with z:
+                return 'xl/vbaProject.bin' in z.NameToInfo
+        
         # Verificar que el archivo existe
         if not os.path.exists(filepath):
             raise MacroError(f"El archivo {filepath} no existe")
             
-        # Verificar si es un archivo .xlsm
-        if filepath.lower().endswith('.xlsm'):
-            return True
-            
-        # Verificar si es un archivo .xlsx pero tiene macros
-        if filepath.lower().endswith('.xlsx'):
-            with zipfile.ZipFile(filepath, 'r') as z:
-                vba_files = [f for f in z.namelist() if 'vbaProject' in f]
-                return len(vba_files) > 0
-                
-        return False
+        # Los archivos .xlsm tienen macros habilitadas
+        return filepath.lower().endswith('.xlsm')
     except Exception as e:
-        logger.error(f"Error al verificar macros: {e}")
+        logger.error("Error al verificar macros: %s", e)
         raise MacroError(f"No se pudo verificar si el archivo contiene macros: {str(e)}")
 
+# Partes del paquete que modifica convert_to_xlsm
+_CONTENT_TYPES_FILE = '[Content_Types].xml'
+_WORKBOOK_FILE = 'xl/workbook.xml'
+_VBA_PROJECT_FILE = 'xl/vbaProject.bin'
+_CONTENT_TYPES_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+_SPREADSHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_VBA_CONTENT_TYPE = 'application/vnd.ms-office.vbaProject'
+
+# Etiquetas cualificadas para las rutas con ElementTree. Los espacios de nombres
+# se siguen registrando justo antes de serializar: ambos usan el prefijo por
+# defecto y ET solo admite un espacio de nombres registrado con cada prefijo
+_CT_OVERRIDE_TAG = f'{{{_CONTENT_TYPES_NS}}}Override'
+_CT_DEFAULT_TAG = f'{{{_CONTENT_TYPES_NS}}}Default'
+_WB_WORKBOOK_TAG = f'{{{_SPREADSHEET_NS}}}workbook'
+_WB_WORKBOOK_PR_TAG = f'{{{_SPREADSHEET_NS}}}workbookPr'
+
+# Encabezado mínimo de un proyecto VBA vacío
+_EMPTY_VBA_PROJECT = b'\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1\x00\x00\x00\x00\x00\x00\x00\x00'
+
+# Anclas para editar [Content_Types].xml y workbook.xml sin analizarlos con ElementTree
+_VBA_OVERRIDE_RE = re.compile(rb'<Override\b[^>]*\bPartName="[^"]*vbaProject')
+_BIN_DEFAULT_RE = re.compile(rb'<Default\b[^>]*\bExtension="bin"')
+_WORKBOOK_PR_RE = re.compile(rb'<workbookPr\b[^>]*?(/?)>')
+_VBA_WORKBOOK_PR_ATTRS_RE = re.compile(rb'\s(?:codeName|vbaSuppressed)="[^"]*"')
+_VBA_CODE_NAME_ATTR = b'codeName="ThisWorkbook"'
+_VBA_SUPPRESSED_ATTR = b'vbaSuppressed="0"'
+
+# Tamaño de bloque al leer las partes que se editan
+_PART_CHUNK_SIZE = 64 * 1024
+
+def _read_part(zin: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytearray:
+    """Lee una parte del ZIP en bloques sobre un único bytearray editable."""
+    data = bytearray()
+    with zin.open(info) as src:
+        while chunk := src.read(_PART_CHUNK_SIZE):
+            data += chunk
+    return data
+
+def _add_vba_content_types(content_types_xml: bytearray) -> Tuple[bytes, bool]:
+    """
+    Registra vbaProject.bin en [Content_Types].xml si todavía no lo está.
+    
+    Las etiquetas se insertan en el propio bytearray antes de </Types>; solo
+    si el archivo no tiene esa forma (p. ej. usa prefijos de espacio de
+    nombres) se recurre a ElementTree.
+    
+    Returns:
+        Tupla (xml resultante, True si se añadió la referencia al proyecto VBA)
+    """
+    if _VBA_OVERRIDE_RE.search(content_types_xml):
+        return content_types_xml, False
+    
+    end = content_types_xml.rfind(b'</Types>')
+    if end != -1:
+        tags = f'<Override PartName="/{_VBA_PROJECT_FILE}" ContentType="{_VBA_CONTENT_TYPE}"/>'.encode()
+        if not _BIN_DEFAULT_RE.search(content_types_xml):
+            tags += f'<Default Extension="bin" ContentType="{_VBA_CONTENT_TYPE}"/>'.encode()
+        content_types_xml[end:end] = tags
+        return content_types_xml, True
+    
+    return _add_vba_content_types_tree(content_types_xml)
+
+def _add_vba_content_types_tree(content_types_xml: bytearray) -> Tuple[bytes, bool]:
+    """Versión de _add_vba_content_types con ElementTree, para XML con otra forma."""
+    tree = ET.fromstring(content_types_xml)
+    
+    for elem in tree.iter(_CT_OVERRIDE_TAG):
+        if 'vbaProject' in elem.attrib.get('PartName', ''):
+            return content_types_xml, False
+    
+    # Añadir el tipo vbaProject
+    vba_elem = ET.SubElement(tree, _CT_OVERRIDE_TAG)
+    vba_elem.set('PartName', '/' + _VBA_PROJECT_FILE)
+    vba_elem.set('ContentType', _VBA_CONTENT_TYPE)
+    
+    # También asegurarse de que esté la extensión de macros habilitadas
+    if not any(elem.attrib.get('Extension') == 'bin' for elem in tree.iter(_CT_DEFAULT_TAG)):
+        bin_elem = ET.SubElement(tree, _CT_DEFAULT_TAG)
+        bin_elem.set('Extension', 'bin')
+        bin_elem.set('ContentType', _VBA_CONTENT_TYPE)
+    
+    ET.register_namespace('', _CONTENT_TYPES_NS)
+    return ET.tostring(tree), True
+
+def _enable_vba_in_workbook(workbook_xml: bytearray) -> bytes:
+    """
+    Añade a workbook.xml los atributos de workbookPr que indican soporte de macros.
+    
+    Si existe la etiqueta <workbookPr>, se reescribe solo esa etiqueta dentro
+    del propio bytearray; en otro caso se recurre a ElementTree. Si el libro ya
+    tiene ambos atributos se devuelve sin cambios.
+    """
+    # codeName solo aparece en workbookPr dentro de workbook.xml
+    if _VBA_CODE_NAME_ATTR in workbook_xml and _VBA_SUPPRESSED_ATTR in workbook_xml:
+        return workbook_xml
+    
+    match = _WORKBOOK_PR_RE.search(workbook_xml)
+    if match is None:
+        return _enable_vba_in_workbook_tree(workbook_xml)
+    
+    closing = b'/>' if match.group(1) else b'>'
+    attrs = _VBA_WORKBOOK_PR_ATTRS_RE.sub(b'', match.group(0)[:-len(closing)]).rstrip()
+    tag = attrs + b' ' + _VBA_CODE_NAME_ATTR + b' ' + _VBA_SUPPRESSED_ATTR + closing
+    workbook_xml[match.start():match.end()] = tag
+    return workbook_xml
+
+def _enable_vba_in_workbook_tree(workbook_xml: bytearray) -> bytes:
+    """Versión de _enable_vba_in_workbook con ElementTree, para XML con otra forma."""
+    wb_tree = ET.fromstring(workbook_xml)
+    
+    # Añadir soporte para VBA en el nodo workbookPr
+    wb_props = next(wb_tree.iter(_WB_WORKBOOK_PR_TAG), None)
+    if wb_props is None:
+        # Si no existe el nodo workbookPr, crearlo (el nodo workbook es la raíz)
+        wb_node = wb_tree if wb_tree.tag == _WB_WORKBOOK_TAG else wb_tree.find(f'.//{_WB_WORKBOOK_TAG}')
+        if wb_node is not None:
+            wb_props = ET.SubElement(wb_node, _WB_WORKBOOK_PR_TAG)
+    if wb_props is not None:
+        wb_props.set('codeName', 'ThisWorkbook')
+        wb_props.set('vbaSuppressed', '0')
+    
+    ET.register_namespace('', _SPREADSHEET_NS)
+    return ET.tostring(wb_tree)
+
 def convert_to_xlsm(filepath: str, output_filepath: Optional[str] = None) -> str:
     """
     Convierte un archivo .xlsx a .xlsm para permitir el uso de macros.
@@ -236,133 +522,86 @@ def convert_to_xlsm(filepath: str, output_filepath: Optional[str] = None) -> str
         ```
     """
     try:
-        # Verificar que el archivo existe
-        if not os.path.exists(filepath):
-            raise MacroError(f"El archivo {filepath} no existe")
-            
         # Verificar que el archivo es un .xlsx
         if not filepath.lower().endswith('.xlsx'):
+            if not os.path.exists(filepath):
+                raise MacroError(f"El archivo {filepath} no existe")
             if filepath.lower().endswith('.xlsm'):
-                logger.info(f"El archivo {filepath} ya está en formato .xlsm")
+                logger.info("El archivo %s ya está en formato .xlsm", filepath)
                 return filepath
             else:
                 raise MacroError(f"El archivo {filepath} no es un archivo Excel (.xlsx)")
         
-        # Verificar que el archivo es un ZIP válido (todos los Excel son archivos ZIP)
-        try:
-            with zipfile.ZipFile(filepath, 'r'):
-                pass
-        except zipfile.BadZipFile:
-            raise MacroError(f"El archivo {filepath} está dañado o no es un archivo Excel válido")
-            
         # Determinar ruta de salida
         if not output_filepath:
             output_filepath = os.path.splitext(filepath)[0] + '.xlsm'
         
-        # Verificar si el directorio de salida existe
+        # Crear el directorio de salida si no existe. Los permisos de escritura no
+        # se comprueban por adelantado: si faltan, falla la propia escritura
         output_dir = os.path.dirname(output_filepath)
-        if output_dir and not os.path.exists(output_dir):
+        if output_dir:
             os.makedirs(output_dir, exist_ok=True)
             
-        # Verificar si tenemos permisos de escritura en la ruta de salida
-        if os.path.exists(output_filepath):
-            if not os.access(output_filepath, os.W_OK):
-                raise MacroError(f"No hay permisos de escritura para {output_filepath}")
-        elif not os.access(os.path.dirname(output_filepath) or '.', os.W_OK):
-            raise MacroError(f"No hay permisos de escritura en el directorio para {output_filepath}")
-            
-        # Copiar archivo a nuevo formato
-        import shutil
+        # Reescribir el archivo en una sola pasada: cada parte se copia al nuevo
+        # ZIP y solo se transforman los tipos de contenido y workbook.xml. Se
+        # escribe en un temporal que después reemplaza a la salida
+        # El archivo de entrada se abre una única vez, y esa misma apertura
+        # comprueba que es un ZIP válido (todos los archivos Excel lo son)
         try:
-            shutil.copy2(filepath, output_filepath)
-        except (shutil.Error, IOError) as e:
-            raise MacroError(f"Error al copiar el archivo: {str(e)}")
+            zin = zipfile.ZipFile(filepath, 'r')
+        except FileNotFoundError:
+            raise MacroError(f"El archivo {filepath} no existe")
+        except zipfile.BadZipFile:
+            raise MacroError(f"El archivo {filepath} está dañado o no es un archivo Excel válido")
         
-        # Actualizar metadatos internos para indicar soporte de macros
+        dest_path, tmp_path = replace_target(output_filepath)
         try:
-            with zipfile.ZipFile(output_filepath, 'a') as z:
-                # Leer archivo de tipos de contenido
-                content_types_file = '[Content_Types].xml'
-                
-                if content_types_file not in z.namelist():
+            # Cada parte conserva su método de compresión original; las
+            # comprimidas se escriben con el nivel rápido de fast_save, que
+            # lleva la ZipInfo nueva de cada parte (ver copy_zip_info)
+            with zin, zipfile.ZipFile(
+                tmp_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True
+            ) as zout:
+                names = zin.NameToInfo
+                if _CONTENT_TYPES_FILE not in names:
                     raise MacroError(f"El archivo {filepath} no tiene un formato Excel válido")
                 
-                content_types_xml = z.read(content_types_file)
-                tree = ET.fromstring(content_types_xml)
-                
-                # Namespace para XML
-                ns = '{http://schemas.openxmlformats.org/package/2006/content-types}'
-                ET.register_namespace('', 'http://schemas.openxmlformats.org/package/2006/content-types')
-                
-                # Añadir referencia a vbaProject si no existe
-                vba_found = False
-                
-                for elem in tree.findall(f'.//{ns}Override'):
-                    if 'vbaProject' in elem.attrib.get('PartName', ''):
-                        vba_found = True
-                        break
-                        
-                if not vba_found:
-                    # Añadir el tipo vbaProject
-                    vba_elem = ET.SubElement(tree, f'{ns}Override')
-                    vba_elem.set('PartName', '/xl/vbaProject.bin')
-                    vba_elem.set('ContentType', 'application/vnd.ms-office.vbaProject')
-                    
-                    # También asegurarse de que esté la extensión de macros habilitadas
-                    macro_ext_found = False
-                    for elem in tree.findall(f'.//{ns}Default'):
-                        if elem.attrib.get('Extension') == 'bin':
-                            macro_ext_found = True
-                            break
-                    
-                    if not macro_ext_found:
-                        bin_elem = ET.SubElement(tree, f'{ns}Default')
-                        bin_elem.set('Extension', 'bin')
-                        bin_elem.set('ContentType', 'application/vnd.ms-office.vbaProject')
-                    
-                    # Crear estructura vacía de vbaProject.bin
-                    # En una implementación real, tendríamos un template de vbaProject.bin 
-                    empty_vba = b'\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1\x00\x00\x00\x00\x00\x00\x00\x00'  # Encabezado mínimo
-                    z.writestr('xl/vbaProject.bin', empty_vba)
-                    
-                    # Escribir archivo actualizado de content types
-                    z.writestr(content_types_file, ET.tostring(tree))
-                    
-                # Actualizar workbook.xml para indicar soporte de macros
-                wb_file = 'xl/workbook.xml'
-                if wb_file in z.namelist():
-                    wb_xml = z.read(wb_file)
-                    wb_tree = ET.fromstring(wb_xml)
-                    
-                    # Añadir el atributo codeName si es necesario
-                    ns_wb = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
-                    wb_ns = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
-                    ET.register_namespace('', wb_ns)
-                    
-                    # Añadir soporte para VBA en el nodo workbookPr
-                    wb_props = wb_tree.find(f'.//{ns_wb}workbookPr')
-                    if wb_props is not None:
-                        wb_props.set('codeName', 'ThisWorkbook')
-                        wb_props.set('vbaSuppressed', '0')
+                add_vba = False
+                for info in zin.infolist():
+                    entry = copy_zip_info(info, FAST_SAVE_COMPRESSLEVEL)
+                    if info.filename == _CONTENT_TYPES_FILE:
+                        data, add_vba = _add_vba_content_types(_read_part(zin, info))
+                        zout.writestr(entry, data)
+                    elif info.filename == _WORKBOOK_FILE:
+                        data = _enable_vba_in_workbook(_read_part(zin, info))
+                        zout.writestr(entry, data)
                     else:
-                        # Si no existe el nodo workbookPr, crearlo
-                        wb_node = wb_tree.find(f'.//{ns_wb}workbook')
-                        if wb_node is not None:
-                            wb_props = ET.SubElement(wb_node, f'{ns_wb}workbookPr')
-                            wb_props.set('codeName', 'ThisWorkbook')
-                            wb_props.set('vbaSuppressed', '0')
-                    
-                    # Escribir archivo de workbook actualizado
-                    z.writestr(wb_file, ET.tostring(wb_tree))
-        
-        except Exception as e:
-            logger.error(f"Error al modificar metadatos XML: {e}")
+                        with zin.open(info) as src, zout.open(entry, 'w') as dst:
+                            shutil.copyfileobj(src, dst, 1024 * 1024)
+                
+                # Crear estructura vacía de vbaProject.bin si el archivo no la tiene
+                # En una implementación real, tendríamos un template de vbaProject.bin
+                if add_vba and _VBA_PROJECT_FILE not in names:
+                    # Blob binario diminuto: comprimirlo no aporta nada
+                    zout.writestr(_VBA_PROJECT_FILE, _EMPTY_VBA_PROJECT, compress_type=zipfile.ZIP_STORED)
+            finish_replace(tmp_path, dest_path)
+        except BaseException as e:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            if isinstance(e, MacroError) or not isinstance(e, Exception):
+                raise
+            if isinstance(e, PermissionError):
+                raise MacroError(f"No hay permisos de escritura para {output_filepath}")
+            logger.error("Error al modificar metadatos XML: %s", e)
             raise MacroError(f"Error al actualizar metadatos del archivo: {str(e)}")
         
-        logger.info(f"Archivo convertido correctamente a {output_filepath}")
+        invalidate_macro_cache(output_filepath)
+        logger.info("Archivo convertido correctamente a %s", output_filepath)
         return output_filepath
     except MacroError:
         raise
     except Exception as e:
-        logger.error(f"Error inesperado al convertir a XLSM: {e}")
+        logger.error("Error inesperado al convertir a XLSM: %s", e)
         raise MacroError(f"No se pudo convertir el archivo a formato XLSM: {str(e)}")
\ No newline at end of file
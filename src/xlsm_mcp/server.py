@@ -3,7 +3,8 @@ import json
 import asyncio
 import logging
 import os
-from typing import Any, List, Dict, Optional
+import weakref
+from typing import Any, Callable, List, Dict, Optional
 
 from mcp.server.fastmcp import FastMCP
 
@@ -18,11 +19,11 @@ from xlsm_mcp.exceptions import (
 )
 
 # Importar funcionalidades
-from xlsm_mcp.workbook import get_workbook_info, create_workbook
-from xlsm_mcp.sheet import create_worksheet, copy_sheet, delete_sheet, rename_sheet
+from xlsm_mcp.workbook import get_workbook_info, create_workbook, flush_workbook
+from xlsm_mcp.sheet import create_worksheet, copy_sheet, delete_sheet, rename_sheet, batch_sheet_ops
 from xlsm_mcp.data import read_excel_range, write_data
 from xlsm_mcp.macros import list_macros, get_macro_info
-from xlsm_mcp.formatting import format_range
+from xlsm_mcp.formatting import format_range, format_ranges
 
 # Configurar logger
 logger = logging.getLogger("xlsm-mcp")
@@ -30,13 +31,58 @@ logger = logging.getLogger("xlsm-mcp")
 # Inicializar FastMCP
 mcp = FastMCP("xlsm-mcp", description="Servidor MCP para manipular archivos Excel con macros (.xlsm)")
 
+# Un candado por archivo para las herramientas que lo modifican: al ejecutarse en
+# hilos, dos escrituras simultáneas sobre el mismo libro podrían perder cambios.
+# Las referencias son débiles: cada escritura en curso o en espera mantiene
+# viva su candado, y cuando ninguna lo usa desaparece del diccionario
+_FILE_LOCKS: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+def _file_lock(filepath: str) -> asyncio.Lock:
+    # Ruta real: un enlace simbólico y su destino son el mismo libro
+    key = os.path.realpath(filepath)
+    lock = _FILE_LOCKS.get(key)
+    if lock is None:
+        lock = _FILE_LOCKS[key] = asyncio.Lock()
+    return lock
+
+async def _run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Ejecuta una función de E/S bloqueante en un hilo, sin bloquear el bucle de eventos."""
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+async def _run_writing(filepath: str, func: Callable, *args, **kwargs) -> Any:
+    """Como _run_blocking, pero serializando las modificaciones de un mismo archivo."""
+    # La variable local es la referencia fuerte que conserva el candado en
+    # _FILE_LOCKS mientras se espera o se tiene
+    lock = _file_lock(filepath)
+    async with lock:
+        return await _run_blocking(func, *args, **kwargs)
+
+# Partes fijas de las respuestas de error tipadas; cada respuesta solo añade
+# el mensaje
+_ERROR_ENVELOPES: Dict[str, Dict[str, Any]] = {
+    error_type: {"success": False, "error_type": error_type}
+    for error_type in (
+        "FileNotFoundError",
+        "ValidationError",
+        "WorkbookError",
+        "SheetError",
+        "DataError",
+        "UnexpectedError"
+    )
+}
+
+def _error_response(error_type: str, error_msg: str) -> Dict[str, Any]:
+    """Construye la respuesta de error de una herramienta a partir de su plantilla."""
+    return {**_ERROR_ENVELOPES[error_type], "error": error_msg}
+
 @mcp.tool()
 async def read_data_from_excel(
     filepath: str,
     sheet_name: str,
     start_cell: str = "A1",
     end_cell: Optional[str] = None,
-    include_formulas: bool = False
+    include_formulas: bool = False,
+    layout: str = "records"
 ) -> Dict[str, Any]:
     """
     Lee datos de una hoja de Excel.
@@ -47,6 +93,7 @@ async def read_data_from_excel(
         start_cell: Celda inicial (por defecto "A1")
         end_cell: Celda final (opcional)
         include_formulas: Si es True, incluye las fórmulas en lugar de sus valores
+        layout: "records" (lista de filas) o "columns" (lista de valores por columna)
         
     Returns:
         Diccionario con los datos leídos
@@ -56,13 +103,11 @@ async def read_data_from_excel(
         if not os.path.exists(filepath):
             error_msg = f"El archivo no existe en la ruta: {filepath}"
             logger.error(error_msg)
-            return {
-                "success": False,
-                "error": error_msg,
-                "error_type": "FileNotFoundError"
-            }
+            return _error_response("FileNotFoundError", error_msg)
             
-        data = read_excel_range(filepath, sheet_name, start_cell, end_cell, include_formulas)
+        data = await _run_blocking(
+            read_excel_range, filepath, sheet_name, start_cell, end_cell, include_formulas, layout
+        )
         return {
             "success": True,
             "data": data,
@@ -71,50 +116,31 @@ async def read_data_from_excel(
     except ValidationError as e:
         error_msg = f"Error de validación: {str(e)}"
         logger.error(error_msg)
-        return {
-            "success": False,
-            "error": error_msg,
-            "error_type": "ValidationError"
-        }
+        return _error_response("ValidationError", error_msg)
     except WorkbookError as e:
         error_msg = f"Error con el libro Excel: {str(e)}"
         logger.error(error_msg)
-        return {
-            "success": False,
-            "error": error_msg,
-            "error_type": "WorkbookError"
-        }
+        return _error_response("WorkbookError", error_msg)
     except SheetError as e:
         error_msg = f"Error con la hoja '{sheet_name}': {str(e)}"
         logger.error(error_msg)
-        return {
-            "success": False,
-            "error": error_msg,
-            "error_type": "SheetError"
-        }
+        return _error_response("SheetError", error_msg)
     except DataError as e:
         error_msg = f"Error con los datos: {str(e)}"
         logger.error(error_msg)
-        return {
-            "success": False,
-            "error": error_msg,
-            "error_type": "DataError"
-        }
+        return _error_response("DataError", error_msg)
     except Exception as e:
         error_msg = f"Error inesperado al leer datos: {str(e)}"
         logger.error(error_msg)
-        return {
-            "success": False,
-            "error": error_msg,
-            "error_type": "UnexpectedError"
-        }
+        return _error_response("UnexpectedError", error_msg)
 
 @mcp.tool()
 async def write_data_to_excel(
     filepath: str,
     sheet_name: str,
     data: List[Dict],
-    start_cell: str = "A1"
+    start_cell: str = "A1",
+    defer_save: bool = False
 ) -> Dict[str, Any]:
     """
     Escribe datos en una hoja de Excel.
@@ -124,18 +150,46 @@ async def write_data_to_excel(
         sheet_name: Nombre de la hoja
         data: Lista de diccionarios con los datos a escribir
         start_cell: Celda inicial donde comenzar a escribir
+        defer_save: Si es True, acumula los cambios en memoria hasta llamar a
+                    flush_workbook_changes
         
     Returns:
         Diccionario con el resultado de la operación
     """
     try:
-        result = write_data(filepath, sheet_name, data, start_cell)
+        result = await _run_writing(filepath, write_data, filepath, sheet_name, data, start_cell, defer_save=defer_save)
         return {
             "success": True,
             "message": f"Datos escritos correctamente en {sheet_name} desde {start_cell}"
         }
     except Exception as e:
-        logger.error(f"Error al escribir datos: {e}")
+        logger.error("Error al escribir datos: %s", e)
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@mcp.tool()
+async def flush_workbook_changes(
+    filepath: str
+) -> Dict[str, Any]:
+    """
+    Guarda en disco los cambios diferidos de un libro de Excel.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        
+    Returns:
+        Diccionario con el resultado de la operación
+    """
+    try:
+        saved = await _run_writing(filepath, flush_workbook, filepath)
+        return {
+            "success": True,
+            "message": f"Cambios guardados en {filepath}" if saved else f"No hay cambios pendientes en {filepath}"
+        }
+    except Exception as e:
+        logger.error("Error al guardar cambios pendientes: %s", e)
         return {
             "success": False,
             "error": str(e)
@@ -157,13 +211,13 @@ async def create_new_workbook(
         Diccionario con el resultado de la operación
     """
     try:
-        create_workbook(filepath, with_macros)
+        await _run_writing(filepath, create_workbook, filepath, with_macros)
         return {
             "success": True,
             "message": f"Libro creado correctamente en {filepath}"
         }
     except Exception as e:
-        logger.error(f"Error al crear libro: {e}")
+        logger.error("Error al crear libro: %s", e)
         return {
             "success": False,
             "error": str(e)
@@ -185,13 +239,44 @@ async def create_new_worksheet(
         Diccionario con el resultado de la operación
     """
     try:
-        create_worksheet(filepath, sheet_name)
+        await _run_writing(filepath, create_worksheet, filepath, sheet_name)
         return {
             "success": True,
             "message": f"Hoja '{sheet_name}' creada correctamente"
         }
     except Exception as e:
-        logger.error(f"Error al crear hoja: {e}")
+        logger.error("Error al crear hoja: %s", e)
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@mcp.tool()
+async def apply_sheet_operations(
+    filepath: str,
+    operations: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Aplica varias operaciones de hoja guardando el libro una sola vez.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        operations: Lista de operaciones. Cada una es un diccionario con "op"
+                    (create_worksheet, copy_sheet, delete_sheet, rename_sheet,
+                    merge_range o unmerge_range) y "args" con los argumentos
+                    de la operación
+        
+    Returns:
+        Diccionario con el resultado de la operación
+    """
+    try:
+        result = await _run_writing(filepath, batch_sheet_ops, filepath, operations)
+        return {
+            "success": True,
+            **result
+        }
+    except Exception as e:
+        logger.error("Error al aplicar operaciones de hoja: %s", e)
         return {
             "success": False,
             "error": str(e)
@@ -213,13 +298,13 @@ async def get_workbook_metadata(
         Diccionario con metadatos del libro
     """
     try:
-        info = get_workbook_info(filepath, include_macros)
+        info = await _run_blocking(get_workbook_info, filepath, include_macros)
         return {
             "success": True,
             "data": info
         }
     except Exception as e:
-        logger.error(f"Error al obtener metadatos: {e}")
+        logger.error("Error al obtener metadatos: %s", e)
         return {
             "success": False,
             "error": str(e)
@@ -239,13 +324,13 @@ async def list_macros_in_workbook(
         Diccionario con lista de macros
     """
     try:
-        macros = list_macros(filepath)
+        macros = await _run_blocking(list_macros, filepath)
         return {
             "success": True,
             "data": macros
         }
     except Exception as e:
-        logger.error(f"Error al listar macros: {e}")
+        logger.error("Error al listar macros: %s", e)
         return {
             "success": False,
             "error": str(e)
@@ -267,13 +352,13 @@ async def get_macro_details(
         Diccionario con detalles de la macro
     """
     try:
-        info = get_macro_info(filepath, macro_name)
+        info = await _run_blocking(get_macro_info, filepath, macro_name)
         return {
             "success": True,
             "data": info
         }
     except Exception as e:
-        logger.error(f"Error al obtener detalles de macro: {e}")
+        logger.error("Error al obtener detalles de macro: %s", e)
         return {
             "success": False,
             "error": str(e)
@@ -309,7 +394,9 @@ async def format_cell_range(
         Diccionario con el resultado de la operación
     """
     try:
-        format_range(
+        await _run_writing(
+            filepath,
+            format_range,
             filepath, 
             sheet_name, 
             start_cell, 
@@ -326,7 +413,36 @@ async def format_cell_range(
             "message": f"Formato aplicado correctamente a rango {start_cell}:{end_cell or start_cell}"
         }
     except Exception as e:
-        logger.error(f"Error al aplicar formato: {e}")
+        logger.error("Error al aplicar formato: %s", e)
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@mcp.tool()
+async def format_cell_ranges(
+    filepath: str,
+    operations: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Aplica varias operaciones de formato guardando el libro una sola vez.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        operations: Lista de operaciones. Cada una es un diccionario con "op"
+                    (format_range, clear_formatting, apply_named_style,
+                    set_column_width, set_row_height,
+                    add_conditional_formatting o
+                    remove_conditional_formatting) y "args" con los
+                    argumentos de la operación, incluido "sheet_name"
+        
+    Returns:
+        Diccionario con el resultado de la operación
+    """
+    try:
+        return await _run_writing(filepath, format_ranges, filepath, operations)
+    except Exception as e:
+        logger.error("Error al aplicar operaciones de formato: %s", e)
         return {
             "success": False,
             "error": str(e)
@@ -3,60 +3,57 @@ Módulo para operaciones con hojas de Excel en archivos con macros (.xlsm)
 """
 
 import logging
-from typing import Any, Dict, List, Optional, Union
-from copy import copy
+from typing import Any, Callable, Dict, List
 
+from openpyxl.workbook import Workbook
+from openpyxl.worksheet.cell_range import CellRange
 from openpyxl.worksheet.worksheet import Worksheet
-from openpyxl.utils import get_column_letter, column_index_from_string
-from openpyxl.styles import Font, Border, PatternFill, Side
 
-from xlsm_mcp.exceptions import SheetError, ValidationError
-from xlsm_mcp.workbook import open_workbook
+from xlsm_mcp.exceptions import SheetError
+from xlsm_mcp.workbook import commit_workbook, writable_workbook
+from xlsm_mcp.data import parse_cell_range
 
 logger = logging.getLogger("xlsm-mcp")
 
-def parse_cell_range(start_cell: str, end_cell: Optional[str] = None) -> tuple:
+def _run_sheet_op(filepath: str, handler: Callable[..., Dict[str, Any]], *args) -> Dict[str, Any]:
     """
-    Analiza referencias de celdas y devuelve coordenadas de fila/columna.
+    Abre el libro, aplica una operación de hoja y lo guarda una vez.
     
-    Args:
-        start_cell: Referencia de celda inicial (ej. "A1")
-        end_cell: Referencia de celda final opcional (ej. "C5")
-        
-    Returns:
-        Tupla (fila_inicio, columna_inicio, fila_fin, columna_fin)
-        
-    Raises:
-        ValueError: Si las referencias de celda son inválidas
+    Las operaciones que no modifican nada devuelven "changed": False; en ese
+    caso el libro no se vuelve a escribir.
     """
-    def _parse_cell(cell_ref: str) -> tuple:
-        # Extrae letras de columna y número de fila
-        import re
-        match = re.match(r'^([A-Za-z]+)(\d+)$', cell_ref)
-        if not match:
-            raise ValueError(f"Referencia de celda inválida: {cell_ref}")
-            
-        col_str, row_str = match.groups()
-        row = int(row_str)
-        
-        # Convierte letras de columna a número
-        col = 0
-        for char in col_str.upper():
-            col = col * 26 + (ord(char) - ord('A') + 1)
-            
-        return row, col
+    with writable_workbook(filepath) as wb:
+        result = handler(wb, *args)
+        if result.pop("changed", True):
+            commit_workbook(wb, filepath)
+        return result
+
+def _run_bulk_sheet_op(filepath: str, op_name: str, args_list: List[Dict[str, Any]],
+                       message: str) -> Dict[str, Any]:
+    """
+    Aplica la misma operación de hoja varias veces mediante batch_sheet_ops.
     
-    try:
-        start_row, start_col = _parse_cell(start_cell)
-        
-        if end_cell:
-            end_row, end_col = _parse_cell(end_cell)
-        else:
-            end_row, end_col = None, None
-            
-        return start_row, start_col, end_row, end_col
-    except Exception as e:
-        raise ValueError(f"Error al analizar rango de celdas: {str(e)}")
+    El libro se abre y se guarda una sola vez; si alguna aplicación falla no se
+    guarda ninguna.
+    """
+    result = batch_sheet_ops(filepath, [{"op": op_name, "args": args} for args in args_list])
+    return {"message": message, "results": result["results"]}
+
+def _is_merged(ws: Worksheet, range_str: str) -> bool:
+    """Indica si range_str coincide exactamente con un rango combinado de la hoja."""
+    bounds = CellRange(range_str).bounds
+    return any(merged.bounds == bounds for merged in ws.merged_cells.ranges)
+
+def _create_worksheet(wb: Workbook, sheet_name: str) -> Dict[str, Any]:
+    """Crea la hoja en un libro ya abierto, sin guardarlo."""
+    # Verificar si la hoja ya existe
+    if sheet_name in wb.sheetnames:
+        raise SheetError(f"La hoja '{sheet_name}' ya existe")
+        
+    # Crear nueva hoja
+    wb.create_sheet(sheet_name)
+    
+    return {"message": f"Hoja '{sheet_name}' creada correctamente"}
 
 def create_worksheet(filepath: str, sheet_name: str) -> Dict[str, Any]:
     """
@@ -73,27 +70,53 @@ def create_worksheet(filepath: str, sheet_name: str) -> Dict[str, Any]:
         SheetError: Si ocurre un error al crear la hoja
     """
     try:
-        # Abrir el libro
-        wb = open_workbook(filepath, read_only=False)
-        
-        # Verificar si la hoja ya existe
-        if sheet_name in wb.sheetnames:
-            raise SheetError(f"La hoja '{sheet_name}' ya existe")
-            
-        # Crear nueva hoja
-        wb.create_sheet(sheet_name)
-        
-        # Guardar y cerrar
-        wb.save(filepath)
-        wb.close()
-        
-        return {"message": f"Hoja '{sheet_name}' creada correctamente"}
+        return _run_sheet_op(filepath, _create_worksheet, sheet_name)
     except SheetError:
         raise
     except Exception as e:
         logger.error(f"Error al crear hoja: {e}")
         raise SheetError(f"Error al crear hoja: {str(e)}")
 
+def create_worksheets(filepath: str, sheet_names: List[str]) -> Dict[str, Any]:
+    """
+    Crea varias hojas nuevas en un libro de Excel existente con un único guardado.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        sheet_names: Nombres de las nuevas hojas, en el orden de creación
+        
+    Returns:
+        Diccionario con el resultado de la operación y los mensajes de cada hoja
+        
+    Raises:
+        SheetError: Si alguna hoja ya existe o ocurre un error al crearlas
+    """
+    if not sheet_names:
+        raise SheetError("No se proporcionaron nombres de hoja")
+        
+    return _run_bulk_sheet_op(
+        filepath, "create_worksheet",
+        [{"sheet_name": name} for name in sheet_names],
+        f"{len(sheet_names)} hojas creadas correctamente"
+    )
+
+def _copy_sheet(wb: Workbook, source_sheet: str, target_sheet: str) -> Dict[str, Any]:
+    """Copia la hoja en un libro ya abierto, sin guardarlo."""
+    # Verificar que la hoja de origen existe
+    if source_sheet not in wb.sheetnames:
+        raise SheetError(f"La hoja de origen '{source_sheet}' no existe")
+        
+    # Verificar que la hoja de destino no existe
+    if target_sheet in wb.sheetnames:
+        raise SheetError(f"La hoja de destino '{target_sheet}' ya existe")
+        
+    # Copiar hoja
+    source = wb[source_sheet]
+    target = wb.copy_worksheet(source)
+    target.title = target_sheet
+    
+    return {"message": f"Hoja '{source_sheet}' copiada a '{target_sheet}'"}
+
 def copy_sheet(filepath: str, source_sheet: str, target_sheet: str) -> Dict[str, Any]:
     """
     Copia una hoja dentro del mismo libro.
@@ -110,33 +133,28 @@ def copy_sheet(filepath: str, source_sheet: str, target_sheet: str) -> Dict[str,
         SheetError: Si ocurre un error al copiar la hoja
     """
     try:
-        # Abrir el libro
-        wb = open_workbook(filepath, read_only=False)
-        
-        # Verificar que la hoja de origen existe
-        if source_sheet not in wb.sheetnames:
-            raise SheetError(f"La hoja de origen '{source_sheet}' no existe")
-            
-        # Verificar que la hoja de destino no existe
-        if target_sheet in wb.sheetnames:
-            raise SheetError(f"La hoja de destino '{target_sheet}' ya existe")
-            
-        # Copiar hoja
-        source = wb[source_sheet]
-        target = wb.copy_worksheet(source)
-        target.title = target_sheet
-        
-        # Guardar y cerrar
-        wb.save(filepath)
-        wb.close()
-        
-        return {"message": f"Hoja '{source_sheet}' copiada a '{target_sheet}'"}
+        return _run_sheet_op(filepath, _copy_sheet, source_sheet, target_sheet)
     except SheetError:
         raise
     except Exception as e:
         logger.error(f"Error al copiar hoja: {e}")
         raise SheetError(f"Error al copiar hoja: {str(e)}")
 
+def _delete_sheet(wb: Workbook, sheet_name: str) -> Dict[str, Any]:
+    """Elimina la hoja de un libro ya abierto, sin guardarlo."""
+    # Verificar que la hoja existe
+    if sheet_name not in wb.sheetnames:
+        raise SheetError(f"La hoja '{sheet_name}' no existe")
+        
+    # Verificar que no es la única hoja
+    if len(wb.sheetnames) == 1:
+        raise SheetError("No se puede eliminar la única hoja del libro")
+        
+    # Eliminar hoja
+    del wb[sheet_name]
+    
+    return {"message": f"Hoja '{sheet_name}' eliminada"}
+
 def delete_sheet(filepath: str, sheet_name: str) -> Dict[str, Any]:
     """
     Elimina una hoja del libro.
@@ -152,31 +170,53 @@ def delete_sheet(filepath: str, sheet_name: str) -> Dict[str, Any]:
         SheetError: Si ocurre un error al eliminar la hoja
     """
     try:
-        # Abrir el libro
-        wb = open_workbook(filepath, read_only=False)
-        
-        # Verificar que la hoja existe
-        if sheet_name not in wb.sheetnames:
-            raise SheetError(f"La hoja '{sheet_name}' no existe")
-            
-        # Verificar que no es la única hoja
-        if len(wb.sheetnames) == 1:
-            raise SheetError("No se puede eliminar la única hoja del libro")
-            
-        # Eliminar hoja
-        del wb[sheet_name]
-        
-        # Guardar y cerrar
-        wb.save(filepath)
-        wb.close()
-        
-        return {"message": f"Hoja '{sheet_name}' eliminada"}
+        return _run_sheet_op(filepath, _delete_sheet, sheet_name)
     except SheetError:
         raise
     except Exception as e:
         logger.error(f"Error al eliminar hoja: {e}")
         raise SheetError(f"Error al eliminar hoja: {str(e)}")
 
+def delete_sheets(filepath: str, sheet_names: List[str]) -> Dict[str, Any]:
+    """
+    Elimina varias hojas del libro con un único guardado.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        sheet_names: Nombres de las hojas a eliminar
+        
+    Returns:
+        Diccionario con el resultado de la operación y los mensajes de cada hoja
+        
+    Raises:
+        SheetError: Si alguna hoja no existe, se eliminarían todas las hojas
+            del libro u ocurre un error al eliminarlas
+    """
+    if not sheet_names:
+        raise SheetError("No se proporcionaron nombres de hoja")
+        
+    return _run_bulk_sheet_op(
+        filepath, "delete_sheet",
+        [{"sheet_name": name} for name in sheet_names],
+        f"{len(sheet_names)} hojas eliminadas"
+    )
+
+def _rename_sheet(wb: Workbook, old_name: str, new_name: str) -> Dict[str, Any]:
+    """Renombra la hoja en un libro ya abierto, sin guardarlo."""
+    # Verificar que la hoja actual existe
+    if old_name not in wb.sheetnames:
+        raise SheetError(f"La hoja '{old_name}' no existe")
+        
+    # Verificar que el nuevo nombre no existe
+    if new_name in wb.sheetnames:
+        raise SheetError(f"La hoja '{new_name}' ya existe")
+        
+    # Renombrar hoja
+    sheet = wb[old_name]
+    sheet.title = new_name
+    
+    return {"message": f"Hoja renombrada de '{old_name}' a '{new_name}'"}
+
 def rename_sheet(filepath: str, old_name: str, new_name: str) -> Dict[str, Any]:
     """
     Renombra una hoja.
@@ -193,32 +233,70 @@ def rename_sheet(filepath: str, old_name: str, new_name: str) -> Dict[str, Any]:
         SheetError: Si ocurre un error al renombrar la hoja
     """
     try:
-        # Abrir el libro
-        wb = open_workbook(filepath, read_only=False)
-        
-        # Verificar que la hoja actual existe
-        if old_name not in wb.sheetnames:
-            raise SheetError(f"La hoja '{old_name}' no existe")
-            
-        # Verificar que el nuevo nombre no existe
-        if new_name in wb.sheetnames:
-            raise SheetError(f"La hoja '{new_name}' ya existe")
-            
-        # Renombrar hoja
-        sheet = wb[old_name]
-        sheet.title = new_name
-        
-        # Guardar y cerrar
-        wb.save(filepath)
-        wb.close()
-        
-        return {"message": f"Hoja renombrada de '{old_name}' a '{new_name}'"}
+        return _run_sheet_op(filepath, _rename_sheet, old_name, new_name)
     except SheetError:
         raise
     except Exception as e:
         logger.error(f"Error al renombrar hoja: {e}")
         raise SheetError(f"Error al renombrar hoja: {str(e)}")
 
+def rename_sheets(filepath: str, renames: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Renombra varias hojas con un único guardado.
+    
+    Los renombrados se aplican en el orden del diccionario, por lo que un
+    nombre liberado por uno de ellos puede reutilizarse en los siguientes.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        renames: Diccionario de nombre actual a nuevo nombre
+        
+    Returns:
+        Diccionario con el resultado de la operación y los mensajes de cada hoja
+        
+    Raises:
+        SheetError: Si alguna hoja no existe, algún nombre nuevo ya está en uso
+            u ocurre un error al renombrarlas
+    """
+    if not renames:
+        raise SheetError("No se proporcionaron hojas a renombrar")
+        
+    return _run_bulk_sheet_op(
+        filepath, "rename_sheet",
+        [{"old_name": old, "new_name": new} for old, new in renames.items()],
+        f"{len(renames)} hojas renombradas"
+    )
+
+def _merge_range(wb: Workbook, sheet_name: str, start_cell: str, end_cell: str) -> Dict[str, Any]:
+    """Combina el rango en un libro ya abierto, sin guardarlo."""
+    # Verificar que la hoja existe
+    if sheet_name not in wb.sheetnames:
+        raise SheetError(f"La hoja '{sheet_name}' no existe")
+        
+    ws = wb[sheet_name]
+    
+    # Analizar rango
+    try:
+        start_row, start_col, end_row, end_col = parse_cell_range(start_cell, end_cell)
+    except ValueError as e:
+        raise SheetError(f"Formato de rango inválido: {str(e)}")
+        
+    # Verificar que ambas celdas están especificadas
+    if end_row is None or end_col is None:
+        raise SheetError("Es necesario especificar celda inicial y final para combinar")
+        
+    # Crear cadena de rango
+    range_str = f"{start_cell}:{end_cell}"
+    
+    # Si ya está combinado exactamente así, no hay nada que guardar
+    if _is_merged(ws, range_str):
+        return {"message": f"Las celdas {range_str} ya estaban combinadas", "changed": False}
+    
+    # Combinar celdas
+    ws.merge_cells(range_str)
+    
+    return {"message": f"Celdas combinadas: {range_str}"}
+
 def merge_range(filepath: str, sheet_name: str, start_cell: str, end_cell: str) -> Dict[str, Any]:
     """
     Combina un rango de celdas.
@@ -236,42 +314,33 @@ def merge_range(filepath: str, sheet_name: str, start_cell: str, end_cell: str)
         SheetError: Si ocurre un error al combinar las celdas
     """
     try:
-        # Abrir el libro
-        wb = open_workbook(filepath, read_only=False)
-        
-        # Verificar que la hoja existe
-        if sheet_name not in wb.sheetnames:
-            raise SheetError(f"La hoja '{sheet_name}' no existe")
-            
-        ws = wb[sheet_name]
-        
-        # Analizar rango
-        try:
-            start_row, start_col, end_row, end_col = parse_cell_range(start_cell, end_cell)
-        except ValueError as e:
-            raise SheetError(f"Formato de rango inválido: {str(e)}")
-            
-        # Verificar que ambas celdas están especificadas
-        if end_row is None or end_col is None:
-            raise SheetError("Es necesario especificar celda inicial y final para combinar")
-            
-        # Crear cadena de rango
-        range_str = f"{start_cell}:{end_cell}"
-        
-        # Combinar celdas
-        ws.merge_cells(range_str)
-        
-        # Guardar y cerrar
-        wb.save(filepath)
-        wb.close()
-        
-        return {"message": f"Celdas combinadas: {range_str}"}
+        return _run_sheet_op(filepath, _merge_range, sheet_name, start_cell, end_cell)
     except SheetError:
         raise
     except Exception as e:
         logger.error(f"Error al combinar celdas: {e}")
         raise SheetError(f"Error al combinar celdas: {str(e)}")
 
+def _unmerge_range(wb: Workbook, sheet_name: str, start_cell: str, end_cell: str) -> Dict[str, Any]:
+    """Descombina el rango en un libro ya abierto, sin guardarlo."""
+    # Verificar que la hoja existe
+    if sheet_name not in wb.sheetnames:
+        raise SheetError(f"La hoja '{sheet_name}' no existe")
+        
+    ws = wb[sheet_name]
+    
+    # Crear cadena de rango
+    range_str = f"{start_cell}:{end_cell}"
+    
+    # Si el rango no está combinado, no hay nada que guardar
+    if not _is_merged(ws, range_str):
+        return {"message": f"Las celdas {range_str} no estaban combinadas", "changed": False}
+    
+    # Descombinar celdas
+    ws.unmerge_cells(range_str)
+    
+    return {"message": f"Celdas descombinadas: {range_str}"}
+
 def unmerge_range(filepath: str, sheet_name: str, start_cell: str, end_cell: str) -> Dict[str, Any]:
     """
     Descombina un rango de celdas.
@@ -289,28 +358,87 @@ def unmerge_range(filepath: str, sheet_name: str, start_cell: str, end_cell: str
         SheetError: Si ocurre un error al descombinar las celdas
     """
     try:
-        # Abrir el libro
-        wb = open_workbook(filepath, read_only=False)
-        
-        # Verificar que la hoja existe
-        if sheet_name not in wb.sheetnames:
-            raise SheetError(f"La hoja '{sheet_name}' no existe")
-            
-        ws = wb[sheet_name]
-        
-        # Crear cadena de rango
-        range_str = f"{start_cell}:{end_cell}"
+        return _run_sheet_op(filepath, _unmerge_range, sheet_name, start_cell, end_cell)
+    except SheetError:
+        raise
+    except Exception as e:
+        logger.error(f"Error al descombinar celdas: {e}")
+        raise SheetError(f"Error al descombinar celdas: {str(e)}")
+
+# Operaciones admitidas por batch_sheet_ops
+_SHEET_OPERATIONS = {
+    "create_worksheet": _create_worksheet,
+    "copy_sheet": _copy_sheet,
+    "delete_sheet": _delete_sheet,
+    "rename_sheet": _rename_sheet,
+    "merge_range": _merge_range,
+    "unmerge_range": _unmerge_range,
+}
+
+def batch_sheet_ops(filepath: str, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aplica varias operaciones de hoja abriendo y guardando el libro una sola vez.
+    
+    Cada operación es un diccionario con la clave "op" (create_worksheet,
+    copy_sheet, delete_sheet, rename_sheet, merge_range o unmerge_range) y la
+    clave "args" con los argumentos de la función correspondiente, excluido
+    "filepath". Si una operación falla no se guarda ninguna, y si ninguna
+    modifica el libro (p. ej. combinar un rango ya combinado) tampoco se guarda.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        operations: Lista de operaciones a aplicar en orden
         
-        # Descombinar celdas
-        ws.unmerge_cells(range_str)
+    Returns:
+        Diccionario con el resultado de la operación y los mensajes de cada una
         
-        # Guardar y cerrar
-        wb.save(filepath)
-        wb.close()
+    Raises:
+        SheetError: Si alguna operación no es válida o falla
+        
+    Ejemplo:
+        ```python
+        batch_sheet_ops("informe.xlsm", [
+            {"op": "create_worksheet", "args": {"sheet_name": "Resumen"}},
+            {"op": "merge_range",
+             "args": {"sheet_name": "Resumen", "start_cell": "A1", "end_cell": "D1"}}
+        ])
+        ```
+    """
+    if not operations:
+        raise SheetError("No se proporcionaron operaciones de hoja")
         
-        return {"message": f"Celdas descombinadas: {range_str}"}
+    try:
+        messages = []
+        changed = False
+        with writable_workbook(filepath) as wb:
+            for index, operation in enumerate(operations, start=1):
+                op_name = operation.get("op")
+                handler = _SHEET_OPERATIONS.get(op_name)
+                if handler is None:
+                    raise SheetError(
+                        f"Operación {index}: tipo de operación inválido: {op_name}. "
+                        f"Valores válidos: {', '.join(_SHEET_OPERATIONS)}"
+                    )
+                    
+                try:
+                    result = handler(wb, **(operation.get("args") or {}))
+                except TypeError as e:
+                    raise SheetError(f"Operación {index}: argumentos inválidos para {op_name}: {str(e)}")
+                except SheetError as e:
+                    raise SheetError(f"Operación {index}: {str(e)}")
+                changed = result.get("changed", True) or changed
+                messages.append(result["message"])
+            
+            # Guardar una única vez al final
+            if changed:
+                commit_workbook(wb, filepath)
+        
+        return {
+            "message": f"{len(operations)} operaciones de hoja aplicadas correctamente",
+            "results": messages
+        }
     except SheetError:
         raise
     except Exception as e:
-        logger.error(f"Error al descombinar celdas: {e}")
-        raise SheetError(f"Error al descombinar celdas: {str(e)}")
\ No newline at end of file
+        logger.error(f"Error al aplicar operaciones de hoja: {e}")
+        raise SheetError(f"Error al aplicar operaciones de hoja: {str(e)}")
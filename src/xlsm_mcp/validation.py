@@ -7,15 +7,61 @@ utilizados en el servidor, como rutas de archivo, referencias de celdas, etc.
 
 import os
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Collection, Dict, FrozenSet, List, Optional, Tuple, Union
+from openpyxl.utils import column_index_from_string
 
 from xlsm_mcp.exceptions import ValidationError
 
+# Caracteres prohibidos en nombres de hojas de Excel, en el orden en que se informan
+_INVALID_SHEET_CHARS = ('\\', '/', '?', '*', '[', ']', ':', ' ')
+_INVALID_SHEET_CHARS_SET = frozenset(_INVALID_SHEET_CHARS)
+
+# Dígitos hexadecimales, para eliminarlos con bytes.translate al validar colores
+_HEX_DIGITS = b'0123456789abcdefABCDEF'
+
+# Formato de celda: una o más letras seguidas de uno o más números
+# (los grupos separan columna y fila para split_cell_reference)
+_CELL_REF_RE = re.compile(r'^([A-Za-z]+)([1-9]\d*)$')
+
+# Mensajes compartidos por validate_cell_reference y split_cell_reference
+_MSG_EMPTY_CELL = "La referencia de celda no puede estar vacía"
+_MSG_BAD_CELL = "Formato de referencia de celda inválido: "
+
+@lru_cache(maxsize=32)
+def _extension_set(file_extensions: Tuple[str, ...]) -> FrozenSet[str]:
+    """Extensiones en minúsculas y con punto inicial, comparables con Path.suffix."""
+    return frozenset(
+        ext.lower() if ext.startswith('.') else '.' + ext.lower()
+        for ext in file_extensions
+    )
+
+def stat_file(filepath: Union[str, Path]) -> os.stat_result:
+    """
+    Obtiene el stat de un archivo, que a la vez comprueba que existe.
+    
+    Quien necesite el tamaño o la fecha de modificación puede usar el
+    resultado en lugar de comprobar la existencia y consultar stat por separado.
+    
+    Args:
+        filepath: Ruta del archivo
+    
+    Returns:
+        Resultado de os.stat
+    
+    Raises:
+        ValidationError: Si el archivo no existe
+    """
+    try:
+        return os.stat(filepath)
+    except FileNotFoundError:
+        raise ValidationError(f"El archivo {filepath} no existe")
+
 def validate_file_path(
     filepath: Union[str, Path], 
     must_exist: bool = True,
-    file_extensions: Optional[List[str]] = None
+    file_extensions: Optional[Collection[str]] = None
 ) -> Path:
     """
     Valida que una ruta de archivo sea válida y cumpla con los requisitos.
@@ -23,7 +69,8 @@ def validate_file_path(
     Args:
         filepath: Ruta a validar
         must_exist: Si es True, verifica que el archivo exista
-        file_extensions: Lista de extensiones permitidas (ej. ['.xlsx', '.xlsm'])
+        file_extensions: Extensiones permitidas (ej. ['.xlsx', '.xlsm']); se
+                         compara solo la última extensión del archivo
     
     Returns:
         Objeto Path con la ruta validada
@@ -32,23 +79,24 @@ def validate_file_path(
         ValidationError: Si la validación falla
     """
     try:
-        # Convertir a objeto Path
-        path = Path(filepath)
+        # Las comprobaciones usan os.path sobre la cadena; el Path solo se
+        # construye al devolver la ruta ya validada
+        path_str = os.fspath(filepath)
         
-        # Verificar si debe existir
-        if must_exist and not path.exists():
-            raise ValidationError(f"El archivo {path} no existe")
+        # Verificar si debe existir, con una única llamada a stat
+        if must_exist:
+            stat_file(path_str)
         
         # Verificar extensión si es necesario
         if file_extensions:
-            if not any(path.name.lower().endswith(ext.lower()) for ext in file_extensions):
+            if os.path.splitext(path_str)[1].lower() not in _extension_set(tuple(file_extensions)):
                 valid_exts = ", ".join(file_extensions)
                 raise ValidationError(
-                    f"El archivo {path.name} no tiene una extensión válida. "
+                    f"El archivo {os.path.basename(path_str)} no tiene una extensión válida. "
                     f"Extensiones permitidas: {valid_exts}"
                 )
         
-        return path
+        return Path(path_str)
     except Exception as e:
         if isinstance(e, ValidationError):
             raise
@@ -74,14 +122,23 @@ def validate_sheet_name(sheet_name: str, max_length: int = 31) -> str:
     if len(sheet_name) > max_length:
         raise ValidationError(f"El nombre de la hoja no puede tener más de {max_length} caracteres")
     
-    # Caracteres prohibidos en nombres de hojas de Excel
-    invalid_chars = ['\\', '/', '?', '*', '[', ']', ':', ' ']
-    for char in invalid_chars:
-        if char in sheet_name:
-            raise ValidationError(f"El nombre de la hoja contiene caracteres inválidos: '{char}'")
+    # Una sola pasada sobre el nombre; el carácter concreto solo se busca al fallar
+    if not _INVALID_SHEET_CHARS_SET.isdisjoint(sheet_name):
+        char = next(c for c in _INVALID_SHEET_CHARS if c in sheet_name)
+        raise ValidationError(f"El nombre de la hoja contiene caracteres inválidos: '{char}'")
     
     return sheet_name
 
+def _match_cell_reference(cell_ref: str) -> "re.Match[str]":
+    """Valida una referencia de celda y devuelve la coincidencia con columna y fila."""
+    if not cell_ref:
+        raise ValidationError(_MSG_EMPTY_CELL)
+    
+    match = _CELL_REF_RE.match(cell_ref)
+    if not match:
+        raise ValidationError(_MSG_BAD_CELL + cell_ref)
+    return match
+
 def validate_cell_reference(cell_ref: str) -> str:
     """
     Valida que una referencia de celda tenga un formato válido (ej. A1, B2, etc.).
@@ -95,14 +152,7 @@ def validate_cell_reference(cell_ref: str) -> str:
     Raises:
         ValidationError: Si la referencia no es válida
     """
-    if not cell_ref:
-        raise ValidationError("La referencia de celda no puede estar vacía")
-    
-    # Formato de celda: una o más letras seguidas de uno o más números
-    pattern = re.compile(r'^[A-Za-z]+[1-9]\d*$')
-    if not pattern.match(cell_ref):
-        raise ValidationError(f"Formato de referencia de celda inválido: {cell_ref}")
-    
+    _match_cell_reference(cell_ref)
     return cell_ref.upper()
 
 def validate_cell_range(start_cell: str, end_cell: Optional[str] = None) -> Tuple[str, Optional[str]]:
@@ -119,16 +169,23 @@ def validate_cell_range(start_cell: str, end_cell: Optional[str] = None) -> Tupl
     Raises:
         ValidationError: Si el rango no es válido
     """
-    # Validar celda inicial
-    start = validate_cell_reference(start_cell)
+    # Validar celda inicial; la coincidencia ya trae columna y fila
+    start_match = _match_cell_reference(start_cell)
+    start = start_cell.upper()
     
     # Si hay celda final, validarla
     if end_cell:
-        end = validate_cell_reference(end_cell)
+        end_match = _match_cell_reference(end_cell)
+        end = end_cell.upper()
         
-        # Extraer componentes para comprobar orden
-        start_col, start_row = split_cell_reference(start)
-        end_col, end_row = split_cell_reference(end)
+        # Extraer componentes para comprobar orden; las columnas se comparan
+        # como índices ("Z" va antes que "AA")
+        try:
+            start_col = column_index_from_string(start_match.group(1))
+            end_col = column_index_from_string(end_match.group(1))
+        except ValueError as e:
+            raise ValidationError(f"Rango inválido: {str(e)}")
+        start_row, end_row = int(start_match.group(2)), int(end_match.group(2))
         
         # Verificar que la celda final está a la derecha y abajo de la inicial
         if end_col < start_col or end_row < start_row:
@@ -150,20 +207,13 @@ def split_cell_reference(cell_ref: str) -> Tuple[str, int]:
     
     Returns:
         Tupla (columna, fila)
-    """
-    # Asegurar que la celda es válida
-    cell_ref = validate_cell_reference(cell_ref)
-    
-    # Encontrar el índice donde terminan las letras
-    idx = 0
-    while idx < len(cell_ref) and cell_ref[idx].isalpha():
-        idx += 1
     
-    # Dividir en componentes
-    col = cell_ref[:idx]
-    row = int(cell_ref[idx:])
-    
-    return col, row
+    Raises:
+        ValidationError: Si la referencia no es válida
+    """
+    # La misma coincidencia valida la referencia y separa sus componentes
+    match = _match_cell_reference(cell_ref)
+    return match.group(1).upper(), int(match.group(2))
 
 def validate_excel_data(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
@@ -219,10 +269,10 @@ def validate_color(color: str) -> str:
     if len(hex_color) not in [6, 8]:
         raise ValidationError(f"Formato de color inválido: {color}")
     
-    # Verificar que sean caracteres hexadecimales
-    try:
-        int(hex_color, 16)
-    except ValueError:
+    # Verificar que sean caracteres hexadecimales: al quitar todos los dígitos
+    # hexadecimales no debe quedar nada. A diferencia de int(..., 16), no se
+    # aceptan prefijos "0x", guiones bajos ni espacios
+    if hex_color.encode().translate(None, _HEX_DIGITS):
         raise ValidationError(f"Formato de color inválido: {color}")
     
     # Normalizar a formato con #
@@ -3,16 +3,132 @@ Módulo para gestionar libros de Excel con macros (.xlsm).
 """
 
 import os
+import sys
+import atexit
 import logging
-from typing import Dict, List, Any, Optional, Union
+import datetime
+import threading
+import shutil
+import zipfile
+import copy
+import xml.etree.ElementTree as ET
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from io import BytesIO
+from typing import Dict, Iterator, List, Any, Optional, Tuple, Union
 from pathlib import Path
 import openpyxl
 from openpyxl.workbook import Workbook
+from openpyxl.writer.excel import ExcelWriter
 
 from xlsm_mcp.exceptions import WorkbookError
 
 logger = logging.getLogger("xlsm-mcp")
 
+# Nivel de compresión de fast_save: mucho menos CPU que el nivel por defecto (6)
+# a cambio de archivos algo más grandes
+FAST_SAVE_COMPRESSLEVEL = 1
+
+# Tamaño del buffer de escritura de los archivos temporales de guardado
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Buffers en memoria reutilizados entre guardados. Solo vuelven al pool los de
+# libros pequeños, para no retener la memoria de un libro grande
+_BUFFER_POOL: "deque[BytesIO]" = deque(maxlen=8)
+_POOLED_BUFFER_MAX = 8 * 1024 * 1024
+
+# Libros modificados cuyo guardado se ha diferido, indexados por ruta absoluta
+_PENDING_WORKBOOKS: Dict[str, Workbook] = {}
+_PENDING_LOCK = threading.Lock()
+# El guardado de salida se registra con el primer cambio diferido: atexit ejecuta
+# los manejadores en orden inverso, así que corre antes de que se detenga el
+# hilo de logging (registrado al importar logger) y sus errores llegan al log
+_exit_flush_registered = False
+
+def _pending_key(filepath: Union[str, Path]) -> str:
+    # La misma ruta que reemplaza save_workbook: un enlace simbólico y su
+    # destino comparten los cambios pendientes
+    return os.path.realpath(filepath)
+
+def replace_target(filepath: Union[str, Path]) -> Tuple[str, str]:
+    """
+    Devuelve el destino real de un guardado atómico y su archivo temporal.
+    
+    Si la ruta es un enlace simbólico se reemplaza el archivo al que apunta y
+    no el enlace. El temporal va junto al destino; el PID y el identificador
+    del hilo evitan choques entre procesos o hilos que guardan a la vez.
+    """
+    target = os.path.realpath(filepath)
+    return target, f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def finish_replace(tmp_path: str, target: str) -> None:
+    """Sustituye el destino por el temporal conservando los permisos del original."""
+    try:
+        shutil.copymode(target, tmp_path)
+    except FileNotFoundError:
+        # Destino nuevo: se queda con los permisos por defecto
+        pass
+    os.replace(tmp_path, target)
+
+# Resultados de get_workbook_info indexados por (ruta absoluta, mtime en ns,
+# tamaño, include_macros): si el archivo cambia, cambia la clave. Solo se
+# memoriza el diccionario de información, nunca el Workbook: quien lo recibe
+# puede modificarlo o cerrarlo
+_INFO_CACHE: "OrderedDict[Tuple[str, int, int, bool], Dict[str, Any]]" = OrderedDict()
+_INFO_CACHE_MAXSIZE = 32
+_INFO_CACHE_LOCK = threading.Lock()
+
+# Partes y espacios de nombres que lee get_workbook_info directamente del ZIP
+_WORKBOOK_PART = "xl/workbook.xml"
+_CORE_PROPS_PART = "docProps/core.xml"
+_VBA_PROJECT_PART = "xl/vbaProject.bin"
+_SHEET_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+# Propiedades del documento que devuelve get_workbook_info, por etiqueta de core.xml
+_CORE_PROPERTY_TAGS = {
+    "{http://purl.org/dc/elements/1.1/}title": "title",
+    "{http://purl.org/dc/elements/1.1/}subject": "subject",
+    "{http://purl.org/dc/elements/1.1/}creator": "creator",
+    "{http://purl.org/dc/elements/1.1/}description": "description",
+    "{http://schemas.openxmlformats.org/package/2006/metadata/core-properties}keywords": "keywords",
+    "{http://schemas.openxmlformats.org/package/2006/metadata/core-properties}category": "category",
+}
+
+def _read_sheet_list(archive: zipfile.ZipFile) -> Tuple[List[str], int]:
+    """
+    Lee de workbook.xml los nombres de las hojas y el índice de la hoja activa.
+    
+    Se analiza en streaming y se para al cerrar <sheets>, que va después de
+    <bookViews>; el resto del archivo (nombres definidos, cálculo...) no se lee.
+    """
+    sheet_names: List[str] = []
+    active_index = 0
+    with archive.open(_WORKBOOK_PART) as source:
+        for _, elem in ET.iterparse(source):
+            tag = elem.tag
+            if tag == f"{_SHEET_MAIN_NS}sheet":
+                sheet_names.append(elem.get("name"))
+            elif tag == f"{_SHEET_MAIN_NS}workbookView" and not active_index:
+                active_index = int(elem.get("activeTab", 0))
+            elif tag == f"{_SHEET_MAIN_NS}sheets":
+                break
+    return sheet_names, active_index
+
+def _read_core_properties(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """Lee de docProps/core.xml las propiedades que devuelve get_workbook_info."""
+    properties = dict.fromkeys(_CORE_PROPERTY_TAGS.values(), "")
+    try:
+        source = archive.open(_CORE_PROPS_PART)
+    except KeyError:
+        # Las propiedades del documento son opcionales en el paquete
+        return properties
+    with source:
+        for _, elem in ET.iterparse(source):
+            key = _CORE_PROPERTY_TAGS.get(elem.tag)
+            if key is not None:
+                properties[key] = elem.text or ""
+    return properties
+
 def create_workbook(filepath: Union[str, Path], with_macros: bool = True) -> None:
     """
     Crea un nuevo libro de Excel, opcionalmente con macros habilitadas.
@@ -42,7 +158,7 @@ def create_workbook(filepath: Union[str, Path], with_macros: bool = True) -> Non
         
         # Guardar el libro
         wb.save(str(file_path))
-        logger.info(f"Libro creado correctamente en {file_path}")
+        logger.info("Libro creado correctamente en %s", file_path)
     except Exception as e:
         logger.error(f"Error al crear libro: {e}")
         raise WorkbookError(f"No se pudo crear el libro: {str(e)}")
@@ -51,6 +167,11 @@ def get_workbook_info(filepath: Union[str, Path], include_macros: bool = False)
     """
     Obtiene información general sobre un libro de Excel.
     
+    La información se lee directamente del ZIP (workbook.xml, core.xml y la
+    lista de partes), sin cargar el libro con openpyxl. El resultado se
+    memoriza mientras el archivo no cambie de fecha de modificación ni de
+    tamaño.
+    
     Args:
         filepath: Ruta al archivo Excel
         include_macros: Si es True, incluye información sobre macros
@@ -66,33 +187,46 @@ def get_workbook_info(filepath: Union[str, Path], include_macros: bool = False)
         file_path = Path(filepath)
         
         # Verificar que el archivo existe
-        if not file_path.exists():
+        try:
+            st = file_path.stat()
+        except FileNotFoundError:
             raise WorkbookError(f"El archivo {file_path} no existe")
         
-        # Abrir el libro
-        wb = openpyxl.load_workbook(str(file_path), read_only=True, keep_vba=True)
+        # Reutilizar la información si el archivo no ha cambiado
+        path = str(file_path.absolute())
+        key = (path, st.st_mtime_ns, st.st_size, include_macros)
+        with _INFO_CACHE_LOCK:
+            cached = _INFO_CACHE.get(key)
+            if cached is not None:
+                _INFO_CACHE.move_to_end(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
+        # Leer solo los metadatos; ninguna hoja se carga
+        with zipfile.ZipFile(file_path) as archive:
+            has_vba = _VBA_PROJECT_PART in archive.NameToInfo
+            sheet_names, active_index = _read_sheet_list(archive)
+            properties = _read_core_properties(archive)
+        
+        if not sheet_names:
+            raise WorkbookError(f"El archivo {file_path} no contiene hojas")
+        if not 0 <= active_index < len(sheet_names):
+            active_index = 0
         
         # Recopilar información
         info = {
-            "filepath": str(file_path.absolute()),
+            "filepath": path,
             "filename": file_path.name,
-            "file_size": file_path.stat().st_size,
-            "last_modified": file_path.stat().st_mtime,
-            "has_macros": wb.vba_archive is not None,
-            "sheet_names": wb.sheetnames,
-            "active_sheet": wb.active.title,
-            "properties": {
-                "title": wb.properties.title or "",
-                "subject": wb.properties.subject or "",
-                "creator": wb.properties.creator or "",
-                "description": wb.properties.description or "",
-                "keywords": wb.properties.keywords or "",
-                "category": wb.properties.category or ""
-            }
+            "file_size": st.st_size,
+            "last_modified": st.st_mtime,
+            "has_macros": has_vba,
+            "sheet_names": sheet_names,
+            "active_sheet": sheet_names[active_index],
+            "properties": properties
         }
         
         # Si se solicita, agrega información de macros
-        if include_macros and wb.vba_archive is not None:
+        if include_macros and has_vba:
             info["macros"] = {
                 "vba_project": True,
                 # Aquí puedes agregar más detalles si los necesitas
@@ -100,47 +234,403 @@ def get_workbook_info(filepath: Union[str, Path], include_macros: bool = False)
         else:
             info["macros"] = None
         
-        # Cerrar el libro
-        wb.close()
+        with _INFO_CACHE_LOCK:
+            # Descartar las entradas de versiones anteriores del archivo
+            for stale in [k for k in _INFO_CACHE if k[0] == path and k[1:3] != key[1:3]]:
+                del _INFO_CACHE[stale]
+            _INFO_CACHE[key] = info
+            if len(_INFO_CACHE) > _INFO_CACHE_MAXSIZE:
+                _INFO_CACHE.popitem(last=False)
         
-        return info
+        # Copia: quien llama puede modificar el diccionario
+        return copy.deepcopy(info)
     except Exception as e:
         logger.error(f"Error al obtener información del libro: {e}")
         raise WorkbookError(f"No se pudo obtener información del libro: {str(e)}")
 
-def open_workbook(filepath: Union[str, Path], read_only: bool = False) -> Workbook:
+def open_workbook(
+    filepath: Union[str, Path],
+    read_only: bool = False,
+    data_only: bool = False,
+    keep_links: bool = True,
+    keep_vba: Optional[bool] = None
+) -> Workbook:
     """
     Abre un libro de Excel existente.
     
     Args:
         filepath: Ruta al archivo Excel
         read_only: Si es True, abre el libro en modo solo lectura
+        data_only: Si es True, devuelve los valores calculados en lugar de las fórmulas
+        keep_links: Si es False, no carga los vínculos a libros externos
+        keep_vba: Si se conserva el proyecto VBA. Por defecto (None) se conserva
+                  solo en archivos .xlsm abiertos para escritura: un libro de
+                  solo lectura nunca se guarda, así que copiar el proyecto VBA
+                  solo gastaría memoria
         
     Returns:
-        Objeto Workbook de openpyxl
+        Objeto Workbook de openpyxl. Si el archivo tiene cambios diferidos
+        pendientes de guardar y se abre para escritura (ni read_only ni
+        data_only), se devuelve el libro que ya está en memoria, sin tener en
+        cuenta keep_links ni keep_vba; quien lo modifique debe tener el acceso
+        exclusivo a la ruta. Las lecturas cargan siempre el archivo de disco,
+        es decir, el último estado guardado.
         
     Raises:
         WorkbookError: Si ocurre un error al abrir el libro
     """
     try:
+        # Si hay cambios pendientes de guardar, las escrituras continúan sobre el
+        # libro en memoria. Las lecturas no lo comparten: necesitan otro modo de
+        # carga y podrían coincidir con una escritura en curso
+        if not read_only and not data_only:
+            with _PENDING_LOCK:
+                pending = _PENDING_WORKBOOKS.get(_pending_key(filepath))
+            if pending is not None:
+                return pending
+        
         # Convertir a objeto Path
         file_path = Path(filepath)
         
-        # Verificar que el archivo existe
-        if not file_path.exists():
-            raise WorkbookError(f"El archivo {file_path} no existe")
-        
         # Determinar si el archivo tiene macros
-        has_macros = file_path.suffix.lower() == '.xlsm'
+        if keep_vba is None:
+            keep_vba = not read_only and file_path.suffix.lower() == '.xlsm'
         
-        # Abrir el libro
-        wb = openpyxl.load_workbook(
-            str(file_path), 
-            read_only=read_only, 
-            keep_vba=has_macros
-        )
+        # Abrir el libro; si no existe, falla la propia apertura
+        try:
+            wb = openpyxl.load_workbook(
+                str(file_path), 
+                read_only=read_only, 
+                keep_vba=keep_vba,
+                data_only=data_only,
+                keep_links=keep_links
+            )
+        except FileNotFoundError:
+            raise WorkbookError(f"El archivo {file_path} no existe")
         
         return wb
     except Exception as e:
         logger.error(f"Error al abrir libro: {e}")
-        raise WorkbookError(f"No se pudo abrir el libro: {str(e)}")
\ No newline at end of file
+        raise WorkbookError(f"No se pudo abrir el libro: {str(e)}")
+
+def _write_archive(wb: Workbook, target: Any, compresslevel: int) -> None:
+    """
+    Serializa el libro como wb.save, pero con el nivel de compresión indicado.
+    
+    Workbook.save no permite elegir el nivel de compresión del ZIP, así que se
+    reproduce aquí openpyxl.writer.excel.save_workbook con un ZipFile propio.
+    """
+    if wb.read_only:
+        raise TypeError("Workbook is read-only")
+    if wb.write_only and not wb.worksheets:
+        wb.create_sheet()
+    
+    archive = zipfile.ZipFile(
+        target, 'w', zipfile.ZIP_DEFLATED,
+        allowZip64=True, compresslevel=compresslevel
+    )
+    wb.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+    ExcelWriter(wb, archive).save()
+
+def save_workbook(wb: Workbook, filepath: Union[str, Path], fast_save: bool = False) -> None:
+    """
+    Guarda un libro serializándolo primero en memoria.
+    
+    openpyxl escribe cada parte del ZIP con muchas escrituras pequeñas; generando
+    el archivo completo en un BytesIO se vuelca a disco con una única escritura.
+    Los BytesIO de libros pequeños se reutilizan entre guardados.
+    El contenido se escribe en un archivo temporal junto al destino, se fuerza
+    a disco con fsync y después lo reemplaza con os.replace, de modo que ni un
+    fallo a mitad de escritura ni un corte de corriente dejan el libro truncado.
+    El libro conserva sus permisos y, si la ruta es un enlace simbólico, se
+    reemplaza el archivo enlazado.
+    
+    Args:
+        wb: Libro a guardar
+        filepath: Ruta del archivo de destino
+        fast_save: Si es True, comprime con nivel FAST_SAVE_COMPRESSLEVEL. En
+                   libros .xlsm con un proyecto VBA grande, recomprimirlo domina
+                   el tiempo de guardado; el nivel 1 ahorra buena parte de esa
+                   CPU a cambio de un archivo algo mayor
+    """
+    # deque.pop es atómica: cada hilo obtiene un buffer distinto
+    try:
+        buffer = _BUFFER_POOL.pop()
+    except IndexError:
+        buffer = BytesIO()
+    
+    dest_path, tmp_path = replace_target(filepath)
+    try:
+        if fast_save:
+            _write_archive(wb, buffer, FAST_SAVE_COMPRESSLEVEL)
+        else:
+            wb.save(buffer)
+        
+        with open(tmp_path, 'wb') as f, buffer.getbuffer() as view:
+            f.write(view)
+            f.flush()
+            os.fsync(f.fileno())
+        finish_replace(tmp_path, dest_path)
+    except BaseException:
+        # No dejar el temporal a medias junto al libro
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        if buffer.tell() <= _POOLED_BUFFER_MAX:
+            buffer.seek(0)
+            buffer.truncate()
+            _BUFFER_POOL.append(buffer)
+
+def copy_zip_info(info: zipfile.ZipInfo, compresslevel: Optional[int] = None) -> zipfile.ZipInfo:
+    """
+    Crea la ZipInfo con la que escribir en otro ZIP una parte copiada.
+    
+    La ZipInfo de origen no sirve para escribir: su nivel de compresión es None,
+    así que se ignoraría el compresslevel del ZipFile de destino, y escribir con
+    ella reinicia sus tamaños. Se conservan el nombre, la fecha, el método de
+    compresión y los atributos; el tamaño original solo orienta la decisión de
+    usar ZIP64.
+    """
+    entry = zipfile.ZipInfo(info.filename, info.date_time)
+    entry.compress_type = info.compress_type
+    entry.external_attr = info.external_attr
+    entry.file_size = info.file_size
+    # compress_level desde Python 3.13; _compresslevel sigue siendo válido
+    entry._compresslevel = compresslevel
+    return entry
+
+def replace_archive_member(
+    filepath: Union[str, Path],
+    member: str,
+    data: bytes,
+    fast_save: bool = False
+) -> None:
+    """
+    Sustituye una parte del ZIP de un libro sin cargarlo con openpyxl.
+    
+    El resto de partes se copian tal cual, descomprimiéndolas y volviéndolas a
+    comprimir en bloques, de modo que la memoria usada no depende del tamaño
+    del libro. Como en save_workbook, se escribe a través de un buffer de 1 MB
+    en un archivo temporal que, tras fsync, reemplaza al original.
+    
+    Args:
+        filepath: Ruta del libro
+        member: Nombre de la parte a sustituir (ej. "xl/worksheets/sheet1.xml")
+        data: Nuevo contenido de la parte
+        fast_save: Si es True, comprime con nivel FAST_SAVE_COMPRESSLEVEL
+    """
+    compresslevel = FAST_SAVE_COMPRESSLEVEL if fast_save else None
+    dest_path, tmp_path = replace_target(filepath)
+    try:
+        with open(tmp_path, 'wb', buffering=_WRITE_BUFFER_SIZE) as raw:
+            with zipfile.ZipFile(filepath) as source, zipfile.ZipFile(
+                raw, 'w', zipfile.ZIP_DEFLATED, allowZip64=True, compresslevel=compresslevel
+            ) as target:
+                for info in source.infolist():
+                    entry = copy_zip_info(info, compresslevel)
+                    if info.filename == member:
+                        target.writestr(entry, data)
+                        continue
+                    with source.open(info) as src, target.open(entry, 'w') as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+            raw.flush()
+            os.fsync(raw.fileno())
+        finish_replace(tmp_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def has_pending_changes(filepath: Union[str, Path]) -> bool:
+    """Indica si el libro tiene cambios diferidos pendientes de flush_workbook."""
+    with _PENDING_LOCK:
+        return _pending_key(filepath) in _PENDING_WORKBOOKS
+
+def commit_workbook(
+    wb: Workbook,
+    filepath: Union[str, Path],
+    defer: bool = False,
+    fast_save: bool = False
+) -> None:
+    """
+    Guarda un libro modificado o difiere el guardado hasta flush_workbook.
+    
+    Al diferir, el libro queda en memoria y las siguientes aperturas para
+    escritura de la misma ruta lo reutilizan, de modo que varias operaciones
+    consecutivas se serializan en un único guardado.
+    
+    Args:
+        wb: Libro a guardar
+        filepath: Ruta del archivo
+        defer: Si es True, no guarda todavía y deja el libro pendiente
+        fast_save: Si es True, comprime con nivel FAST_SAVE_COMPRESSLEVEL (ver
+                   save_workbook). No se aplica al guardar más tarde un libro
+                   diferido
+    """
+    global _exit_flush_registered
+    key = _pending_key(filepath)
+    with _PENDING_LOCK:
+        if defer:
+            _PENDING_WORKBOOKS[key] = wb
+            if not _exit_flush_registered:
+                atexit.register(_flush_at_exit)
+                _exit_flush_registered = True
+            return
+        _PENDING_WORKBOOKS.pop(key, None)
+    
+    save_workbook(wb, filepath, fast_save=fast_save)
+
+def discard_pending_changes(filepath: Union[str, Path], wb: Optional[Workbook] = None) -> bool:
+    """
+    Descarta sin guardarlos los cambios diferidos de un libro.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        wb: Si se indica, solo se descartan si el libro pendiente es este
+        
+    Returns:
+        True si había cambios pendientes y se descartaron
+    """
+    key = _pending_key(filepath)
+    with _PENDING_LOCK:
+        pending = _PENDING_WORKBOOKS.get(key)
+        if pending is None or (wb is not None and pending is not wb):
+            return False
+        del _PENDING_WORKBOOKS[key]
+    logger.warning("Cambios pendientes de %s descartados sin guardar", key)
+    return True
+
+@contextmanager
+def writable_workbook(filepath: Union[str, Path]) -> Iterator[Workbook]:
+    """
+    Abre un libro para modificarlo y lo cierra al salir del bloque.
+    
+    Guardar es responsabilidad del bloque (commit_workbook). Si el bloque lanza
+    una excepción y el libro era el de unos cambios diferidos, esos cambios se
+    descartan: el libro en memoria puede haber quedado a medias y el siguiente
+    flush_workbook no debe guardarlo.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        
+    Raises:
+        WorkbookError: Si ocurre un error al abrir el libro
+    """
+    wb = open_workbook(filepath, read_only=False)
+    try:
+        yield wb
+    except BaseException:
+        discard_pending_changes(filepath, wb)
+        raise
+    finally:
+        wb.close()
+
+@contextmanager
+def workbook_session(
+    filepath: Union[str, Path],
+    read_only: bool = False,
+    defer: bool = False
+) -> Iterator[Workbook]:
+    """
+    Abre un libro una sola vez para aplicarle varias operaciones.
+    
+    Al salir del bloque sin errores el libro se guarda una única vez con
+    commit_workbook; si el bloque lanza una excepción no se guarda nada y se
+    descartan los cambios diferidos que el libro tuviera pendientes.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        read_only: Si es True, abre el libro en modo solo lectura y no lo guarda;
+                   como nunca se guarda, no se cargan los vínculos externos ni
+                   el proyecto VBA
+        defer: Si es True, deja los cambios pendientes hasta flush_workbook
+        
+    Raises:
+        WorkbookError: Si ocurre un error al abrir el libro
+        
+    Ejemplo:
+        ```python
+        with workbook_session("informe.xlsm") as wb:
+            wb.create_sheet("Resumen")
+            wb["Datos"].title = "Datos 2024"
+        ```
+    """
+    if not read_only:
+        with writable_workbook(filepath) as wb:
+            yield wb
+            commit_workbook(wb, filepath, defer=defer)
+        return
+        
+    wb = open_workbook(filepath, read_only=True, keep_links=False, keep_vba=False)
+    try:
+        yield wb
+    finally:
+        wb.close()
+
+def flush_workbook(filepath: Union[str, Path]) -> bool:
+    """
+    Guarda en disco los cambios diferidos de un libro.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        
+    Returns:
+        True si había cambios pendientes y se guardaron, False en caso contrario
+        
+    Raises:
+        WorkbookError: Si ocurre un error al guardar el libro
+    """
+    key = _pending_key(filepath)
+    with _PENDING_LOCK:
+        wb = _PENDING_WORKBOOKS.pop(key, None)
+    if wb is None:
+        return False
+    
+    try:
+        save_workbook(wb, key)
+        return True
+    except Exception as e:
+        logger.error(f"Error al guardar cambios pendientes: {e}")
+        raise WorkbookError(f"No se pudieron guardar los cambios pendientes: {str(e)}")
+
+def flush_all_workbooks() -> int:
+    """
+    Guarda todos los libros con cambios diferidos.
+    
+    Un libro que no se puede guardar no impide guardar los demás; los errores
+    se reúnen y se lanzan al final.
+    
+    Returns:
+        Número de libros guardados
+        
+    Raises:
+        WorkbookError: Si alguno de los libros no se pudo guardar
+    """
+    with _PENDING_LOCK:
+        paths = list(_PENDING_WORKBOOKS)
+    
+    saved = 0
+    errors = []
+    for path in paths:
+        try:
+            if flush_workbook(path):
+                saved += 1
+        except WorkbookError as e:
+            errors.append(f"{path}: {str(e)}")
+    if errors:
+        raise WorkbookError(
+            "Libros con cambios pendientes que no se pudieron guardar: " + "; ".join(errors)
+        )
+    return saved
+
+def _flush_at_exit() -> None:
+    """Guarda los cambios diferidos al cerrar el proceso e informa por stderr de los que se pierden."""
+    try:
+        flush_all_workbooks()
+    except WorkbookError as e:
+        print(f"xlsm-mcp: {str(e)}", file=sys.stderr)
@@ -0,0 +1,29 @@
+"""
+Fixtures comunes de las pruebas: libros pequeños creados con openpyxl.
+"""
+
+import openpyxl
+import pytest
+
+from xlsm_mcp.workbook import flush_all_workbooks
+
+
+@pytest.fixture(autouse=True)
+def _no_pending_workbooks():
+    """Evita que los cambios diferidos de una prueba lleguen a la siguiente."""
+    yield
+    flush_all_workbooks()
+
+
+@pytest.fixture
+def xlsx_file(tmp_path):
+    """Libro .xlsx con una hoja "Datos" de cabecera y dos filas."""
+    path = tmp_path / "libro.xlsx"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Datos"
+    ws.append(["nombre", "valor"])
+    ws.append(["a", 1])
+    ws.append(["b", 2])
+    wb.save(path)
+    return path
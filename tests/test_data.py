@@ -0,0 +1,48 @@
+"""
+Pruebas de escritura en modo streaming y de lectura de rangos.
+"""
+
+import openpyxl
+import pytest
+
+from xlsm_mcp.data import read_excel_range, write_data
+from xlsm_mcp.exceptions import DataError
+
+ROWS = [{"id": i, "nombre": f"fila {i}"} for i in range(1, 201)]
+
+
+def test_streaming_write_creates_new_xlsx(tmp_path):
+    path = tmp_path / "volcado.xlsx"
+    
+    write_data(str(path), "Datos", ROWS, "B3", streaming=True)
+    
+    ws = openpyxl.load_workbook(path)["Datos"]
+    assert (ws["B3"].value, ws["C3"].value) == ("id", "nombre")
+    assert (ws["B4"].value, ws["C203"].value) == (1, "fila 200")
+    assert ws["A3"].value is None
+    assert read_excel_range(path, "Datos", "B3", "C5") == [
+        {"id": 1, "nombre": "fila 1"},
+        {"id": 2, "nombre": "fila 2"},
+    ]
+
+
+def test_streaming_write_rejects_xlsm(tmp_path):
+    path = tmp_path / "volcado.xlsm"
+    
+    with pytest.raises(DataError):
+        write_data(str(path), "Datos", ROWS, streaming=True)
+    assert not path.exists()
+
+
+def test_streaming_is_ignored_for_existing_file(xlsx_file):
+    write_data(str(xlsx_file), "Datos", [{"extra": 9}], "D1", streaming=True)
+    
+    ws = openpyxl.load_workbook(xlsx_file)["Datos"]
+    assert (ws["A2"].value, ws["D2"].value) == ("a", 9)
+
+
+def test_read_rejects_columns_past_letter_table(xlsx_file):
+    with pytest.raises(DataError):
+        read_excel_range(xlsx_file, "Datos", "A1", "AAAA2")
+    with pytest.raises(DataError):
+        read_excel_range(xlsx_file, "Datos", "AAAA1")
@@ -0,0 +1,81 @@
+"""
+Pruebas de la fusión de formato condicional y del parcheo directo de alturas de fila.
+"""
+
+import zipfile
+
+import openpyxl
+
+from xlsm_mcp.formatting import format_ranges, remove_conditional_formatting, set_row_height
+from xlsm_mcp.workbook import has_pending_changes
+from xlsm_mcp.data import write_data
+
+
+def _data_bar(cell_range):
+    return {
+        "op": "add_conditional_formatting",
+        "args": {
+            "sheet_name": "Datos",
+            "cell_range": cell_range,
+            "rule_type": "data_bar",
+            "colors": ["FF638EC6"],
+        },
+    }
+
+
+def _cf_ranges(path):
+    ws = openpyxl.load_workbook(path)["Datos"]
+    return sorted(str(cf.sqref) for cf in ws.conditional_formatting)
+
+
+def _cf_cells(path):
+    """Rangos con formato condicional, separando los de un mismo bloque."""
+    return sorted(r for block in _cf_ranges(path) for r in block.split())
+
+
+def test_batch_merges_adjacent_identical_rules(xlsx_file):
+    result = format_ranges(str(xlsx_file), [_data_bar("B1:B2"), _data_bar("B3:B4")])
+    
+    assert result["success"], result
+    assert _cf_ranges(xlsx_file) == ["B1:B4"]
+
+
+def test_batch_keeps_existing_conditional_formatting(xlsx_file):
+    format_ranges(str(xlsx_file), [_data_bar("A1:A2")])
+    format_ranges(str(xlsx_file), [_data_bar("A3:A4"), _data_bar("C1:C3")])
+    
+    # El bloque que ya existía no se funde con los nuevos y se puede quitar solo
+    assert "A1:A2" in _cf_ranges(xlsx_file)
+    assert _cf_cells(xlsx_file) == ["A1:A2", "A3:A4", "C1:C3"]
+    assert remove_conditional_formatting(str(xlsx_file), "Datos", "A1:A2")["success"]
+    assert _cf_cells(xlsx_file) == ["A3:A4", "C1:C3"]
+
+
+def test_row_height_patches_existing_row(xlsx_file):
+    with zipfile.ZipFile(xlsx_file) as archive:
+        before = {info.filename: archive.read(info) for info in archive.infolist()}
+    
+    assert set_row_height(str(xlsx_file), "Datos", 2, 30)["success"]
+    
+    with zipfile.ZipFile(xlsx_file) as archive:
+        after = {info.filename: archive.read(info) for info in archive.infolist()}
+    # Solo cambia la parte de la hoja; el resto del paquete se copia tal cual
+    changed = [name for name in before if before[name] != after[name]]
+    assert changed == ["xl/worksheets/sheet1.xml"]
+    
+    ws = openpyxl.load_workbook(xlsx_file)["Datos"]
+    assert ws.row_dimensions[2].height == 30
+    assert ws["A2"].value == "a"
+
+
+def test_row_height_falls_back_to_openpyxl(xlsx_file):
+    # Fila sin etiqueta <row> en el XML
+    assert set_row_height(str(xlsx_file), "Datos", 50, 12.5)["success"]
+    assert openpyxl.load_workbook(xlsx_file)["Datos"].row_dimensions[50].height == 12.5
+    
+    # Con cambios diferidos pendientes no se parchea el archivo en disco
+    write_data(str(xlsx_file), "Datos", [{"x": 1}], "D1", defer_save=True)
+    assert set_row_height(str(xlsx_file), "Datos", 2, 40)["success"]
+    assert not has_pending_changes(xlsx_file)
+    ws = openpyxl.load_workbook(xlsx_file)["Datos"]
+    assert (ws.row_dimensions[2].height, ws["D2"].value) == (40, 1)
@@ -0,0 +1,89 @@
+"""
+Pruebas del handler de archivo con buffer y del hilo que lo alimenta.
+"""
+
+import logging
+import time
+
+import pytest
+
+from xlsm_mcp import logger as logger_module
+from xlsm_mcp.logger import LOG_BUFFER_SIZE, BufferedRotatingFileHandler, setup_logging
+
+
+def _record(msg, level=logging.INFO):
+    return logging.makeLogRecord({"msg": msg, "levelno": level, "levelname": logging.getLevelName(level)})
+
+
+@pytest.fixture
+def make_handler(tmp_path):
+    handlers = []
+    
+    def make(name="xlsm-mcp.log", max_bytes=10 * 1024 * 1024, backup_count=2):
+        handler = BufferedRotatingFileHandler(
+            tmp_path / name, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        handlers.append(handler)
+        return handler
+    
+    yield make
+    for handler in handlers:
+        handler.close()
+
+
+def test_info_records_stay_buffered_with_rotation_enabled(make_handler, tmp_path):
+    handler = make_handler()
+    for i in range(200):
+        handler.emit(_record(f"registro {i} con ñ"))
+    
+    log_file = tmp_path / "xlsm-mcp.log"
+    assert log_file.stat().st_size == 0
+    handler.flush()
+    assert log_file.stat().st_size == handler._bytes_written < LOG_BUFFER_SIZE
+    
+    handler.emit(_record("aviso", logging.WARNING))
+    assert log_file.read_text(encoding="utf-8").endswith("aviso\n")
+
+
+def test_rotates_on_counted_bytes(make_handler, tmp_path):
+    handler = make_handler(max_bytes=1000)
+    for _ in range(100):
+        handler.emit(_record("x" * 49))
+    handler.close()
+    
+    sizes = {p.name: p.stat().st_size for p in tmp_path.iterdir()}
+    assert set(sizes) == {"xlsm-mcp.log", "xlsm-mcp.log.1", "xlsm-mcp.log.2"}
+    assert all(size < 1000 for size in sizes.values())
+
+
+def test_count_resumes_from_existing_file(make_handler, tmp_path):
+    (tmp_path / "xlsm-mcp.log").write_text("y" * 990 + "\n", encoding="utf-8")
+    
+    handler = make_handler(max_bytes=1000)
+    handler.emit(_record("x" * 49))
+    handler.close()
+    
+    assert (tmp_path / "xlsm-mcp.log.1").stat().st_size == 991
+    assert (tmp_path / "xlsm-mcp.log").read_text(encoding="utf-8") == "x" * 49 + "\n"
+
+
+@pytest.fixture
+def configured_logger(tmp_path):
+    log_file = tmp_path / "servidor.log"
+    logger = setup_logging("info", log_file, console_output=False)
+    yield logger, log_file
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+    logger_module._stop_listener()
+
+
+def test_listener_flushes_when_queue_drains(configured_logger):
+    logger, log_file = configured_logger
+    logger.info("primer registro")
+    
+    # Sin cerrar el handler ni registrar avisos: basta con que la cola se vacíe
+    deadline = time.monotonic() + 5
+    while "primer registro" not in log_file.read_text(encoding="utf-8"):
+        assert time.monotonic() < deadline, "el registro no llegó al archivo"
+        time.sleep(0.01)
@@ -0,0 +1,61 @@
+"""
+Pruebas de la conversión a .xlsm y de la búsqueda de procedimientos VBA.
+"""
+
+import zipfile
+
+import pytest
+
+from xlsm_mcp.exceptions import MacroError
+from xlsm_mcp.macros import _scan_procedures, convert_to_xlsm
+
+
+def test_convert_to_xlsm_enables_vba(xlsx_file, tmp_path):
+    output = tmp_path / "libro.xlsm"
+    
+    assert convert_to_xlsm(str(xlsx_file), str(output)) == str(output)
+    
+    with zipfile.ZipFile(xlsx_file) as source, zipfile.ZipFile(output) as target:
+        assert target.testzip() is None
+        names = set(target.namelist())
+        assert set(source.namelist()) <= names
+        assert "xl/vbaProject.bin" in names
+        content_types = target.read("[Content_Types].xml").decode()
+        assert 'PartName="/xl/vbaProject.bin"' in content_types
+        # Las partes que no se transforman se copian sin cambios
+        sheet = "xl/worksheets/sheet1.xml"
+        assert target.read(sheet) == source.read(sheet)
+    assert not [p for p in tmp_path.iterdir() if p.suffix == ".tmp"]
+
+
+def test_convert_to_xlsm_rejects_invalid_file(tmp_path):
+    broken = tmp_path / "roto.xlsx"
+    broken.write_bytes(b"no es un zip")
+    
+    with pytest.raises(MacroError):
+        convert_to_xlsm(str(broken), str(tmp_path / "roto.xlsm"))
+    assert not (tmp_path / "roto.xlsm").exists()
+
+
+def test_scan_procedures_finds_declarations_only():
+    vba_code = "\n".join([
+        "Attribute VB_Name = \"Modulo1\"",
+        "Private Declare PtrSafe Function GetTickCount Lib \"kernel32\" () As Long",
+        "' Sub Comentada()",
+        "Rem Function TambienComentada()",
+        "Public Sub Hola()",
+        "    MsgBox \"Sub dentro de una cadena\"",
+        "    Exit Sub",
+        "End Sub",
+        "Private Static Function Suma(a, b) As Long",
+        "    Suma = a + b",
+        "End Function",
+        "Sub Tercera(x)",
+        "End Sub",
+    ])
+    
+    assert list(_scan_procedures(vba_code)) == [
+        ("Sub", "Hola"),
+        ("Function", "Suma"),
+        ("Sub", "Tercera"),
+    ]
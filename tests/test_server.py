@@ -0,0 +1,60 @@
+"""
+Pruebas de la ejecución de herramientas del servidor fuera del bucle de eventos.
+"""
+
+import asyncio
+import gc
+import threading
+
+from xlsm_mcp import server
+
+
+def test_read_tool_runs_in_worker_thread(xlsx_file, monkeypatch):
+    threads = []
+    read = server.read_excel_range
+    
+    def spy(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return read(*args, **kwargs)
+    
+    monkeypatch.setattr(server, "read_excel_range", spy)
+    result = asyncio.run(server.read_data_from_excel(str(xlsx_file), "Datos", "A1", "B2"))
+    
+    assert result["success"], result
+    assert result["data"] == [{"nombre": "a", "valor": 1}]
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_file_locks_are_shared_and_released(xlsx_file, tmp_path):
+    link = tmp_path / "enlace.xlsx"
+    link.symlink_to(xlsx_file)
+    
+    lock = server._file_lock(str(xlsx_file))
+    assert server._file_lock(str(link)) is lock
+    
+    del lock
+    gc.collect()
+    assert len(server._FILE_LOCKS) == 0
+
+
+def test_writes_to_the_same_file_are_serialized(xlsx_file):
+    active = []
+    overlaps = []
+    
+    def write(value):
+        active.append(value)
+        if len(active) > 1:
+            overlaps.append(list(active))
+        threading.Event().wait(0.02)
+        active.remove(value)
+        return value
+    
+    async def run():
+        return await asyncio.gather(
+            *(server._run_writing(str(xlsx_file), write, i) for i in range(5))
+        )
+    
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
+    assert overlaps == []
+    gc.collect()
+    assert len(server._FILE_LOCKS) == 0
@@ -0,0 +1,66 @@
+"""
+Pruebas de las operaciones de hoja por lotes.
+"""
+
+import openpyxl
+import pytest
+
+from xlsm_mcp.data import write_data
+from xlsm_mcp.exceptions import SheetError
+from xlsm_mcp.sheet import batch_sheet_ops, create_worksheets, rename_sheets
+from xlsm_mcp.workbook import has_pending_changes
+
+
+def _sheetnames(path):
+    return openpyxl.load_workbook(path).sheetnames
+
+
+def test_batch_applies_all_operations(xlsx_file):
+    result = batch_sheet_ops(str(xlsx_file), [
+        {"op": "create_worksheet", "args": {"sheet_name": "Resumen"}},
+        {"op": "copy_sheet", "args": {"source_sheet": "Datos", "target_sheet": "Copia"}},
+        {"op": "merge_range",
+         "args": {"sheet_name": "Resumen", "start_cell": "A1", "end_cell": "C1"}},
+    ])
+    
+    assert len(result["results"]) == 3
+    wb = openpyxl.load_workbook(xlsx_file)
+    assert wb.sheetnames == ["Datos", "Resumen", "Copia"]
+    assert [str(r) for r in wb["Resumen"].merged_cells.ranges] == ["A1:C1"]
+
+
+def test_batch_failure_leaves_file_untouched(xlsx_file):
+    before = xlsx_file.read_bytes()
+    
+    with pytest.raises(SheetError, match="Operación 2"):
+        batch_sheet_ops(str(xlsx_file), [
+            {"op": "create_worksheet", "args": {"sheet_name": "Nueva"}},
+            {"op": "delete_sheet", "args": {"sheet_name": "No existe"}},
+        ])
+    
+    assert xlsx_file.read_bytes() == before
+
+
+def test_batch_failure_discards_pending_changes(xlsx_file):
+    write_data(str(xlsx_file), "Datos", [{"x": 1}], "D1", defer_save=True)
+    
+    with pytest.raises(SheetError):
+        batch_sheet_ops(str(xlsx_file), [
+            {"op": "create_worksheet", "args": {"sheet_name": "Nueva"}},
+            {"op": "rename_sheet", "args": {"old_name": "No existe", "new_name": "X"}},
+        ])
+    
+    # El libro en memoria pudo quedar a medias: no debe llegar a disco
+    assert not has_pending_changes(xlsx_file)
+    assert _sheetnames(xlsx_file) == ["Datos"]
+
+
+def test_bulk_helpers_are_atomic(xlsx_file):
+    create_worksheets(str(xlsx_file), ["A", "B"])
+    
+    with pytest.raises(SheetError):
+        rename_sheets(str(xlsx_file), {"A": "C", "Falta": "D"})
+    assert _sheetnames(xlsx_file) == ["Datos", "A", "B"]
+    
+    with pytest.raises(SheetError):
+        create_worksheets(str(xlsx_file), [])
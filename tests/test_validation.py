@@ -0,0 +1,42 @@
+"""
+Pruebas de la validación de referencias y rangos de celdas.
+"""
+
+import pytest
+
+from xlsm_mcp.exceptions import ValidationError
+from xlsm_mcp.validation import (
+    split_cell_reference,
+    validate_cell_range,
+    validate_cell_reference,
+)
+
+
+@pytest.mark.parametrize("cell_ref", ["", "A", "1", "A0", "A01", "1A", "A1B", "A-1", "A1 "])
+def test_invalid_cell_references(cell_ref):
+    with pytest.raises(ValidationError):
+        validate_cell_reference(cell_ref)
+
+
+def test_cell_reference_is_normalised_and_split():
+    assert validate_cell_reference("bc12") == "BC12"
+    assert split_cell_reference("bc12") == ("BC", 12)
+
+
+def test_validate_cell_range():
+    assert validate_cell_range("a1") == ("A1", None)
+    assert validate_cell_range("a1", "c3") == ("A1", "C3")
+    with pytest.raises(ValidationError):
+        validate_cell_range("A1", "C")
+    with pytest.raises(ValidationError):
+        validate_cell_range("B2", "B1")
+
+
+def test_range_columns_compare_as_indices():
+    assert validate_cell_range("Z1", "AA1") == ("Z1", "AA1")
+    assert validate_cell_range("az1", "ba1") == ("AZ1", "BA1")
+    with pytest.raises(ValidationError):
+        validate_cell_range("AA1", "Z1")
+    # Más allá de ZZZ, el límite de openpyxl
+    with pytest.raises(ValidationError):
+        validate_cell_range("A1", "AAAA1")
@@ -0,0 +1,120 @@
+"""
+Pruebas del guardado diferido y del guardado atómico de libros.
+"""
+
+import os
+import subprocess
+import sys
+import textwrap
+
+import openpyxl
+import pytest
+
+from xlsm_mcp.data import write_data
+from xlsm_mcp.exceptions import WorkbookError
+from xlsm_mcp.workbook import (
+    flush_all_workbooks,
+    flush_workbook,
+    has_pending_changes,
+    save_workbook,
+    workbook_session,
+)
+
+
+def test_deferred_save_waits_for_flush(xlsx_file):
+    write_data(str(xlsx_file), "Datos", [{"x": 1}], "D1", defer_save=True)
+    write_data(str(xlsx_file), "Datos", [{"y": 2}], "E1", defer_save=True)
+    
+    # Hasta el flush, el disco conserva el contenido anterior
+    assert has_pending_changes(xlsx_file)
+    assert openpyxl.load_workbook(xlsx_file)["Datos"]["D1"].value is None
+    
+    assert flush_workbook(xlsx_file) is True
+    assert not has_pending_changes(xlsx_file)
+    ws = openpyxl.load_workbook(xlsx_file)["Datos"]
+    assert (ws["D2"].value, ws["E2"].value) == (1, 2)
+    assert flush_workbook(xlsx_file) is False
+
+
+def test_failed_session_discards_pending_changes(xlsx_file):
+    write_data(str(xlsx_file), "Datos", [{"x": 1}], "D1", defer_save=True)
+    
+    try:
+        with workbook_session(xlsx_file):
+            raise RuntimeError("fallo a mitad del bloque")
+    except RuntimeError:
+        pass
+    
+    assert not has_pending_changes(xlsx_file)
+    assert flush_workbook(xlsx_file) is False
+    assert openpyxl.load_workbook(xlsx_file)["Datos"].max_column == 2
+
+
+def test_save_keeps_mode_and_symlink(xlsx_file, tmp_path):
+    os.chmod(xlsx_file, 0o640)
+    link = tmp_path / "enlace.xlsx"
+    link.symlink_to(xlsx_file)
+    
+    save_workbook(openpyxl.load_workbook(link), link)
+    
+    assert link.is_symlink()
+    assert os.stat(xlsx_file).st_mode & 0o777 == 0o640
+    assert not [p for p in tmp_path.iterdir() if p.suffix == ".tmp"]
+
+
+def test_deferred_writes_through_symlink_share_pending_workbook(xlsx_file, tmp_path):
+    link = tmp_path / "enlace.xlsx"
+    link.symlink_to(xlsx_file)
+    
+    write_data(str(xlsx_file), "Datos", [{"x": 1}], "D1", defer_save=True)
+    write_data(str(link), "Datos", [{"y": 2}], "F1", defer_save=True)
+    
+    assert has_pending_changes(link) and has_pending_changes(xlsx_file)
+    assert flush_all_workbooks() == 1
+    ws = openpyxl.load_workbook(xlsx_file)["Datos"]
+    assert (ws["D2"].value, ws["F2"].value) == (1, 2)
+    assert link.is_symlink()
+
+
+def test_exit_flush_failure_is_reported(tmp_path):
+    # Proceso aparte: el guardado de salida solo corre al terminar el intérprete
+    script = textwrap.dedent("""
+        import shutil, sys
+        import openpyxl
+        from xlsm_mcp.data import write_data
+        from xlsm_mcp.logger import setup_logging
+        
+        directory, log_file = sys.argv[1], sys.argv[2]
+        setup_logging("info", log_file, console_output=False)
+        wb = openpyxl.Workbook()
+        wb.active.title = "Datos"
+        wb.save(directory + "/libro.xlsx")
+        write_data(directory + "/libro.xlsx", "Datos", [{"x": 1}], defer_save=True)
+        shutil.rmtree(directory)
+    """)
+    directory = tmp_path / "libros"
+    directory.mkdir()
+    log_file = tmp_path / "xlsm-mcp.log"
+    
+    result = subprocess.run(
+        [sys.executable, "-c", script, str(directory), str(log_file)],
+        capture_output=True, text=True, timeout=60
+    )
+    
+    assert "libro.xlsx" in result.stderr
+    assert "Error al guardar cambios pendientes" in log_file.read_text(encoding="utf-8")
+
+
+def test_flush_all_saves_the_rest_and_raises(xlsx_file, tmp_path):
+    lost = tmp_path / "perdido" / "libro.xlsx"
+    lost.parent.mkdir()
+    openpyxl.load_workbook(xlsx_file).save(lost)
+    write_data(str(lost), "Datos", [{"x": 1}], "D1", defer_save=True)
+    write_data(str(xlsx_file), "Datos", [{"y": 2}], "F1", defer_save=True)
+    lost.unlink()
+    lost.parent.rmdir()
+    
+    with pytest.raises(WorkbookError, match="perdido"):
+        flush_all_workbooks()
+    assert openpyxl.load_workbook(xlsx_file)["Datos"]["F2"].value == 2
+    assert not has_pending_changes(xlsx_file)